@@ -25,6 +25,7 @@ import os
 import numpy as np
 
 from core.module import Base
+from core.connector import Connector
 from core.configoption import ConfigOption
 from core.util.modules import get_main_dir
 from interface.fast_counter_interface import FastCounterInterface
@@ -33,18 +34,46 @@ from interface.fast_counter_interface import FastCounterInterface
 class FastCounterDummy(Base, FastCounterInterface):
     """ Implementation of the FastCounter interface methods for a dummy usage.
 
+    Without a connected pulser (or with a pulser other than the pulser dummy) the dummy returns a
+    static trace loaded from a file.
+    If the pulser dummy is connected, the photon counts are simulated for the waveform loaded in
+    the pulser instead. The laser pulses are taken from the flanks of the laser channel. During
+    each laser pulse the fluorescence of an NV-like emitter relaxes exponentially from its initial
+    level (given by the spin population and the contrast) to the steady state level halfway
+    between bright and dark. The spin population oscillates across the laser pulses of the
+    waveform. Poisson distributed counts of all sweeps since the last poll are drawn at once.
+
     Example config for copy-paste:
 
     fastcounter_dummy:
         module.Class: 'fast_counter_dummy.FastCounterDummy'
         gated: False
         #load_trace: None # path to the saved dummy trace
+        #laser_channel: 'd_ch1' # pulser channel switching the laser
+        #bright_count_rate: 200e3 # count rate of the bright state in counts/s
+        #dark_count_rate: 1e3 # background count rate in counts/s
+        #contrast: 0.3 # relative fluorescence drop of the dark state
+        #laser_response_time: 250e-9 # relaxation time to the steady state in s
+        #signal_periods: 2 # oscillation periods of the spin population across the laser pulses
+        #sweep_rate: None # sweeps/s, None for the repetition rate of the loaded waveform
+        connect:
+            pulser: 'pulser_dummy' # optional, simulates the counts of the loaded waveform
 
     """
 
+    # connectors
+    pulser = Connector(interface='PulserInterface', optional=True)
+
     # config option
     _gated = ConfigOption('gated', False, missing='warn')
     trace_path = ConfigOption('load_trace', None)
+    _laser_channel = ConfigOption('laser_channel', 'd_ch1', missing='nothing')
+    _bright_count_rate = ConfigOption('bright_count_rate', 200e3, missing='nothing')
+    _dark_count_rate = ConfigOption('dark_count_rate', 1e3, missing='nothing')
+    _contrast = ConfigOption('contrast', 0.3, missing='nothing')
+    _laser_response_time = ConfigOption('laser_response_time', 250e-9, missing='nothing')
+    _signal_periods = ConfigOption('signal_periods', 2, missing='nothing')
+    _sweep_rate = ConfigOption('sweep_rate', None, missing='nothing')
 
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
@@ -67,6 +96,11 @@ class FastCounterDummy(Base, FastCounterInterface):
         self.statusvar = 0
         self._binwidth = 1
         self._gate_length_bins = 8192
+        self._number_of_gates = 0
+
+        # simulation of the loaded waveform, None if the static trace is used
+        self._simulation = None
+        self._rng = np.random.RandomState()
         return
 
     def on_deactivate(self):
@@ -136,6 +170,7 @@ class FastCounterDummy(Base, FastCounterInterface):
         self._gate_length_bins = int(np.rint(record_length_s / bin_width_s))
         actual_binwidth = self._binwidth * 1000 / 950e9
         actual_length = self._gate_length_bins * actual_binwidth
+        self._number_of_gates = number_of_gates
         self.statusvar = 1
         return actual_binwidth, actual_length, number_of_gates
 
@@ -153,6 +188,12 @@ class FastCounterDummy(Base, FastCounterInterface):
         return self.statusvar
 
     def start_measure(self):
+        self._simulation = self._create_simulation()
+        if self._simulation is not None:
+            self.statusvar = 2
+            self._simulation['last_update'] = time.time()
+            return 0
+
         time.sleep(1)
         self.statusvar = 2
         try:
@@ -169,12 +210,21 @@ class FastCounterDummy(Base, FastCounterInterface):
 
         Fast counter must be initially in the run state to make it pause.
         """
+        if self._simulation is not None:
+            self._simulate_sweeps()
+            self.statusvar = 3
+            return 0
+
         time.sleep(1)
         self.statusvar = 3
         return 0
 
     def stop_measure(self):
         """ Stop the fast counter. """
+        if self._simulation is not None:
+            self._simulate_sweeps()
+            self.statusvar = 1
+            return 0
 
         time.sleep(1)
         self.statusvar = 1
@@ -185,7 +235,8 @@ class FastCounterDummy(Base, FastCounterInterface):
 
         If fast counter is in pause state, then fast counter will be continued.
         """
-
+        if self._simulation is not None:
+            self._simulation['last_update'] = time.time()
         self.statusvar = 2
         return 0
 
@@ -225,6 +276,15 @@ class FastCounterDummy(Base, FastCounterInterface):
         If the hardware does not support these features, the values should be None
         """
 
+        if self._simulation is not None:
+            self._simulate_sweeps()
+            sim = self._simulation
+            time_trace = sim['buffers'][sim['index']].view()
+            time_trace.flags.writeable = False
+            info_dict = {'elapsed_sweeps': int(sim['sweeps']),
+                         'elapsed_time': sim['elapsed_time']}
+            return time_trace, info_dict
+
         # include an artificial waiting time
         time.sleep(0.5)
         info_dict = {'elapsed_sweeps': None, 'elapsed_time': None}
@@ -234,3 +294,127 @@ class FastCounterDummy(Base, FastCounterInterface):
         freq = 950.
         time.sleep(0.5)
         return freq
+
+    def _create_simulation(self):
+        """ Precomputes the expected counts per sweep for the waveform loaded in the pulser.
+
+        Only the bins covered by laser pulses are stored (flat trace index and expected counts
+        per sweep), the background is constant over the whole trace.
+
+        @return dict: the simulation state, None if the static trace has to be used
+        """
+        pulser = self.pulser()
+        if pulser is None:
+            return None
+        # get_loaded_flanks is not part of PulserInterface, only the pulser dummy provides it
+        if not hasattr(pulser, 'get_loaded_flanks'):
+            self.log.warning('The connected pulser does not provide the flanks of the loaded '
+                             'waveform. Using the static dummy trace instead.')
+            return None
+        flanks = pulser.get_loaded_flanks(self._laser_channel)
+        if flanks is None or flanks[0].size == 0 or flanks[1].size == 0:
+            self.log.warning('No laser pulses found in the waveform loaded on channel "{0}". '
+                             'Using the static dummy trace instead.'.format(self._laser_channel))
+            return None
+        rising_bins, falling_bins, number_of_samples = flanks
+        sample_rate = pulser.get_sample_rate()
+
+        # pair each rising flank with the next falling flank (wrapping around the waveform)
+        falling_index = np.searchsorted(falling_bins, rising_bins, side='right')
+        laser_falling_bins = np.where(falling_index < falling_bins.size,
+                                      falling_bins[np.minimum(falling_index, falling_bins.size - 1)],
+                                      falling_bins[0] + number_of_samples)
+
+        binwidth = self.get_binwidth()
+        bins_per_sample = 1 / (sample_rate * binwidth)
+        gate_length = self._gate_length_bins
+        if self._gated:
+            number_of_gates = self._number_of_gates if self._number_of_gates else rising_bins.size
+            shape = (number_of_gates, gate_length)
+            number_of_lasers = min(number_of_gates, rising_bins.size)
+            laser_bins = np.rint((laser_falling_bins - rising_bins) * bins_per_sample)
+            laser_bins = np.minimum(laser_bins[:number_of_lasers], gate_length).astype(np.int64)
+            laser_start = np.arange(number_of_lasers, dtype=np.int64) * gate_length
+        else:
+            shape = (gate_length,)
+            number_of_lasers = rising_bins.size
+            laser_start = np.rint(rising_bins * bins_per_sample).astype(np.int64)
+            laser_stop = np.rint(laser_falling_bins * bins_per_sample).astype(np.int64)
+            laser_bins = laser_stop - laser_start
+
+        # bin index within each laser pulse and the laser pulse each bin belongs to
+        laser = np.repeat(np.arange(number_of_lasers), laser_bins)
+        pulse_bin = np.arange(laser.size) - np.repeat(np.cumsum(laser_bins) - laser_bins,
+                                                      laser_bins)
+
+        # NV-like laser response for a spin population oscillating across the laser pulses
+        dark_population = np.sin(np.pi * self._signal_periods *
+                                 np.arange(number_of_lasers) / number_of_lasers) ** 2
+        initial_level = 1 - self._contrast * dark_population
+        steady_level = 1 - self._contrast / 2
+        decay = np.exp(-(pulse_bin + 0.5) * binwidth / self._laser_response_time)
+        level = steady_level + (initial_level[laser] - steady_level) * decay
+
+        if self._sweep_rate is None:
+            sweep_rate = sample_rate / number_of_samples
+        else:
+            sweep_rate = self._sweep_rate
+
+        indices = laser_start[laser] + pulse_bin
+        if not self._gated:
+            # A laser pulse wrapping around the end of the waveform continues at the start of the
+            # next sweep. Bins beyond the trace length are not recorded.
+            sweep_bins = int(np.rint(number_of_samples * bins_per_sample))
+            indices[indices >= sweep_bins] -= sweep_bins
+            recorded = indices < gate_length
+            indices = indices[recorded]
+            level = level[recorded]
+
+        return {'indices': indices,
+                'laser_counts': level * self._bright_count_rate * binwidth,
+                'dark_counts': self._dark_count_rate * binwidth,
+                'sweep_rate': sweep_rate,
+                'buffers': (np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64)),
+                'index': 0,
+                'sweeps': 0.0,
+                'elapsed_time': 0.0,
+                'last_update': None}
+
+    def _simulate_sweeps(self):
+        """ Adds the counts of all sweeps since the last update to the simulated trace.
+        The counts are written into the other of the two trace buffers, so a trace returned
+        before stays unchanged.
+        """
+        sim = self._simulation
+        if self.statusvar != 2:
+            return
+        now = time.time()
+        elapsed_time = now - sim['last_update']
+        sim['last_update'] = now
+        sim['elapsed_time'] += elapsed_time
+        sweeps_before = int(sim['sweeps'])
+        sim['sweeps'] += elapsed_time * sim['sweep_rate']
+        new_sweeps = int(sim['sweeps']) - sweeps_before
+        if new_sweeps < 1:
+            return
+
+        trace = sim['buffers'][1 - sim['index']]
+        np.copyto(trace, sim['buffers'][sim['index']])
+        trace_flat = trace.reshape(-1)
+        trace_flat[sim['indices']] += self._rng.poisson(sim['laser_counts'] * new_sweeps)
+
+        # Background counts. Distributing a Poisson distributed total number of counts uniformly
+        # over the bins is equivalent to drawing each bin and much faster for sparse counts.
+        dark_counts = sim['dark_counts'] * new_sweeps
+        number_of_counts = self._rng.poisson(dark_counts * trace_flat.size)
+        if number_of_counts > trace_flat.size:
+            trace_flat += self._rng.poisson(dark_counts, trace_flat.size)
+        else:
+            dark_bins = self._rng.randint(0, trace_flat.size, number_of_counts)
+            if number_of_counts < trace_flat.size // 16:
+                dark_bins, counts = np.unique(dark_bins, return_counts=True)
+                trace_flat[dark_bins] += counts
+            else:
+                trace_flat += np.bincount(dark_bins, minlength=trace_flat.size)
+        sim['index'] = 1 - sim['index']
+        return
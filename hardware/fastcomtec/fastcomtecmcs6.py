@@ -194,7 +194,16 @@ class FastComtec(Base, FastCounterInterface):
         #this variable has to be added because there is no difference
         #in the fastcomtec it can be on "stopped" or "halt"
         self.stopped_or_halt = "stopped"
-        self.timetrace_tmp = []
+        # int64 data trace saved when pausing a gated measurement (None if not paused)
+        self.timetrace_tmp = None
+
+        # Shape of the data trace (cached when the length or cycles are changed), the buffer the
+        # DLL copies the counts into and two int64 data trace buffers used in turns, so the trace
+        # returned by the previous call of get_data_trace stays valid.
+        self._data_shape = None
+        self._raw_buffer = None
+        self._trace_buffers = None
+        self._trace_index = 0
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -336,7 +345,7 @@ class FastComtec(Base, FastCounterInterface):
         while self.get_status() != 1:
             time.sleep(0.05)
         if self.gated:
-            self.timetrace_tmp = []
+            self.timetrace_tmp = None
         return status
 
     def pause_measure(self):
@@ -347,7 +356,8 @@ class FastComtec(Base, FastCounterInterface):
             time.sleep(0.05)
 
         if self.gated:
-            self.timetrace_tmp = self.get_data_trace()
+            # The data trace buffers are reused, so a copy is saved
+            self.timetrace_tmp = np.array(self.get_data_trace()[0])
         return status
 
     def continue_measure(self):
@@ -388,35 +398,60 @@ class FastComtec(Base, FastCounterInterface):
         If the counter is UNgated it will return a 1D-numpy-array with returnarray[timebin_index]
         If the counter is gated it will return a 2D-numpy-array with returnarray[gate_index, timebin_index]
 
+        The returned array is read-only and reused: it is valid until the next but one call.
+        Callers keeping the data for longer must copy it.
+
           @return arrray: Time trace.
         """
-        setting = AcqSettings()
-        self.dll.GetSettingData(ctypes.byref(setting), 0)
-        N = setting.range
-
-        if self.is_gated():
-            bsetting=BOARDSETTING()
-            self.dll.GetMCSSetting(ctypes.byref(bsetting), 0)
-            H = bsetting.cycles
-            if H==0:
-                H=1
-            data = np.empty((H, int(N / H)), dtype=np.uint32)
-
-        else:
-            data = np.empty((N,), dtype=np.uint32)
+        if self._data_shape is None:
+            self._update_data_geometry()
+        data = self._raw_buffer
 
         p_type_ulong = ctypes.POINTER(ctypes.c_uint32)
         ptr = data.ctypes.data_as(p_type_ulong)
         self.dll.LVGetDat(ptr, 0)
-        time_trace = np.int64(data)
 
-        if self.gated and self.timetrace_tmp != []:
-            time_trace = time_trace + self.timetrace_tmp
+        # widen to int64 (and add the counts before a pause) directly into the output buffer
+        self._trace_index = 1 - self._trace_index
+        time_trace = self._trace_buffers[self._trace_index]
+        if self.gated and self.timetrace_tmp is not None:
+            np.add(data, self.timetrace_tmp, out=time_trace)
+        else:
+            np.copyto(time_trace, data)
+        time_trace = time_trace.view()
+        time_trace.flags.writeable = False
 
         info_dict = {'elapsed_sweeps': None,
                      'elapsed_time': None}  # TODO : implement that according to hardware capabilities
         return time_trace, info_dict
 
+    def _update_data_geometry(self):
+        """ Reads the shape of the data trace from the device and allocates the buffers for
+        get_data_trace. Needs to be called whenever the length or the number of cycles change.
+        """
+        setting = AcqSettings()
+        self.dll.GetSettingData(ctypes.byref(setting), 0)
+        N = setting.range
+
+        if self.gated:
+            bsetting = BOARDSETTING()
+            self.dll.GetMCSSetting(ctypes.byref(bsetting), 0)
+            H = bsetting.cycles
+            if H == 0:
+                H = 1
+            shape = (H, int(N / H))
+        else:
+            shape = (N,)
+
+        if shape != self._data_shape:
+            self._data_shape = shape
+            self._raw_buffer = np.empty(shape, dtype=np.uint32)
+            self._trace_buffers = (np.zeros(shape, dtype=np.int64),
+                                   np.zeros(shape, dtype=np.int64))
+            if self.timetrace_tmp is not None and self.timetrace_tmp.shape != shape:
+                self.timetrace_tmp = None
+        return
+
 
     # =========================================================================
     #                           Non Interface methods
@@ -557,6 +592,7 @@ class FastComtec(Base, FastCounterInterface):
 
             # insert sleep time, otherwise fast counter crashed sometimes!
             time.sleep(0.5)
+            self._update_data_geometry()
             return length_bins
         else:
             self.log.error('Dimensions {0} are too large for fast counter1!'.format(length_bins *  cycles))
@@ -660,6 +696,7 @@ class FastComtec(Base, FastCounterInterface):
             self.set_cycle_mode(mode=False, cycles=cycles)
             self.set_preset_mode(mode=0, preset=preset)
             self.gated=False
+        self._update_data_geometry()
         return gated
 
 
@@ -743,6 +780,7 @@ class FastComtec(Base, FastCounterInterface):
             cmd = 'cycles={0}'.format(cycles)
             self.dll.RunCmd(0, bytes(cmd, 'ascii'))
             time.sleep(0.5)
+            self._update_data_geometry()
             return cycles
         else:
             self.log.error('Dimensions {0} are too large for fast counter2!'.format(self.get_length() * cycles))
@@ -178,7 +178,16 @@ class FastComtec(Base, FastCounterInterface):
         #this variable has to be added because there is no difference
         #in the fastcomtec it can be on "stopped" or "halt"
         self.stopped_or_halt = "stopped"
-        self.timetrace_tmp = []
+        # int64 data trace saved when pausing a gated measurement (None if not paused)
+        self.timetrace_tmp = None
+
+        # Shape of the data trace (cached when the length or cycles are changed), the buffer the
+        # DLL copies the counts into and two int64 data trace buffers used in turns, so the trace
+        # returned by the previous call of get_data_trace stays valid.
+        self._data_shape = None
+        self._raw_buffer = None
+        self._trace_buffers = None
+        self._trace_index = 0
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -335,7 +344,8 @@ class FastComtec(Base, FastCounterInterface):
             time.sleep(0.05)
 
         if self.gated:
-            self.timetrace_tmp = self.get_data_trace()
+            # The data trace buffers are reused, so a copy is saved
+            self.timetrace_tmp = np.array(self.get_data_trace()[0])
         return status
 
     def stop_measure(self):
@@ -346,7 +356,7 @@ class FastComtec(Base, FastCounterInterface):
             time.sleep(0.05)
 
         if self.gated:
-            self.timetrace_tmp = []
+            self.timetrace_tmp = None
         return status
 
     def continue_measure(self):
@@ -386,33 +396,57 @@ class FastComtec(Base, FastCounterInterface):
         If the counter is UNgated it will return a 1D-numpy-array with returnarray[timebin_index]
         If the counter is gated it will return a 2D-numpy-array with returnarray[gate_index, timebin_index]
 
+        The returned array is read-only and reused: it is valid until the next but one call.
+        Callers keeping the data for longer must copy it.
+
           @return arrray: Time trace.
         """
-        setting = AcqSettings()
-        self.dll.GetSettingData(ctypes.byref(setting), 0)
-        N = setting.range
-
-        if self.gated:
-            bsetting=AcqSettings()
-            self.dll.GetSettingData(ctypes.byref(bsetting), 0)
-            H = bsetting.cycles
-            data = np.empty((H, int(N / H)), dtype=np.uint32)
-
-        else:
-            data = np.empty((N,), dtype=np.uint32)
+        if self._data_shape is None:
+            self._update_data_geometry()
+        data = self._raw_buffer
 
         p_type_ulong = ctypes.POINTER(ctypes.c_uint32)
         ptr = data.ctypes.data_as(p_type_ulong)
         self.dll.LVGetDat(ptr, 0)
-        time_trace = np.int64(data)
 
-        if self.gated and self.timetrace_tmp != []:
-            time_trace = time_trace + self.timetrace_tmp
+        # widen to int64 (and add the counts before a pause) directly into the output buffer
+        self._trace_index = 1 - self._trace_index
+        time_trace = self._trace_buffers[self._trace_index]
+        if self.gated and self.timetrace_tmp is not None:
+            np.add(data, self.timetrace_tmp, out=time_trace)
+        else:
+            np.copyto(time_trace, data)
+        time_trace = time_trace.view()
+        time_trace.flags.writeable = False
 
         info_dict = {'elapsed_sweeps': self.get_current_sweeps(),
                      'elapsed_time': None} 
         return time_trace, info_dict
 
+    def _update_data_geometry(self):
+        """ Reads the shape of the data trace from the device and allocates the buffers for
+        get_data_trace. Needs to be called whenever the length or the number of cycles change.
+        """
+        setting = AcqSettings()
+        self.dll.GetSettingData(ctypes.byref(setting), 0)
+        N = setting.range
+
+        if self.gated:
+            H = setting.cycles
+            if H == 0:
+                H = 1
+            shape = (H, int(N / H))
+        else:
+            shape = (N,)
+
+        if shape != self._data_shape:
+            self._data_shape = shape
+            self._raw_buffer = np.empty(shape, dtype=np.uint32)
+            self._trace_buffers = (np.zeros(shape, dtype=np.int64),
+                                   np.zeros(shape, dtype=np.int64))
+            if self.timetrace_tmp is not None and self.timetrace_tmp.shape != shape:
+                self.timetrace_tmp = None
+        return
 
     def get_data_testfile(self):
         """ Load data test file """
@@ -486,6 +520,7 @@ class FastComtec(Base, FastCounterInterface):
             if sequences:
                 cmd = 'sequences={0}'.format(sequences)
                 self.dll.RunCmd(0, bytes(cmd, 'ascii'))
+            self._update_data_geometry()
             return self.get_length()
         else:
             self.log.error(
@@ -500,6 +535,7 @@ class FastComtec(Base, FastCounterInterface):
     def set_cycles(self, cycles):
         cmd = 'cycles={0}'.format(cycles)
         self.dll.RunCmd(0, bytes(cmd, 'ascii'))
+        self._update_data_geometry()
         return cycles
 
     def get_length(self):
@@ -532,6 +568,7 @@ class FastComtec(Base, FastCounterInterface):
             cmd = 'prena={0}'.format(hex(0))
             self.dll.RunCmd(0, bytes(cmd, 'ascii'))
             self.gated = False
+        self._update_data_geometry()
         return gated
 
 
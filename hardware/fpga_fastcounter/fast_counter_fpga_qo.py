@@ -58,6 +58,8 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
         #threshV_ch6: 0.5   # optional, threshold voltage for detection
         #threshV_ch7: 0.5   # optional, threshold voltage for detection
         #threshV_ch8: 0.5   # optional, threshold voltage for detection
+        #partial_readout: False  # optional, only transfer the configured gates via USB
+        #return_uint32: False    # optional, return read-only uint32 count data
     """
 
     _serial = ConfigOption('fpgacounter_serial', missing='error')
@@ -78,6 +80,13 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
     _threshold_ch6 = ConfigOption('threshV_ch6', default=0.5, missing='nothing')
     _threshold_ch7 = ConfigOption('threshV_ch7', default=0.5, missing='nothing')
     _threshold_ch8 = ConfigOption('threshV_ch8', default=0.5, missing='nothing')
+    # Only transfer the memory of the configured gates instead of all 512 gates. The memory of
+    # each gate holds 65536 bins, so the transfer can not be reduced for shorter gates. Requires a
+    # firmware that discards the untransferred memory on the next read trigger.
+    _partial_readout = ConfigOption('partial_readout', default=False, missing='nothing')
+    # Return read-only uint32 count data instead of int64 count data. Not possible while a paused
+    # measurement is continued (the counts before the pause are added).
+    _return_uint32 = ConfigOption('return_uint32', default=False, missing='nothing')
 
     # The following is the encoding (status flags and errors) of the FPGA status register
     __status_encoding = {0x00000001: 'initialization',
@@ -148,6 +157,8 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
                                     'Please contact hardware manufacturer.'}
 
     __internal_clock_hz = 950e6  # that is a fixed number, 950MHz
+    __max_gates = 512  # number of gates in the FPGA memory
+    __max_bins = 65536  # number of bins of each gate in the FPGA memory
 
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
@@ -163,6 +174,18 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
         self.saved_count_data = None  # Count data stored to continue measurement
         self._fpga = None
 
+        # USB read buffer and its uint32 view (shape=(gates, 65536)), reused for all reads
+        self._read_buffer = None
+        self._read_counts = None
+        # Two count data buffers used in turns, so the count data returned by the previous call
+        # of get_data_trace stays valid while the next one is being filled. uint32 buffers are
+        # only allocated for return_uint32.
+        self._count_buffers = None
+        self._uint32_count_buffers = None
+        self._count_buffer_index = 0
+        # Timing of the last data transfer
+        self._transfer_statistics = dict()
+
     def on_activate(self):
         """ Connect and configure the access to the FPGA.
         """
@@ -184,6 +207,8 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
 
         self.count_data = None
         self.saved_count_data = None    # Count data stored to continue measurement
+        self._transfer_statistics = dict()
+        self._allocate_buffers()
 
         # Create an instance of the Opal Kelly FrontPanel. The Frontpanel is a C dll which was
         # wrapped for use with python.
@@ -387,17 +412,52 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
         gate_length_s = self._gate_length_bins * binwidth_s
 
         self._number_of_gates = number_of_gates
+        self._allocate_buffers()
 
         self._statusvar = 1
         return binwidth_s, gate_length_s, number_of_gates
 
+    def _allocate_buffers(self):
+        """ (Re)allocates the USB read buffer and the count data buffers for the configured
+        number of gates and gate length. Buffers of unchanged size are kept.
+        """
+        gates_to_read = self.__max_gates
+        if self._partial_readout:
+            gates_to_read = min(self.__max_gates, max(1, self._number_of_gates))
+        buffersize = gates_to_read * self.__max_bins * 4
+        if self._read_buffer is None or len(self._read_buffer) != buffersize:
+            # one timebin of the data to read is 32 bit wide and the data is transferred in bytes.
+            self._read_buffer = bytearray(buffersize)
+            self._read_counts = np.frombuffer(self._read_buffer, dtype='uint32').reshape(
+                gates_to_read, self.__max_bins)
+
+        shape = (self._number_of_gates, self._gate_length_bins)
+        if self._count_buffers is None or self._count_buffers[0].shape != shape:
+            self._count_buffers = (np.zeros(shape, dtype='int64'), np.zeros(shape, dtype='int64'))
+        if self._return_uint32 and (self._uint32_count_buffers is None or
+                                    self._uint32_count_buffers[0].shape != shape):
+            self._uint32_count_buffers = (np.zeros(shape, dtype='uint32'),
+                                          np.zeros(shape, dtype='uint32'))
+        return
+
+    @property
+    def transfer_statistics(self):
+        """ Timing of the last data transfer for diagnostics.
+
+        @return dict: 'transfer_bytes', 'transfer_time' (USB read in s), 'conversion_time'
+                      (time needed to prepare the count data in s) and 'transfer_rate' (bytes/s)
+        """
+        return self._transfer_statistics.copy()
+
     def start_measure(self):
         """ Start the fast counter. """
         with self.threadlock:
             self.saved_count_data = None
             # initialize the data array
-            self.count_data = np.zeros([self._number_of_gates, self._gate_length_bins],
-                                       dtype='int64')
+            self._allocate_buffers()
+            self._count_buffers[self._count_buffer_index][...] = 0
+            self.count_data = self._count_buffers[self._count_buffer_index].view()
+            self.count_data.flags.writeable = False
             # Start the counter.
             self._fpga.ActivateTriggerIn(0x40, 0)
             timeout = 5
@@ -424,6 +484,9 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
         The binning, specified by calling configure() in forehand, must be taken
         care of in this hardware class. A possible overflow of the histogram
         bins must be caught here and taken care of.
+
+        The returned array is read-only and reused: the count data is valid until the next but one
+        call. It is never a view of the USB read buffer, so a failed transfer can not alter it.
         """
         # TODO : implement info_dict according to hardware capabilities
         info_dict = {'elapsed_sweeps': None, 'elapsed_time': None}
@@ -447,37 +510,47 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
                                                                 self._gate_length_bins))
                 return self.count_data, info_dict
 
-            # initialize the read buffer for the USB transfer.
-            # one timebin of the data to read is 32 bit wide and the data is transferred in bytes.
-            buffersize = 128 * 1024 * 1024  # 128 MB
-            data_buffer = bytearray(buffersize)
-
             # trigger the data read in the FPGA
             self._fpga.ActivateTriggerIn(0x40, 2)
-            # Read data from FPGA
-            read_err_code = self._fpga.ReadFromBlockPipeOut(0xA0, 1024, data_buffer)
-            if read_err_code != buffersize:
+            # Read data from FPGA into the persistent read buffer
+            start = time.perf_counter()
+            read_err_code = self._fpga.ReadFromBlockPipeOut(0xA0, 1024, self._read_buffer)
+            stop = time.perf_counter()
+            if read_err_code != len(self._read_buffer):
                 self.log.error('Data transfer from FPGA via USB failed with error code {0}. '
                                'Returning old count data.'.format(read_err_code))
                 return self.count_data, info_dict
 
-            # Encode bytes into 32bit unsigned integers
-            buffer_encode = np.frombuffer(data_buffer, dtype='uint32')
-
             # Extract only the requested number of gates and gate length
-            buffer_encode = buffer_encode.reshape(512, 65536)[0:self._number_of_gates,
-                                                              0:self._gate_length_bins]
-
-            # convert into int64 values
-            self.count_data = buffer_encode.astype('int64', casting='safe')
-
-            # Add saved count data (in case of continued measurement)
-            if self.saved_count_data is not None:
-                if self.saved_count_data.shape == self.count_data.shape:
-                    self.count_data = self.count_data + self.saved_count_data
+            counts = self._read_counts[0:self._number_of_gates, 0:self._gate_length_bins]
+
+            self._count_buffer_index = 1 - self._count_buffer_index
+            if self._return_uint32 and self.saved_count_data is None:
+                count_data = self._uint32_count_buffers[self._count_buffer_index]
+                np.copyto(count_data, counts)
+                self.count_data = count_data.view()
+                self.count_data.flags.writeable = False
+            else:
+                # convert into int64 values in place
+                count_data = self._count_buffers[self._count_buffer_index]
+                # Add saved count data (in case of continued measurement)
+                if self.saved_count_data is not None:
+                    if self.saved_count_data.shape == count_data.shape:
+                        np.add(counts, self.saved_count_data, out=count_data)
+                    else:
+                        self.log.error('Count data before pausing measurement had different '
+                                       'shape than after measurement. Can not properly continue '
+                                       'measurement.')
+                        np.copyto(count_data, counts)
                 else:
-                    self.log.error('Count data before pausing measurement had different shape than '
-                                   'after measurement. Can not properly continue measurement.')
+                    np.copyto(count_data, counts)
+                self.count_data = count_data.view()
+                self.count_data.flags.writeable = False
+
+            self._transfer_statistics = {'transfer_bytes': read_err_code,
+                                         'transfer_time': stop - start,
+                                         'conversion_time': time.perf_counter() - stop,
+                                         'transfer_rate': read_err_code / max(stop - start, 1e-9)}
 
             # bin the data according to the specified bin width
             # if self._binwidth != 1:
@@ -512,8 +585,8 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
 
         Fast counter must be initially in the run state to make it pause.
         """
-        # stop FPGA timetagger
-        self.saved_count_data = self.get_data_trace()[0]
+        # stop FPGA timetagger. The count data buffers are reused, so a copy is saved.
+        self.saved_count_data = np.array(self.get_data_trace()[0], dtype='int64')
         with self.threadlock:
             self._fpga.ActivateTriggerIn(0x40, 1)
             # Check status and wait until stopped
@@ -538,8 +611,6 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
         If fast counter is in pause state, then fast counter will be continued.
         """
         with self.threadlock:
-            self.count_data = np.zeros([self._number_of_gates, self._gate_length_bins],
-                                       dtype='int64')
             # Check if fastcounter was in pause state
             if self._statusvar != 3:
                 self.log.error('Can not continue fast counter since it was not in a paused state.')
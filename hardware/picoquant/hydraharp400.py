@@ -22,7 +22,11 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 from core.module import Base
 from core.configoption import ConfigOption
 from core.util.modules import get_main_dir
+from core.util.mutex import Mutex
 from interface.fast_counter_interface import FastCounterInterface
+from hardware.picoquant.tttr import HydraHarpT2Decoder, HydraHarpT3Decoder, TTTRHistogrammer
+from hardware.picoquant.tttr import TTTRRingBuffer, TTTRStreamReader
+from qtpy import QtCore
 import time
 import numpy as np
 import ctypes
@@ -65,7 +69,12 @@ class HydraHarp400(Base, FastCounterInterface):
         module.Class: 'picoquant.hydraharp400.hydraharp400.HydraHarp400'
         deviceID: 0 # a device index from 0 to 7.
         mode: 0 # 0: histogram mode, 2: T2 mode, 3: T3 mode, 8: continuous mode
-        
+        ring_buffer_reads: 64 # T2/T3 mode: number of FIFO reads the ring buffer can hold
+        sequence_marker: None # T2/T3 mode: optional marker bit mask starting a sweep of gates
+        photon_channels: None # T2/T3 mode: optional list of detector channels to count
+
+    In T2 and T3 mode the records are streamed from the FIFO into a ring buffer by a separate
+    thread. Polling the data trace histograms the pending records relative to the preceding sync.
     """
     _modclass = 'HydraHarp400'
     _modtype = 'hardware'
@@ -78,6 +87,12 @@ class HydraHarp400(Base, FastCounterInterface):
     trigger_safety = ConfigOption('trigger_safety', 400e-9, missing='warn')
     aom_delay = ConfigOption('aom_delay', 390e-9, missing='warn')
     minimal_binwidth = ConfigOption('minimal_binwidth', 1e-12, missing='warn')
+    _ring_buffer_reads = ConfigOption('ring_buffer_reads', 64, missing='nothing')
+    _sequence_marker = ConfigOption('sequence_marker', None, missing='nothing')
+    _photon_channels = ConfigOption('photon_channels', None, missing='nothing')
+
+    sigStartReading = QtCore.Signal()
+    sigStopReading = QtCore.Signal()
 
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
@@ -93,6 +108,19 @@ class HydraHarp400(Base, FastCounterInterface):
         self.stopped_or_halt = "stopped"
         self.bins_num = 0
 
+        # TTTR streaming
+        self._histogram_lock = Mutex()
+        self._decoder = None
+        self._histogrammer = None
+        self._ring_buffer = None
+        self._reader = None
+        self._reader_thread = None
+        # Two data trace buffers used in turns, so the trace returned by the previous call of
+        # get_data_trace stays valid while the next one is being filled.
+        self._trace_buffers = None
+        self._trace_index = 0
+        self._histogram_buffer = None
+
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
@@ -121,6 +149,8 @@ class HydraHarp400(Base, FastCounterInterface):
             if cal == 0:
                 self.connected_to_device = True
                 self.log.info('Calibration of HydraHarp400 is finished.')
+                if self._is_tttr_mode():
+                    self._create_reader()
                 return
             else:
                 self.log.warn('Fastcounter: Calibration of HydraHarp400 failed.')
@@ -130,6 +160,15 @@ class HydraHarp400(Base, FastCounterInterface):
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        if self._reader_thread is not None:
+            self.sigStopReading.emit()
+            self.dll.HH_StopMeas(self._deviceID)
+            self.sigStartReading.disconnect()
+            self.sigStopReading.disconnect()
+            self._reader_thread.quit()
+            self._reader_thread.wait()
+            self._reader_thread = None
+            self._reader = None
         self.dll.HH_CloseDevice(ctypes.c_int(self._deviceID))
         self.log.info('HydraHarp400 closed.')
         return
@@ -216,6 +255,9 @@ class HydraHarp400(Base, FastCounterInterface):
                         None if not-gated
             """
 
+            if self._is_tttr_mode():
+                return self._configure_tttr(bin_width_s, record_length_s, number_of_gates)
+
             # when not gated, record length = total sequence length, when gated, record length = laser length.
             # subtract 200 ns to make sure no sequence trigger is missed
             self.set_binwidth(bin_width_s)
@@ -234,6 +276,19 @@ class HydraHarp400(Base, FastCounterInterface):
 
     def start_measure(self):
         """Start the measurement. """
+        if self._is_tttr_mode():
+            if self._histogrammer is None:
+                self.log.error('Fastcounter: HydraHarp400 is not configured.')
+                return -1
+            # Blocks until the reader has stopped, so no slot of the ring buffer is being filled
+            self.sigStopReading.emit()
+            with self._histogram_lock:
+                self._decoder.reset()
+                self._histogrammer.reset()
+                self._ring_buffer.reset()
+            status = self.dll.HH_StartMeas(self._deviceID, self.ACQTMAX)
+            self.sigStartReading.emit()
+            return status
         self.dll.HH_ClearHistMem(self._deviceID)
         status = self.dll.HH_StartMeas(self._deviceID, 360000) # t is aquisition time, can set ACQTMAX as default
         return status
@@ -241,17 +296,25 @@ class HydraHarp400(Base, FastCounterInterface):
     def stop_measure(self):
         """Stop the measurement. """
         self.stopped_or_halt = "stopped"
+        if self._reader is not None:
+            self.sigStopReading.emit()
         status = self.dll.HH_StopMeas(self._deviceID)
         return status
 
     def pause_measure(self):
         """Make a pause in the measurement, which can be continued. """
         self.stopped_or_halt = "halt"
+        if self._reader is not None:
+            self.sigStopReading.emit()
         status = self.dll.HH_StopMeas(self._deviceID)
         return status
 
     def continue_measure(self):
         """Continue a paused measurement. """
+        if self._is_tttr_mode():
+            status = self.dll.HH_StartMeas(self._deviceID, self.ACQTMAX)
+            self.sigStartReading.emit()
+            return status
         status = self.dll.HH_StartMeas(self._deviceID, 360000)
         return status
 
@@ -282,25 +345,127 @@ class HydraHarp400(Base, FastCounterInterface):
             returnarray[timebin_index].
           - If the counter is gated it will return a 2D-numpy-array with
             returnarray[gate_index, timebin_index]
+
+        The returned array is read-only and reused: it is valid until the next but one call.
+
         @return arrray: Time trace.
         """
-        py_counts = np.empty((self.bins_num,), dtype=np.uint32)
-        pointer = ctypes.POINTER(ctypes.c_uint32)
-        c_counts = py_counts.ctypes.data_as(pointer)
-
-        if self.is_gated():
-            pass
-            # TODO implement
+        if self._is_tttr_mode():
+            self._accumulate_records()
+            with self._histogram_lock:
+                time_trace = self._next_trace_buffer(self._histogrammer.histogram.shape)
+                np.copyto(time_trace, self._histogrammer.histogram)
+                elapsed_sweeps = self._histogrammer.sweeps
         else:
-            self.tryfunc(self.dll.HH_GetHistogram(self._deviceID, c_counts, 1, 0), "GetHistogram")
+            if self._histogram_buffer is None or self._histogram_buffer.size != self.bins_num:
+                self._histogram_buffer = np.empty((self.bins_num,), dtype=np.uint32)
+            pointer = ctypes.POINTER(ctypes.c_uint32)
+            c_counts = self._histogram_buffer.ctypes.data_as(pointer)
+
+            if self.is_gated():
+                pass
+                # TODO implement
+            else:
+                self.tryfunc(self.dll.HH_GetHistogram(self._deviceID, c_counts, 1, 0), "GetHistogram")
 
-        time_trace = np.int64(py_counts)
+            time_trace = self._next_trace_buffer(self._histogram_buffer.shape)
+            np.copyto(time_trace, self._histogram_buffer)
+            elapsed_sweeps = None
 
         meas_t = int(self.get_measurement_time())
-        info_dict = {'elapsed_sweeps': None,
+        info_dict = {'elapsed_sweeps': elapsed_sweeps,
                      'elapsed_time': meas_t}
+        time_trace = time_trace.view()
+        time_trace.flags.writeable = False
         return time_trace, info_dict
 
+    def _next_trace_buffer(self, shape):
+        """ Returns the data trace buffer to fill next. The buffers are only reallocated if the
+        shape of the data trace changes.
+
+        @param tuple shape: shape of the data trace
+
+        @return numpy.ndarray: int64 buffer of the given shape
+        """
+        if self._trace_buffers is None or self._trace_buffers[0].shape != shape:
+            self._trace_buffers = (np.zeros(shape, dtype=np.int64),
+                                   np.zeros(shape, dtype=np.int64))
+        self._trace_index = 1 - self._trace_index
+        return self._trace_buffers[self._trace_index]
+
+    # =========================================================================
+    # TTTR streaming (T2 and T3 mode)
+    # =========================================================================
+
+    def _is_tttr_mode(self):
+        return self._mode in (self.MODE_T2, self.MODE_T3)
+
+    def _create_reader(self):
+        """ Creates the ring buffer and the thread streaming the FIFO into it.
+        """
+        self._ring_buffer = TTTRRingBuffer(max(2, int(self._ring_buffer_reads)), self.TTREADMAX)
+        self._reader_thread = QtCore.QThread()
+        self._reader = TTTRStreamReader(self._read_fifo, self._ring_buffer,
+                                        self._accumulate_records)
+        self._reader.moveToThread(self._reader_thread)
+        self.sigStartReading.connect(self._reader.start_reading, QtCore.Qt.QueuedConnection)
+        self.sigStopReading.connect(self._reader.stop_reading, QtCore.Qt.BlockingQueuedConnection)
+        self._reader_thread.start()
+        return
+
+    def _configure_tttr(self, bin_width_s, record_length_s, number_of_gates):
+        """ Configures the histogram of the streamed records. See configure.
+        """
+        if self._mode == self.MODE_T3:
+            bin_width_s = self.set_binwidth(bin_width_s)
+            decoder = HydraHarpT3Decoder(bin_width_s * 1e12)
+        else:
+            bin_width_s = max(1, int(round(bin_width_s * 1e12))) * 1e-12
+            decoder = HydraHarpT2Decoder()
+        if self.gated:
+            # add time to account for AOM delay
+            number_of_bins = int((record_length_s + self.aom_delay) / bin_width_s)
+        else:
+            # subtract time to make sure no sequence trigger is missed
+            number_of_bins = int((record_length_s - self.trigger_safety) / bin_width_s)
+            number_of_gates = 0
+        number_of_bins = max(1, number_of_bins)
+
+        histogrammer = TTTRHistogrammer(bin_width_ps=int(round(bin_width_s * 1e12)),
+                                        number_of_bins=number_of_bins,
+                                        number_of_gates=number_of_gates if number_of_gates else 0,
+                                        channels=self._photon_channels,
+                                        sequence_marker=self._sequence_marker)
+        with self._histogram_lock:
+            self._decoder = decoder
+            self._histogrammer = histogrammer
+        self.bins_num = number_of_bins
+        return bin_width_s, number_of_bins * bin_width_s, number_of_gates
+
+    def _read_fifo(self, buffer):
+        """ Reads the FIFO into a slot of the ring buffer. Called in the reader thread.
+
+        @param numpy.ndarray buffer: uint32 array of at least TTREADMAX records
+
+        @return int: number of records read
+        """
+        number_of_records = ctypes.c_int()
+        self.tryfunc(self.dll.HH_ReadFiFo(self._deviceID, buffer.ctypes.data, self.TTREADMAX,
+                                          ctypes.byref(number_of_records)), "ReadFiFo")
+        return number_of_records.value
+
+    def _accumulate_records(self):
+        """ Adds all records pending in the ring buffer to the histogram in place.
+        """
+        with self._histogram_lock:
+            while True:
+                records = self._ring_buffer.oldest_records()
+                if records is None:
+                    break
+                self._histogrammer.add(self._decoder.decode(records))
+                self._ring_buffer.release()
+        return
+
     def get_measurement_time(self):
         t = ctypes.c_double()  # in ms unit
         self.dll.HH_GetElapsedMeasTime(self._deviceID, ctypes.byref(t))
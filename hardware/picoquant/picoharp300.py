@@ -32,6 +32,8 @@ from interface.slow_counter_interface import SlowCounterInterface
 from interface.slow_counter_interface import SlowCounterConstraints
 from interface.slow_counter_interface import CountingMode
 from interface.fast_counter_interface import FastCounterInterface
+from hardware.picoquant.tttr import PicoHarpT2Decoder, PicoHarpT3Decoder
+from hardware.picoquant.tttr import TTTRHistogrammer, TTTRReadoutWorker
 
 # =============================================================================
 # Wrapper around the PHLib.DLL. The current file is based on the header files
@@ -99,15 +101,22 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
         module.Class: 'picoquant.picoharp300.PicoHarp300'
         deviceID: 0 # a device index from 0 to 7.
         mode: 0 # 0: histogram mode, 2: T2 mode, 3: T3 mode
-        
+        gated: False # gated fast counter, each sync starts a gate
+        sequence_marker: None # optional marker bit mask starting a sweep of gates
+        photon_channels: None # optional list of detector channels to count (all if None)
+
+    As fast counter the device has to be in T2 or T3 mode. The photons are histogrammed relative
+    to the preceding sync in a separate thread.
     """
 
     _deviceID = ConfigOption('deviceID', 0, missing='warn') # a device index from 0 to 7.
     _mode = ConfigOption('mode', 0, missing='warn')
+    _gated = ConfigOption('gated', False, missing='nothing')
+    _sequence_marker = ConfigOption('sequence_marker', None, missing='nothing')
+    _photon_channels = ConfigOption('photon_channels', None, missing='nothing')
 
-    sigReadoutPicoharp = QtCore.Signal()
-    sigAnalyzeData = QtCore.Signal(object, object)
-    sigStart = QtCore.Signal()
+    sigStartReadout = QtCore.Signal()
+    sigStopReadout = QtCore.Signal()
 
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
@@ -128,6 +137,15 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
         # Just some default values:
         self._bin_width_ns = 3000
         self._record_length_ns = 100 *1e9
+        self._number_of_gates = 0
+
+        # TTTR readout for the fast counter
+        self.meas_run = False
+        self._start_time = 0
+        self._elapsed_time = 0
+        self._fifo_buffer = np.zeros(self.TTREADMAX, dtype=np.uint32)
+        self._readout_thread = None
+        self._readout_worker = None
 
         self._photon_source2 = None #for compatibility reasons with second APD
         self._count_channel = 1
@@ -147,22 +165,31 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
         # One need still to include this in the config.
         self.set_input_CFD(1,10,7)
 
-        # the signal has one argument of type object, which should allow
-        # anything to pass through:
-
-        self.sigStart.connect(self.start_measure)
-        self.sigReadoutPicoharp.connect(self.get_fresh_data_loop, QtCore.Qt.QueuedConnection) # ,QtCore.Qt.QueuedConnection
-        self.sigAnalyzeData.connect(self.analyze_received_data, QtCore.Qt.QueuedConnection)
-        self.result = []
+        # The TTTR records are read and histogrammed in a separate thread
+        self._readout_thread = QtCore.QThread()
+        self._readout_worker = TTTRReadoutWorker(self._read_fifo_records, None, None)
+        self._readout_worker.moveToThread(self._readout_thread)
+        self.sigStartReadout.connect(self._readout_worker.start_readout,
+                                     QtCore.Qt.QueuedConnection)
+        # Blocks until the readout has stopped, so no FIFO read is in progress afterwards
+        self.sigStopReadout.connect(self._readout_worker.stop_readout,
+                                    QtCore.Qt.BlockingQueuedConnection)
+        self._readout_thread.start()
 
 
     def on_deactivate(self):
         """ Deactivates and disconnects the device.
         """
+        if self.module_state() == 'locked':
+            self.stop_measure()
+        self.sigStartReadout.disconnect()
+        self.sigStopReadout.disconnect()
+        self._readout_thread.quit()
+        self._readout_thread.wait()
+        self._readout_thread = None
+        self._readout_worker = None
 
         self.close_connection()
-        self.sigReadoutPicoharp.disconnect()
-        self.sigAnalyzeData.disconnect()
 
     def _create_errorcode(self):
         """ Create a dictionary with the errorcode for the device.
@@ -1055,31 +1082,45 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
     #  Functions for the FastCounter Interface
     # =========================================================================
 
-    #FIXME: The interface connection to the fast counter must be established!
+    def configure(self, bin_width_s, record_length_s, number_of_gates=0):
+        """ Configuration of the fast counter. Only available in T2 and T3 mode.
 
-    def configure(self, bin_width_ns, record_length_ns, number_of_gates = 0):
-        """
-        Configuration of the fast counter.
-        bin_width_ns: Length of a single time bin in the time trace histogram
-                      in nanoseconds.
-        record_length_ns: Total length of the timetrace/each single gate in
-                          nanoseconds.
-        number_of_gates: Number of gates in the pulse sequence. Ignore for
-                         ungated counter.
+        @param float bin_width_s: Length of a single time bin in the time trace histogram in
+                                  seconds. Rounded to a multiple of the TTTR resolution.
+        @param float record_length_s: Total length of the timetrace/each single gate in seconds.
+        @param int number_of_gates: Number of gates in the pulse sequence. Ignored for the
+                                    ungated counter.
+
+        @return tuple(binwidth_s, record_length_s, number_of_gates): the actually set values
         """
-        #        self.initialize(mode=3)
-        self._bin_width_ns = bin_width_ns
-        self._record_length_ns = record_length_ns
-        self._number_of_gates = number_of_gates
+        if self._mode == self.MODE_T3:
+            resolution_ps = self.get_resolution()
+            decoder = PicoHarpT3Decoder(resolution_ps)
+        elif self._mode == self.MODE_T2:
+            resolution_ps = PicoHarpT2Decoder.resolution_ps
+            decoder = PicoHarpT2Decoder()
+        else:
+            self.log.error('PicoHarp: The fast counter is only available in T2 or T3 mode, but '
+                           'mode {0} is configured.'.format(self._mode))
+            return self.get_binwidth(), self._record_length_ns * 1e-9, self._number_of_gates
 
-        #FIXME: actualle only an unsigned array will be needed. Change that later.
-        #        self.data_trace = np.zeros(number_of_gates, dtype=np.int64 )
-        self.data_trace = [0]*number_of_gates
-        self.count = 0
+        bin_width_ps = max(1, int(round(bin_width_s * 1e12 / resolution_ps))) * resolution_ps
+        number_of_bins = max(1, int(np.ceil(record_length_s * 1e12 / bin_width_ps)))
+        number_of_gates = int(number_of_gates) if self._gated else 0
 
-        self.result = []
-        self.initialize(2)
-        return
+        self._bin_width_ns = bin_width_ps / 1000
+        self._record_length_ns = number_of_bins * self._bin_width_ns
+        self._number_of_gates = number_of_gates
+
+        histogrammer = TTTRHistogrammer(bin_width_ps=bin_width_ps,
+                                        number_of_bins=number_of_bins,
+                                        number_of_gates=number_of_gates,
+                                        channels=self._photon_channels,
+                                        sequence_marker=self._sequence_marker)
+        with self._readout_worker.lock:
+            self._readout_worker.decoder = decoder
+            self._readout_worker.histogrammer = histogrammer
+        return self.get_binwidth(), self._record_length_ns * 1e-9, number_of_gates
 
     def get_status(self):
         """
@@ -1093,42 +1134,43 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
         """
         if not self.connected_to_device:
             return -1
-        else:
-            returnvalue = self._get_status()
-            if returnvalue == 0:
-                return 2
-            else:
-                return 1
-
+        if self._readout_worker.histogrammer is None:
+            return 0
+        if self.meas_run:
+            return 2
+        if self.module_state() == 'locked':
+            return 3
+        return 1
 
     def pause_measure(self):
         """
         Pauses the current measurement if the fast counter is in running state.
         """
-
-        self.stop_measure()
-        self.meas_run = False
+        if self.meas_run:
+            self._stop_readout()
+            self._elapsed_time += time.time() - self._start_time
+        return 0
 
     def continue_measure(self):
         """
         Continues the current measurement if the fast counter is in pause state.
         """
-        self.meas_run = True
-        self.start(self._record_length_ns/1e6)
+        if self.module_state() == 'locked' and not self.meas_run:
+            self._start_readout()
+        return 0
 
     def is_gated(self):
         """
         Boolean return value indicates if the fast counter is a gated counter
         (TRUE) or not (FALSE).
         """
-        return False
+        return self._gated
 
     def get_binwidth(self):
         """
         returns the width of a single timebin in the timetrace in seconds
         """
-        #FIXME: Must be implemented
-        return 2e-9
+        return self._bin_width_ns * 1e-9
 
     def get_data_trace(self):
         """
@@ -1141,166 +1183,74 @@ class PicoHarp300(Base, SlowCounterInterface, FastCounterInterface):
           - If the counter is gated it will return a 2D-numpy-array with
             returnarray[gate_index, timebin_index]
         """
-
-        info_dict = {'elapsed_sweeps': None,
-                     'elapsed_time': None}  # TODO : implement that according to hardware capabilities
-        return self.data_trace, info_dict
-
-    # =========================================================================
-    #  Test routine for continuous readout
-    # =========================================================================
-
+        elapsed_time = self._elapsed_time
+        if self.meas_run:
+            elapsed_time += time.time() - self._start_time
+        with self._readout_worker.lock:
+            data = self._readout_worker.histogrammer.histogram.copy()
+            info_dict = {'elapsed_sweeps': self._readout_worker.histogrammer.sweeps,
+                         'elapsed_time': elapsed_time}
+        return data, info_dict
 
     def start_measure(self):
         """
         Starts the fast counter.
         """
-        self.lock()
-
-        self.meas_run = True
-
-        # start the device:
-        self.start(int(self._record_length_ns/1e6))
-
-        self.sigReadoutPicoharp.emit()
+        if self._readout_worker.histogrammer is None:
+            self.log.error('PicoHarp: Fast counter is not configured.')
+            return -1
+        if self.module_state() == 'locked':
+            self.stop_measure()
+        self.module_state.lock()
+        with self._readout_worker.lock:
+            self._readout_worker.decoder.reset()
+            self._readout_worker.histogrammer.reset()
+            self._readout_worker.records_read = 0
+        self._elapsed_time = 0
+        self._start_readout()
+        return 0
 
     def stop_measure(self):
-        """ By setting the Flag, the measurement should stop.  """
-        self.meas_run = False
-
-
-    def get_fresh_data_loop(self):
-        """ This method will be run infinitely until the measurement stops. """
-
-        # for testing one can also take another array:
-        buffer, actual_counts = self.tttr_read_fifo()
-        #        buffer, actual_counts = [1,2,3,4,5,6,7,8,9], 9
-
-        # This analysis signel should be analyzed in a queued thread:
-        self.sigAnalyzeData.emit(buffer[0:actual_counts-1], actual_counts)
-
-        if not self.meas_run:
-            with self.threadlock:
-                self.unlock()
-                self.stop_device()
-                return
-
-        print('get new data.')
-        # get the next data:
-        self.sigReadoutPicoharp.emit()
-
-
-
-    def analyze_received_data(self, arr_data, actual_counts):
-        """ Analyze the actual data obtained from the TTTR mode of the device.
-
-        @param arr_data: numpy uint32 array with length 'actual_counts'.
-        @param actual_counts: int, number of read out events from the buffer.
-
-        Write the obtained arr_data to the predefined array data_trace,
-        initialized in the configure method.
-
-        The received array contains 32bit words. The bit assignment starts from
-        the MSB (most significant bit), which is here displayed as the most
-        left bit.
-
-        For T2 (initialized device with mode=2):
-        ----------------------------------------
-
-        [ 4 bit for channel-number |28 bit for time-tag] = [32 bit word]
-
-        channel-number: 4 marker, which serve for the different channels.
-                            0001 = marker 1
-                            0010 = marker 2
-                            0011 = marker 3
-                            0100 = marker 4
-
-                        The channel code 15 (all bits ones, 1111) marks a
-                        special record. Special records can be overflows or
-                        external markers. To differentiate this, the lower 4
-                        bits of timetag must be checked:
-                            - If they are all zero, the record marks an
-                              overflow.
-                            - If they are >=1 the individual bits are external
-                              markers.
-
-                        Overflow period: 210698240
-
-                        the first bit is the overflow bit. It will be set if
-                        the time-tag reached 2^28:
-
-                            0000 = overflow
-
-                        Afterwards both overflow marker and time-tag
-                        will be reseted. This overflow should be detected and
-                        the time axis should be adjusted accordingly.
-
-        time-tag: The resolution is fixed to 4ps. Within the time of
-                  4ps*2^28 = 1.073741824 ms
-                  another photon event should occur so that the time axis can
-                  be computed properly.
-
-        For T3 (initialized device with mode=3):
-        ----------------------------------------
-
-        [ 4 bit for channel-number | 12 bit for start-stop-time | 16 bit for sync counter] = [32 bit word]
-
-        channel-number: 4 marker, which serve for the different channels.
-                            0001 = marker 1
-                            0010 = marker 2
-                            0011 = marker 3
-                            0100 = marker 4
-
-                        the first bit is the overflow bit. It will be set if
-                        the sync-counter reached 65536 events:
-
-                            1000 = overflow
+        """ Stops the fast counter. The data of the measurement is kept.  """
+        if self.meas_run:
+            self._stop_readout()
+            self._elapsed_time += time.time() - self._start_time
+        if self.module_state() == 'locked':
+            self.module_state.unlock()
+        return 0
 
-                        Afterwards both, overflow marker and sync-counter
-                        will be reseted. This overflow should be detected and
-                        the time axis should be adjusted accordingly.
+    # =========================================================================
+    #  Continuous TTTR readout
+    # =========================================================================
 
-        start-stop-time: time between to consecutive sync pulses. Maximal time
-                         between two sync pulses is therefore limited to
-                             2^12 * Res
-                         where Res is the Resolution
-                             Res = {4,8,16,32,54,128,256,512} (in ps)
-                         For largest Resolution of 512ps you have 2097.152 ns.
-        sync-counter: can hold up to 2^16 = 65536 events. It that number is
-                      reached overflow will be set. That means all 4 bits in
-                      the channel-number are set to high (i.e. 1).
+    def _start_readout(self):
+        """ Starts the device and the FIFO readout in the readout thread.
         """
+        self.meas_run = True
+        self._start_time = time.time()
+        self.start(self.ACQTMAX)
+        self.sigStartReadout.emit()
+        return
 
-        # at first just a simple test
-        time.sleep(0.2)
-
-        self.data_trace[self.count] = actual_counts
-        self.count += 1
-
-        if self.count > self._number_of_gates-1:
-            self.count = 0
-
-        if actual_counts == self.TTREADMAX:
-            self.log.warning('Overflow!')
-
-        print('Data analyzed.')
-
-#        self.result = []
-#        for entry in arr_data[0:actual_counts-1]:
-#
-#            # apply three bitmasks to extract the relavent numbers:
-#            overflow = entry & (2**(32-1) )
-#            marker_ch = entry & (2**(32-2)  + 2**(32-3) + 2**(32-4))
-#            time_tag = entry & (2**32 -1 - 2**(32-1) + 2**(32-2) + 2**(32-3) + 2**(32-4))
-
-
-
-
-
-
-
-
-
+    def _stop_readout(self):
+        """ Stops the FIFO readout and the device. Records remaining in the FIFO are discarded
+        with the next start.
 
+        The readout is stopped in the readout thread first, so the device is not stopped during a
+        FIFO read and no read is added to the histogram after this method returns.
+        """
+        self.sigStopReadout.emit()
+        self.stop_device()
+        return
 
+    def _read_fifo_records(self):
+        """ Reads the FIFO into a buffer reused for every read.
 
+        @return tuple (buffer, actual_num_counts): see tttr_read_fifo
+        """
+        actual_num_counts = ctypes.c_int32()
+        self.check(self._dll.PH_ReadFiFo(self._deviceID, self._fifo_buffer.ctypes.data,
+                                         self.TTREADMAX, ctypes.byref(actual_num_counts)))
+        if actual_num_counts.value == self.TTREADMAX:
+            self.log.debug('PicoHarp: FIFO read returned the maximum number of records.')
+        return self._fifo_buffer, actual_num_counts.value
@@ -0,0 +1,674 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains vectorized decoders for the TTTR (time-tagged time-resolved) records of
+PicoQuant devices, a sync-referenced histogrammer feeding the FastCounterInterface data trace,
+FIFO readout helpers and generators of synthetic records to test them without hardware.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from qtpy import QtCore
+
+from core.util.mutex import Mutex
+
+
+class TTTREvents(namedtuple('TTTREvents', ['photon_sync', 'photon_delay', 'photon_channel',
+                                           'marker_sync', 'marker_bits'])):
+    """
+    Decoded TTTR records. All fields are 1D int64 numpy arrays.
+
+    photon_sync: index of the sync period of each photon counted from the start of the
+                 measurement (-1 if no sync has been recorded before the photon)
+    photon_delay: time between the start of the sync period and the photon in ps
+    photon_channel: detector channel of each photon
+    marker_sync: index of the sync period of each external marker record
+    marker_bits: bit mask of the external markers of each marker record
+    """
+    __slots__ = ()
+
+
+class PicoHarpT3Decoder:
+    """
+    Decodes PicoHarp 300 T3 records. The state needed to continue decoding with the next FIFO read
+    (number of sync counter overflows) is kept between calls of decode.
+
+    [ 4 bit channel | 12 bit start-stop time | 16 bit sync counter ] = [32 bit record]
+
+    Channel 15 marks a special record. A special record with a start-stop time of zero is a sync
+    counter overflow, otherwise the lower 4 bits of the start-stop time are external markers.
+    """
+    sync_wraparound = 2**16
+
+    def __init__(self, resolution_ps):
+        """
+        @param float resolution_ps: resolution of the start-stop time in ps
+        """
+        self.resolution_ps = resolution_ps
+        self._sync_overflows = 0
+        return
+
+    def reset(self):
+        self._sync_overflows = 0
+        return
+
+    def decode(self, records):
+        """
+        @param numpy.ndarray records: 1D uint32 array of raw T3 records
+
+        @return TTTREvents: the decoded records
+        """
+        records = np.asarray(records, dtype=np.uint32)
+        channel = (records >> 28).astype(np.int64)
+        dtime = ((records >> 16) & 0xFFF).astype(np.int64)
+        nsync = (records & 0xFFFF).astype(np.int64)
+
+        special = channel == 15
+        overflow = special & (dtime == 0)
+        overflows = np.cumsum(overflow) + self._sync_overflows
+        if overflows.size > 0:
+            self._sync_overflows = int(overflows[-1])
+        nsync += overflows * self.sync_wraparound
+
+        photon = ~special
+        marker = special & ~overflow
+        return TTTREvents(photon_sync=nsync[photon],
+                          photon_delay=np.rint(dtime[photon] * self.resolution_ps).astype(np.int64),
+                          photon_channel=channel[photon],
+                          marker_sync=nsync[marker],
+                          marker_bits=dtime[marker] & 0xF)
+
+
+class PicoHarpT2Decoder:
+    """
+    Decodes PicoHarp 300 T2 records. Channel 0 is the sync input. The time of each photon is
+    referenced to the preceding sync record. The state needed to continue decoding with the next
+    FIFO read (time tag overflows, time and number of the last sync) is kept between calls of
+    decode.
+
+    [ 4 bit channel | 28 bit time tag ] = [32 bit record]
+
+    Channel 15 marks a special record. A special record with the lower 4 bits of the time tag
+    being zero is a time tag overflow, otherwise these bits are external markers.
+    """
+    resolution_ps = 4
+    time_wraparound = 210698240
+
+    def __init__(self):
+        self._time_overflows = 0
+        self._last_sync_time = -1
+        self._sync_count = 0
+        return
+
+    def reset(self):
+        self._time_overflows = 0
+        self._last_sync_time = -1
+        self._sync_count = 0
+        return
+
+    def decode(self, records):
+        """
+        @param numpy.ndarray records: 1D uint32 array of raw T2 records
+
+        @return TTTREvents: the decoded records
+        """
+        records = np.asarray(records, dtype=np.uint32)
+        channel = (records >> 28).astype(np.int64)
+        timetag = (records & 0x0FFFFFFF).astype(np.int64)
+
+        special = channel == 15
+        marker_bits = timetag & 0xF
+        overflow = special & (marker_bits == 0)
+        overflows = np.cumsum(overflow) + self._time_overflows
+        if overflows.size > 0:
+            self._time_overflows = int(overflows[-1])
+        timetag += overflows * self.time_wraparound
+        return self._sync_referenced_events(timetag, channel == 0, ~special & (channel != 0),
+                                            channel, special & ~overflow, marker_bits)
+
+    def _sync_referenced_events(self, timetag, sync, photon, channel, marker, marker_bits):
+        """ References the photon times to the preceding sync and numbers the sync periods.
+
+        @param numpy.ndarray timetag: time tag of each record including overflows
+        @param numpy.ndarray sync: bool mask of the sync records
+        @param numpy.ndarray photon: bool mask of the photon records
+        @param numpy.ndarray channel: detector channel of each record
+        @param numpy.ndarray marker: bool mask of the marker records
+        @param numpy.ndarray marker_bits: marker bit mask of each record
+
+        @return TTTREvents: the decoded records
+        """
+        sync_times = timetag[sync]
+        photon_times = timetag[photon]
+
+        # Index of the sync preceding each photon and marker. -1 refers to the last sync of the
+        # previous FIFO read.
+        photon_index = np.searchsorted(sync_times, photon_times, side='right') - 1
+        marker_index = np.searchsorted(sync_times, timetag[marker], side='right') - 1
+        start_times = np.concatenate(([self._last_sync_time], sync_times))[photon_index + 1]
+        photon_sync = photon_index + self._sync_count
+        photon_sync[start_times < 0] = -1
+
+        events = TTTREvents(photon_sync=photon_sync,
+                            photon_delay=(photon_times - start_times) * self.resolution_ps,
+                            photon_channel=channel[photon],
+                            marker_sync=marker_index + self._sync_count,
+                            marker_bits=marker_bits[marker])
+        if sync_times.size > 0:
+            self._last_sync_time = int(sync_times[-1])
+            self._sync_count += sync_times.size
+        return events
+
+
+class HydraHarpT3Decoder(PicoHarpT3Decoder):
+    """
+    Decodes HydraHarp 400 T3 records (record format version 2).
+
+    [ 1 bit special | 6 bit channel | 15 bit start-stop time | 10 bit sync counter ]
+
+    A special record with channel 63 is a sync counter overflow. Its sync counter holds the number
+    of overflows. Special records with channel 1 to 15 are external markers (channel = marker bit
+    mask). Photon channels are numbered starting from 1.
+    """
+    sync_wraparound = 2**10
+
+    def decode(self, records):
+        """
+        @param numpy.ndarray records: 1D uint32 array of raw T3 records
+
+        @return TTTREvents: the decoded records
+        """
+        records = np.asarray(records, dtype=np.uint32)
+        special = (records >> 31).astype(bool)
+        channel = ((records >> 25) & 0x3F).astype(np.int64)
+        dtime = ((records >> 10) & 0x7FFF).astype(np.int64)
+        nsync = (records & 0x3FF).astype(np.int64)
+
+        overflow = special & (channel == 0x3F)
+        overflows = np.cumsum(np.where(overflow, np.maximum(nsync, 1), 0)) + self._sync_overflows
+        if overflows.size > 0:
+            self._sync_overflows = int(overflows[-1])
+        nsync += overflows * self.sync_wraparound
+
+        photon = ~special
+        marker = special & (channel >= 1) & (channel <= 15)
+        return TTTREvents(photon_sync=nsync[photon],
+                          photon_delay=np.rint(dtime[photon] * self.resolution_ps).astype(np.int64),
+                          photon_channel=channel[photon] + 1,
+                          marker_sync=nsync[marker],
+                          marker_bits=channel[marker])
+
+
+class HydraHarpT2Decoder(PicoHarpT2Decoder):
+    """
+    Decodes HydraHarp 400 T2 records (record format version 2). The time of each photon is
+    referenced to the preceding sync record.
+
+    [ 1 bit special | 6 bit channel | 25 bit time tag ]
+
+    A special record with channel 63 is a time tag overflow. Its time tag holds the number of
+    overflows. A special record with channel 0 is a sync, special records with channel 1 to 15 are
+    external markers (channel = marker bit mask). Photon channels are numbered starting from 1.
+    """
+    resolution_ps = 1
+    time_wraparound = 2**25
+
+    def decode(self, records):
+        """
+        @param numpy.ndarray records: 1D uint32 array of raw T2 records
+
+        @return TTTREvents: the decoded records
+        """
+        records = np.asarray(records, dtype=np.uint32)
+        special = (records >> 31).astype(bool)
+        channel = ((records >> 25) & 0x3F).astype(np.int64)
+        timetag = (records & 0x1FFFFFF).astype(np.int64)
+
+        overflow = special & (channel == 0x3F)
+        overflows = np.cumsum(np.where(overflow, np.maximum(timetag, 1), 0)) + self._time_overflows
+        if overflows.size > 0:
+            self._time_overflows = int(overflows[-1])
+        timetag += overflows * self.time_wraparound
+
+        marker = special & (channel >= 1) & (channel <= 15)
+        return self._sync_referenced_events(timetag, special & (channel == 0), ~special,
+                                            channel + 1, marker, channel)
+
+
+class TTTRHistogrammer:
+    """
+    Accumulates the photons of decoded TTTR records into a sync-referenced histogram of the shape
+    required by the FastCounterInterface.
+
+    Ungated: Each sync starts a sweep. The histogram holds the photon delays after the sync.
+    Gated: Each sync starts a gate. The gate index is the number of syncs since the start of the
+           sweep. A sweep starts with each external marker matching sequence_marker. Without a
+           sequence marker every number_of_gates syncs start a new sweep, counted from the first
+           sync of the measurement.
+
+    The histogram (int64) is allocated once and accumulated in place. Adding records only
+    allocates arrays proportional to the number of records.
+    """
+
+    def __init__(self, bin_width_ps, number_of_bins, number_of_gates=0, channels=None,
+                 sequence_marker=None):
+        """
+        @param int bin_width_ps: width of a histogram bin in ps
+        @param int number_of_bins: number of bins of the histogram (of each gate)
+        @param int number_of_gates: number of gates of a sweep. 0 for ungated histograms
+        @param list channels: optional, detector channels to count. All if None
+        @param int sequence_marker: optional, marker bit mask starting a sweep (gated only)
+        """
+        self.bin_width_ps = int(bin_width_ps)
+        self.number_of_bins = int(number_of_bins)
+        self.number_of_gates = int(number_of_gates)
+        self.channels = None if channels is None else np.asarray(channels, dtype=np.int64)
+        self.sequence_marker = sequence_marker
+        if self.number_of_gates > 0:
+            self.histogram = np.zeros((self.number_of_gates, self.number_of_bins), dtype=np.int64)
+        else:
+            self.histogram = np.zeros(self.number_of_bins, dtype=np.int64)
+        self.sweeps = 0
+        self._last_sweep_start = -1
+        self._last_sync = -1
+        return
+
+    def reset(self):
+        self.histogram[...] = 0
+        self.sweeps = 0
+        self._last_sweep_start = -1
+        self._last_sync = -1
+        return
+
+    def add(self, events):
+        """ Adds the photons of decoded records to the histogram.
+
+        @param TTTREvents events: the decoded records
+        """
+        sync = events.photon_sync
+        time_bin = events.photon_delay // self.bin_width_ps
+        valid = (sync >= 0) & (time_bin >= 0) & (time_bin < self.number_of_bins)
+        if self.channels is not None:
+            valid &= np.isin(events.photon_channel, self.channels)
+
+        if self.number_of_gates > 0:
+            if self.sequence_marker is None:
+                gate = sync % self.number_of_gates
+                if sync.size > 0:
+                    self.sweeps = max(self.sweeps, int(sync.max()) // self.number_of_gates + 1)
+            else:
+                starts = events.marker_sync[(events.marker_bits & self.sequence_marker) != 0]
+                start_index = np.searchsorted(starts, sync, side='right') - 1
+                sweep_start = np.concatenate(([self._last_sweep_start], starts))[start_index + 1]
+                gate = sync - sweep_start
+                valid &= sweep_start >= 0
+                if starts.size > 0:
+                    self._last_sweep_start = int(starts[-1])
+                    self.sweeps += starts.size
+            valid &= gate < self.number_of_gates
+            flat_index = gate[valid] * self.number_of_bins + time_bin[valid]
+        else:
+            flat_index = time_bin[valid]
+            if sync.size > 0:
+                self._last_sync = max(self._last_sync, int(sync.max()))
+                self.sweeps = self._last_sync + 1
+
+        if flat_index.size > 0:
+            # Counts equal bins of the sorted photons, so no temporary array of the size of the
+            # histogram is needed (np.bincount would allocate one).
+            flat_index.sort()
+            starts = np.flatnonzero(flat_index[1:] != flat_index[:-1]) + 1
+            counts = np.diff(np.concatenate(([0], starts, [flat_index.size])))
+            self.histogram.reshape(-1)[flat_index[np.concatenate(([0], starts))]] += counts
+        return
+
+
+class TTTRReadoutWorker(QtCore.QObject):
+    """
+    Reads TTTR records from the device FIFO in its own thread and accumulates them into a
+    TTTRHistogrammer until stopped.
+
+    Each FIFO read is queued in the event loop of the worker thread with the number of the
+    readout run it belongs to. Starting or stopping the readout begins a new run, so reads still
+    queued from a previous run are dropped and only one chain of reads is active.
+    """
+    _sigReadFifo = QtCore.Signal(int)
+
+    def __init__(self, read_method, decoder, histogrammer):
+        """
+        @param callable read_method: Returns a tuple of a uint32 record buffer and the number of
+                                     valid records in it
+        @param decoder: decoder of the records (e.g. PicoHarpT3Decoder)
+        @param TTTRHistogrammer histogrammer: histogram the photons are accumulated in
+        """
+        super().__init__()
+        self._read_method = read_method
+        self.decoder = decoder
+        self.histogrammer = histogrammer
+        self.lock = Mutex()
+        self.records_read = 0
+        self._run = 0
+        self._running = False
+        self._sigReadFifo.connect(self._read_fifo, QtCore.Qt.QueuedConnection)
+        return
+
+    @QtCore.Slot()
+    def start_readout(self):
+        self._run += 1
+        self._running = True
+        self._sigReadFifo.emit(self._run)
+        return
+
+    @QtCore.Slot()
+    def stop_readout(self):
+        """ Stops reading. Call through a blocking queued connection from other threads, so no
+        FIFO read is in progress once the call returns.
+        """
+        self._run += 1
+        self._running = False
+        return
+
+    @QtCore.Slot(int)
+    def _read_fifo(self, run):
+        if not self._running or run != self._run:
+            return
+        buffer, number_of_records = self._read_method()
+        events = self.decoder.decode(buffer[:number_of_records])
+        with self.lock:
+            self.histogrammer.add(events)
+            self.records_read += number_of_records
+        # Continue through the event loop, so stop requests are processed
+        self._sigReadFifo.emit(run)
+        return
+
+
+class TTTRRingBuffer:
+    """
+    Preallocated ring buffer of FIFO reads. Each slot holds the records of one FIFO read, so the
+    device can read directly into the buffer. One thread fills the slots, another one consumes
+    them in the same order.
+    """
+
+    def __init__(self, number_of_slots, slot_size):
+        """
+        @param int number_of_slots: number of FIFO reads the buffer can hold
+        @param int slot_size: maximum number of records of a single FIFO read
+        """
+        self.records = np.zeros((number_of_slots, slot_size), dtype=np.uint32)
+        self._counts = np.zeros(number_of_slots, dtype=np.int64)
+        self._lock = Mutex()
+        self._written = 0
+        self._consumed = 0
+        return
+
+    @property
+    def number_of_slots(self):
+        return self.records.shape[0]
+
+    def reset(self):
+        """ Discards all pending records. Must not be called while a slot is being filled.
+        """
+        with self._lock:
+            self._written = 0
+            self._consumed = 0
+        return
+
+    def free_slot(self):
+        """
+        @return numpy.ndarray: the slot to fill next (None if the buffer is full)
+        """
+        with self._lock:
+            if self._written - self._consumed >= self.number_of_slots:
+                return None
+            return self.records[self._written % self.number_of_slots]
+
+    def commit(self, number_of_records):
+        """ Marks the slot returned by free_slot as filled.
+
+        @param int number_of_records: number of valid records in the slot
+        """
+        with self._lock:
+            self._counts[self._written % self.number_of_slots] = number_of_records
+            self._written += 1
+        return
+
+    def oldest_records(self):
+        """ The slot stays occupied until release is called.
+
+        @return numpy.ndarray: the valid records of the oldest filled slot (None if empty)
+        """
+        with self._lock:
+            if self._consumed == self._written:
+                return None
+            slot = self._consumed % self.number_of_slots
+            return self.records[slot, :self._counts[slot]]
+
+    def release(self):
+        """ Frees the slot returned by oldest_records.
+        """
+        with self._lock:
+            self._consumed += 1
+        return
+
+
+class TTTRStreamReader(QtCore.QObject):
+    """
+    Reads the device FIFO into a TTTRRingBuffer in its own thread until stopped. If the ring
+    buffer is full, the consumer callback is called to make room.
+
+    Like in TTTRReadoutWorker, each FIFO read is queued with the number of its reading run, so
+    reads queued from a previous run are dropped.
+    """
+    _sigReadFifo = QtCore.Signal(int)
+
+    def __init__(self, read_method, ring_buffer, consume_method):
+        """
+        @param callable read_method: Reads the FIFO into the numpy.ndarray passed as argument and
+                                     returns the number of records read
+        @param TTTRRingBuffer ring_buffer: buffer the records are written to
+        @param callable consume_method: Consumes the pending records of the ring buffer
+        """
+        super().__init__()
+        self._read_method = read_method
+        self.ring_buffer = ring_buffer
+        self._consume_method = consume_method
+        self.records_read = 0
+        self._run = 0
+        self._running = False
+        self._sigReadFifo.connect(self._read_fifo, QtCore.Qt.QueuedConnection)
+        return
+
+    @QtCore.Slot()
+    def start_reading(self):
+        self._run += 1
+        self._running = True
+        self._sigReadFifo.emit(self._run)
+        return
+
+    @QtCore.Slot()
+    def stop_reading(self):
+        """ Stops reading. Call through a blocking queued connection from other threads, so no
+        slot of the ring buffer is being filled once the call returns.
+        """
+        self._run += 1
+        self._running = False
+        return
+
+    @QtCore.Slot(int)
+    def _read_fifo(self, run):
+        if not self._running or run != self._run:
+            return
+        slot = self.ring_buffer.free_slot()
+        if slot is None:
+            self._consume_method()
+            slot = self.ring_buffer.free_slot()
+            if slot is None:
+                self._sigReadFifo.emit(run)
+                return
+        number_of_records = self._read_method(slot)
+        if number_of_records > 0:
+            self.ring_buffer.commit(number_of_records)
+            self.records_read += number_of_records
+        # Continue through the event loop, so stop requests are processed
+        self._sigReadFifo.emit(run)
+        return
+
+
+def generate_picoharp_t3_records(number_of_syncs, photon_probability, delays_ps,
+                                 resolution_ps=4, sequence_marker=None, sequence_length=0,
+                                 channel=1, seed=None):
+    """
+    Generates synthetic PicoHarp 300 T3 records for testing without hardware.
+
+    @param int number_of_syncs: number of sync periods to simulate
+    @param float photon_probability: probability of a photon in each sync period
+    @param callable|float delays_ps: photon delay after the sync in ps. Either a constant or a
+                                     callable returning n random delays when called with n
+    @param float resolution_ps: resolution of the start-stop time in ps
+    @param int sequence_marker: optional, marker bit mask written every sequence_length syncs
+    @param int sequence_length: number of syncs between two sequence markers
+    @param int channel: detector channel of the photons
+    @param int seed: optional, seed of the random number generator
+
+    @return numpy.ndarray: 1D uint32 array of T3 records
+    """
+    rng = np.random.RandomState(seed)
+    photon_sync = np.flatnonzero(rng.random_sample(number_of_syncs) < photon_probability)
+    if callable(delays_ps):
+        delays = np.asarray(delays_ps(photon_sync.size), dtype=float)
+    else:
+        delays = np.full(photon_sync.size, delays_ps, dtype=float)
+    dtime = np.clip(np.rint(delays / resolution_ps), 0, 0xFFF).astype(np.int64)
+    photon_records = ((channel << 28) | (dtime << 16) | (photon_sync % 2**16)).astype(np.uint32)
+
+    overflow_sync = np.arange(1, (number_of_syncs - 1) // 2**16 + 1, dtype=np.int64) * 2**16
+    overflow_records = np.full(overflow_sync.size, 0xF0000000, dtype=np.uint32)
+
+    if sequence_marker and sequence_length > 0:
+        marker_sync = np.arange(0, number_of_syncs, sequence_length, dtype=np.int64)
+        marker_records = ((15 << 28) | (sequence_marker << 16) | (marker_sync % 2**16)).astype(
+            np.uint32)
+    else:
+        marker_sync = np.empty(0, dtype=np.int64)
+        marker_records = np.empty(0, dtype=np.uint32)
+
+    # overflows come first in their sync period, then markers, then photons
+    order_key = np.concatenate((overflow_sync * 3, marker_sync * 3 + 1, photon_sync * 3 + 2))
+    records = np.concatenate((overflow_records, marker_records, photon_records))
+    return records[np.argsort(order_key, kind='mergesort')]
+
+
+def generate_picoharp_t2_records(number_of_syncs, sync_period_ps, photon_probability, delays_ps,
+                                 sequence_marker=None, sequence_length=0, channel=1, seed=None):
+    """
+    Generates synthetic PicoHarp 300 T2 records for testing without hardware. The sync is
+    recorded on channel 0.
+
+    @param int number_of_syncs: number of sync periods to simulate
+    @param int sync_period_ps: time between two syncs in ps
+    @param float photon_probability: probability of a photon in each sync period
+    @param callable|float delays_ps: photon delay after the sync in ps. Either a constant or a
+                                     callable returning n random delays when called with n
+    @param int sequence_marker: optional, marker bit mask written every sequence_length syncs
+    @param int sequence_length: number of syncs between two sequence markers
+    @param int channel: detector channel of the photons
+    @param int seed: optional, seed of the random number generator
+
+    @return numpy.ndarray: 1D uint32 array of T2 records
+    """
+    resolution = PicoHarpT2Decoder.resolution_ps
+    wraparound = PicoHarpT2Decoder.time_wraparound
+    rng = np.random.RandomState(seed)
+    period = int(round(sync_period_ps / resolution))
+    sync_times = np.arange(number_of_syncs, dtype=np.int64) * period
+
+    photon_sync = np.flatnonzero(rng.random_sample(number_of_syncs) < photon_probability)
+    if callable(delays_ps):
+        delays = np.asarray(delays_ps(photon_sync.size), dtype=float)
+    else:
+        delays = np.full(photon_sync.size, delays_ps, dtype=float)
+    photon_times = sync_times[photon_sync] + np.clip(np.rint(delays / resolution), 0, period - 1)
+    photon_times = photon_times.astype(np.int64)
+
+    if sequence_marker and sequence_length > 0:
+        # Markers replace the lowest 4 time tag bits, so they are placed 16 units after the sync
+        marker_times = sync_times[::sequence_length] + 16
+    else:
+        marker_times = np.empty(0, dtype=np.int64)
+
+    end_time = max(sync_times[-1] if number_of_syncs > 0 else 0,
+                   photon_times.max() if photon_times.size > 0 else 0,
+                   marker_times.max() if marker_times.size > 0 else 0)
+    overflow_times = np.arange(1, end_time // wraparound + 1, dtype=np.int64) * wraparound
+
+    times = np.concatenate((overflow_times, sync_times, marker_times, photon_times))
+    channels = np.concatenate((np.full(overflow_times.size, 15, dtype=np.int64),
+                               np.zeros(sync_times.size, dtype=np.int64),
+                               np.full(marker_times.size, 15, dtype=np.int64),
+                               np.full(photon_times.size, channel, dtype=np.int64)))
+    timetags = times % wraparound
+    timetags[:overflow_times.size] = 0
+    if marker_times.size > 0:
+        marker_slice = slice(overflow_times.size + sync_times.size,
+                             overflow_times.size + sync_times.size + marker_times.size)
+        timetags[marker_slice] = (timetags[marker_slice] & ~0xF) | sequence_marker
+    # overflows come first, then records in the order of their time
+    order_key = np.concatenate((overflow_times * 2, times[overflow_times.size:] * 2 + 1))
+    order = np.argsort(order_key, kind='mergesort')
+    return ((channels[order] << 28) | timetags[order]).astype(np.uint32)
+
+
+def generate_hydraharp_t3_records(number_of_syncs, photon_probability, delays_ps,
+                                  resolution_ps=1, sequence_marker=None, sequence_length=0,
+                                  channel=1, seed=None):
+    """
+    Generates synthetic HydraHarp 400 T3 records (format version 2) for testing without hardware.
+    Every sync counter wraparound is written as a separate overflow record.
+
+    For the parameters see generate_picoharp_t3_records.
+
+    @return numpy.ndarray: 1D uint32 array of T3 records
+    """
+    wraparound = HydraHarpT3Decoder.sync_wraparound
+    rng = np.random.RandomState(seed)
+    photon_sync = np.flatnonzero(rng.random_sample(number_of_syncs) < photon_probability)
+    if callable(delays_ps):
+        delays = np.asarray(delays_ps(photon_sync.size), dtype=float)
+    else:
+        delays = np.full(photon_sync.size, delays_ps, dtype=float)
+    dtime = np.clip(np.rint(delays / resolution_ps), 0, 0x7FFF).astype(np.int64)
+    photon_records = (((channel - 1) << 25) | (dtime << 10) | (photon_sync % wraparound)).astype(
+        np.uint32)
+
+    overflow_sync = np.arange(1, (number_of_syncs - 1) // wraparound + 1, dtype=np.int64)
+    overflow_sync *= wraparound
+    overflow_records = np.full(overflow_sync.size, (1 << 31) | (0x3F << 25) | 1, dtype=np.uint32)
+
+    if sequence_marker and sequence_length > 0:
+        marker_sync = np.arange(0, number_of_syncs, sequence_length, dtype=np.int64)
+        marker_records = ((1 << 31) | (sequence_marker << 25) | (marker_sync % wraparound)).astype(
+            np.uint32)
+    else:
+        marker_sync = np.empty(0, dtype=np.int64)
+        marker_records = np.empty(0, dtype=np.uint32)
+
+    # overflows come first in their sync period, then markers, then photons
+    order_key = np.concatenate((overflow_sync * 3, marker_sync * 3 + 1, photon_sync * 3 + 2))
+    records = np.concatenate((overflow_records, marker_records, photon_records))
+    return records[np.argsort(order_key, kind='mergesort')]
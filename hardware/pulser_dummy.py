@@ -21,6 +21,7 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 """
 
 import time
+import numpy as np
 from collections import OrderedDict
 
 from core.module import Base
@@ -72,6 +73,10 @@ class PulserDummy(Base, PulserInterface):
 
         self.waveform_set = set()
         self.sequence_dict = dict()
+        # Rising and falling flanks of the digital channels for each written waveform, used by
+        # the fast counter dummy to simulate the photon counts of the loaded waveform.
+        self._waveform_flanks = dict()
+        self._chunk_flanks = dict()
 
         self.current_loaded_assets = dict()
 
@@ -313,6 +318,12 @@ class PulserDummy(Base, PulserInterface):
                 waveforms.append(name + chnl[1:])
                 time.sleep(number_of_samples * 8 / 1024 ** 3)
 
+        self._record_flanks(digital_samples, is_first_chunk, is_last_chunk)
+        if is_last_chunk:
+            flanks = (self._chunk_flanks['flanks'], self._chunk_flanks['offset'])
+            for waveform in waveforms:
+                self._waveform_flanks[waveform] = flanks
+
         self.waveform_set.update(waveforms)
 
         self.log.info('Waveforms with nametag "{0}" directly written on dummy pulser.'.format(name))
@@ -374,6 +385,7 @@ class PulserDummy(Base, PulserInterface):
         for waveform in waveform_name:
             if waveform in self.waveform_set:
                 self.waveform_set.remove(waveform)
+                self._waveform_flanks.pop(waveform, None)
                 deleted_waveforms.append(waveform)
 
         return deleted_waveforms
@@ -535,6 +547,7 @@ class PulserDummy(Base, PulserInterface):
         """
         self.current_loaded_assets = dict()
         self.waveform_set = set()
+        self._waveform_flanks = dict()
         self.sequence_dict = dict()
         return 0
 
@@ -914,3 +927,66 @@ class PulserDummy(Base, PulserInterface):
         self.connected = True
         self.log.info('Dummy reset!')
         return 0
+
+    def get_loaded_flanks(self, channel):
+        """ Get the rising and falling flanks of a digital channel in the loaded waveform.
+        Not part of the pulser interface, used by the fast counter dummy to simulate photon counts.
+
+        @param str channel: the generic digital channel name (i.e. 'd_ch1')
+
+        @return (numpy.ndarray, numpy.ndarray, int): sample indices of the rising flanks, sample
+                                                     indices of the falling flanks and the number
+                                                     of samples in the waveform. None if no
+                                                     waveform is loaded or nothing is known about
+                                                     the channel.
+        """
+        loaded_assets, asset_type = self.get_loaded_assets()
+        if asset_type != 'waveform':
+            return None
+        flanks = self._waveform_flanks.get(next(iter(loaded_assets.values())))
+        if flanks is None or channel not in flanks[0]:
+            return None
+        rising_bins, falling_bins = flanks[0][channel]
+        return rising_bins, falling_bins, flanks[1]
+
+    def _record_flanks(self, digital_samples, is_first_chunk, is_last_chunk):
+        """ Finds the flanks of the digital channels in a chunk of samples written to a waveform.
+
+        The waveform is played periodically, so a pulse high at the beginning and at the end of
+        the waveform is a single pulse wrapping around. Its falling flank is the first falling
+        flank of the waveform, so the last rising flank has no falling flank after it.
+
+        @param dict digital_samples: the digital samples of the chunk
+        @param bool is_first_chunk: Flag indicating if it is the first chunk of the waveform
+        @param bool is_last_chunk:  Flag indicating if it is the last chunk of the waveform
+        """
+        if is_first_chunk or not self._chunk_flanks:
+            self._chunk_flanks = {'flanks': dict(), 'last': dict(), 'first': dict(), 'offset': 0}
+        state = self._chunk_flanks
+        number_of_samples = 0
+        for chnl, samples in digital_samples.items():
+            samples = np.asarray(samples, dtype=bool)
+            number_of_samples = samples.size
+            if number_of_samples == 0:
+                continue
+            rising, falling = state['flanks'].setdefault(chnl, ([], []))
+            state['first'].setdefault(chnl, samples[0])
+            samples = np.concatenate(([state['last'].get(chnl, False)], samples))
+            flanks = np.diff(samples.view(np.int8))
+            rising.append(np.flatnonzero(flanks > 0) + state['offset'])
+            falling.append(np.flatnonzero(flanks < 0) + state['offset'])
+            state['last'][chnl] = samples[-1]
+        state['offset'] += number_of_samples
+
+        if is_last_chunk:
+            for chnl, (rising, falling) in state['flanks'].items():
+                rising = np.concatenate(rising).astype(np.int64)
+                falling = np.concatenate(falling).astype(np.int64)
+                if state['last'][chnl]:
+                    if state['first'][chnl] and rising.size > 1:
+                        # The first pulse is the continuation of the last one
+                        rising = rising[1:]
+                    elif not state['first'][chnl]:
+                        falling = np.append(falling, state['offset'])
+                state['flanks'][chnl] = (rising, falling)
+        return
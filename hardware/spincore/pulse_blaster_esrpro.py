@@ -1333,6 +1333,9 @@ class PulseBlasterESRPRO(Base, SwitchInterface, PulserInterface):
 
         constraints.activation_config = activation_config
 
+        # Waveforms can be written directly as run-lengths (see write_run_length_waveform)
+        constraints.run_length_waveforms = True
+
         return constraints
 
 
@@ -1806,8 +1809,10 @@ class PulseBlasterESRPRO(Base, SwitchInterface, PulserInterface):
             pb_waveform_temp = self._convert_sample_to_pb_sequence(digital_samples)
 
             # check if last of existing waveform is the same as the first one of
-            # the coming one, then combine them,
-            if self._current_pb_waveform_theoretical[-1]['active_channels'] == pb_waveform_temp[0]['active_channels']:
+            # the coming one, then combine them (chunks without samples give
+            # an empty list)
+            if self._current_pb_waveform_theoretical and pb_waveform_temp and \
+                    self._current_pb_waveform_theoretical[-1]['active_channels'] == pb_waveform_temp[0]['active_channels']:
                 self._current_pb_waveform_theoretical[-1]['length'] += pb_waveform_temp[0]['length']
                 pb_waveform_temp.pop(0)
 
@@ -1825,6 +1830,122 @@ class PulseBlasterESRPRO(Base, SwitchInterface, PulserInterface):
 
         return chunk_length, [self._current_pb_waveform_name]
 
+    def write_run_length_waveform(self, name, run_lengths, total_number_of_samples):
+        """ Write a new waveform given as run-lengths for each digital channel.
+
+        @param str name: the name of the waveform to be created
+        @param dict run_lengths: keys are the generic digital channel names
+                                 (i.e. 'd_ch1') and values are tuples of two
+                                 1D numpy arrays (<durations in samples>,
+                                 <channel states>).
+        @param int total_number_of_samples: The number of sample points for the
+                                            entire waveform
+
+        @return (int, list): number of samples written (-1 indicates failed
+                             process) and list of created waveform names.
+
+        In contrast to write_waveform the whole waveform is handed over at once,
+        so the pulse sequence is written to the device directly.
+        """
+        run_lengths = netobtain(run_lengths)
+
+        if not run_lengths or total_number_of_samples <= 0:
+            self._current_pb_waveform_theoretical = [{'active_channels': [], 'length': self.LEN_MIN}]
+            self._current_pb_waveform = [{'active_channels': [], 'length': self.LEN_MIN}]
+            self._current_pb_waveform_name = ''
+            return 0, list()
+
+        chan = list(run_lengths)
+        chan.sort()
+        self._current_activation_config = chan
+
+        self._current_pb_waveform_theoretical = self._convert_run_lengths_to_pb_sequence(run_lengths)
+        self._current_pb_waveform_name = name
+
+        self._current_pb_waveform = self._correct_sequence_for_delays(self._current_pb_waveform_theoretical)
+        self.write_pulse_form(self._current_pb_waveform)
+        self.log.debug('Waveform written in PulseBlaster with name "{0}" '
+                       'and a total length of {1} sequence '
+                       'entries.'.format(self._current_pb_waveform_name,
+                                         len(self._current_pb_waveform)))
+
+        return total_number_of_samples, [self._current_pb_waveform_name]
+
+    def _convert_run_lengths_to_pb_sequence(self, run_lengths):
+        """ Helper method to create a pulse blaster sequence from per channel
+            run-lengths.
+
+        @param dict run_lengths: keys are the generic digital channel names
+                                 (i.e. 'd_ch1') and values are tuples of two
+                                 1D numpy arrays (<durations in samples>,
+                                 <channel states>).
+
+        @return list: a sequence list with dictionaries formated for the generic
+                      method 'write_pulse_form' (see _convert_sample_to_pb_sequence).
+        """
+        ch_list = list(run_lengths)
+        ch_list.sort()
+
+        # The combined runs of all channels are bounded by the union of the
+        # run boundaries of the single channels.
+        run_ends = [np.cumsum(run_lengths[ch_name][0]) for ch_name in ch_list]
+        boundaries = np.unique(np.concatenate([[0]] + run_ends))
+        run_starts = boundaries[:-1]
+
+        # pack the channel states of each combined run into a bitmask with one
+        # bit per entry in ch_list
+        pattern = np.zeros(len(run_starts), dtype='int64')
+        for index, ch_name in enumerate(ch_list):
+            states = np.asarray(run_lengths[ch_name][1], dtype=bool)
+            run_index = np.searchsorted(run_ends[index], run_starts, side='right')
+            pattern |= states[run_index].astype('int64') << index
+
+        return self._convert_runs_to_pb_sequence(pattern, np.diff(boundaries), ch_list)
+
+    def _convert_runs_to_pb_sequence(self, pattern, durations, ch_list):
+        """ Helper method to create a pulse blaster sequence from runs of
+            channel patterns.
+
+        @param numpy.ndarray pattern: integer bitmask of the channel states for
+                                      each run. Bit n corresponds to the
+                                      channel ch_list[n].
+        @param numpy.ndarray durations: duration of each run in samples
+        @param list ch_list: sorted list of the generic digital channel names
+
+        @return list: a sequence list with dictionaries formated for the generic
+                      method 'write_pulse_form' (see _convert_sample_to_pb_sequence).
+        """
+        # merge consecutive runs with the same pattern
+        if len(pattern) > 1:
+            run_starts = np.concatenate(([0], np.flatnonzero(pattern[1:] != pattern[:-1]) + 1))
+            durations = np.add.reduceat(durations, run_starts)
+            pattern = pattern[run_starts]
+
+        ch_numbers = [int(ch_name.replace('d_ch', '')) - 1 for ch_name in ch_list]
+        active_channels_cache = dict()
+        pb_sequence_list = list()
+        for bitmask, duration in zip(pattern.tolist(), durations.tolist()):
+            if bitmask not in active_channels_cache:
+                active_channels_cache[bitmask] = [ch_num for index, ch_num in enumerate(ch_numbers)
+                                                  if bitmask & (1 << index)]
+            pb_sequence_list.append(
+                {'active_channels': list(active_channels_cache[bitmask]),
+                 'length': duration * self.GRAN_MIN})
+
+        # increase length by 1%, to remove the ambiguity for the comparison.
+        # The last pulse is excluded from this check.
+        too_short = np.flatnonzero(durations[:-1] * self.GRAN_MIN * 1.01 < self.LEN_MIN)
+        if len(too_short) > 0:
+            self.log.warning('Current waveform contains {0:d} pulse(s) with a '
+                             'minimal length of {1:.2f}ns, which is smaller '
+                             'than the minimal allowed length of {2:.2f}ns! '
+                             'Pulse sequence might most probably look '
+                             'unexpected. Increase the length of the smallest '
+                             'pulse!'.format(len(too_short),
+                                             durations[too_short].min() * self.GRAN_MIN * 1e9,
+                                             self.LEN_MIN * 1e9))
+        return pb_sequence_list
+
     def _convert_sample_to_pb_sequence(self, digital_samples):
         """ Helper method to create a pulse blaster sequence.
 
@@ -1845,67 +1966,32 @@ class PulseBlasterESRPRO(Base, SwitchInterface, PulserInterface):
                          {'active_channels':[], 'length': 20e-6}]
 
                       which will switch on channel 0 for 10us on and switch all
-                      channels off for 20us.
+                      channels off for 20us. An empty list is returned if
+                      there are no samples.
         """
 
         ch_list = list(digital_samples)
         ch_list.sort()
-        num_ch = len(ch_list)
 
         # take on of the channel and obtain the channel length
-        num_entries = len(digital_samples[ch_list[0]])
-
-        last_sequence_dict = None
-        pb_sequence_list = list()
-
-        for index in range(num_entries):
-
-            # create at first a temporary array, with the minimal granularity
-            # length. The sampling freq is fixed anyway and cannot be changed.
-            temp_sequence_dict = {'active_channels': [],
-                                  'length': self.GRAN_MIN}
-
-            for ch_name in ch_list:
-
-                if digital_samples[ch_name][index]:
-                    temp_sequence_dict['active_channels'].append(int(ch_name.replace('d_ch', ''))-1)
-
-            # compare it with the last array if present
-
-            # if not present start to count
-            if last_sequence_dict is None:
-                last_sequence_dict = temp_sequence_dict
-
-            else:
-
-                 # if present and the same channels, accumulate length
-                if temp_sequence_dict['active_channels'] == last_sequence_dict['active_channels']:
-                    last_sequence_dict['length'] += temp_sequence_dict['length']
-
-                # if present and not the same channels, append last array to
-                # sequence array
-                else:
-                    # increase length by 1%, to remove the ambiguity for the
-                    # comparison
-                    if last_sequence_dict['length']*1.01 < self.LEN_MIN:
-                        self.log.warning('Current waveform contains a pulse of '
-                                         'length {0:.2f}ns, which is smaller '
-                                         'than the minimal allowed length of '
-                                         '{1:.2f}ns! Pulse sequence might '
-                                         'most probably look unexpected. '
-                                         'Increase the length of the smallest '
-                                         'pulse!'
-                                         ''.format(last_sequence_dict['length']*1e9,
-                                                   self.LEN_MIN*1e9))
-
-                    pb_sequence_list.append(last_sequence_dict)
-
-                    # and temporary array becomes last array for the next round
-                    last_sequence_dict = temp_sequence_dict
-
-        # do not forget to add the last sequence
-        pb_sequence_list.append(last_sequence_dict)
-
+        num_entries = len(digital_samples[ch_list[0]]) if ch_list else 0
+        if num_entries == 0:
+            return list()
+
+        # pack the channel states of each sample into a bitmask with one bit
+        # per entry in ch_list
+        pattern = np.zeros(num_entries, dtype='int64')
+        for index, ch_name in enumerate(ch_list):
+            pattern |= np.asarray(digital_samples[ch_name], dtype='int64') << index
+
+        # find the samples where the pattern changes. Each of them starts a new
+        # pulse which lasts until the next change.
+        run_starts = np.concatenate(([0], np.flatnonzero(pattern[1:] != pattern[:-1]) + 1))
+        durations = np.diff(np.append(run_starts, num_entries))
+
+        pb_sequence_list = self._convert_runs_to_pb_sequence(pattern[run_starts],
+                                                             durations,
+                                                             ch_list)
         return pb_sequence_list
 
     def write_sequence(self, name, sequence_parameters):
@@ -220,6 +220,9 @@ class PulseStreamer(Base, PulserInterface):
         activation_config['all'] = frozenset({'d_ch1', 'd_ch2', 'd_ch3', 'd_ch4', 'd_ch5', 'd_ch6', 'd_ch7', 'd_ch8'})
         constraints.activation_config = activation_config
 
+        # Waveforms can be written directly as run-lengths (see write_run_length_waveform)
+        constraints.run_length_waveforms = True
+
         return constraints
 
     
@@ -671,6 +674,29 @@ class PulseStreamer(Base, PulserInterface):
 
         return len(samples), [self.__current_waveform_name]
 
+    def write_run_length_waveform(self, name, run_lengths, total_number_of_samples):
+        """
+        Write a new waveform to the device memory given as run-lengths for each digital channel.
+        The pulse patterns are created directly from the run-lengths without any sample arrays.
+
+        @param str name: the name of the waveform to be created
+        @param dict run_lengths: keys are the generic digital channel names (i.e. 'd_ch1') and
+                                 values are tuples of two 1D numpy arrays (<durations in samples>,
+                                 <channel states>).
+        @param int total_number_of_samples: The number of sample points for the entire waveform
+
+        @return (int, list): Number of samples written (-1 indicates failed process) and list of
+                             created waveform names
+        """
+        self.__current_waveform_name = name
+        self.__samples_written = total_number_of_samples
+        # dict of lists that describe pulse pattern in swabian language
+        self.__current_waveform = dict()
+        for channel_number, (durations, states) in run_lengths.items():
+            self.__current_waveform[channel_number] = [[int(duration), int(state)] for
+                                                       duration, state in zip(durations, states)]
+        return total_number_of_samples, [self.__current_waveform_name]
+
 
     
     def write_sequence(self, name, sequence_parameters):
@@ -173,5 +173,9 @@ class FastCounterInterface(metaclass=InterfaceMetaclass):
             - 'elapsed_time' : the elapsed time in seconds
 
         If the hardware does not support these features, the values should be None
+
+        Hardware modules may reuse the returned array for later calls. A reused array must be
+        returned read-only and be valid at least until the next but one call. Callers keeping a
+        read-only array for longer must copy it. Writable arrays are owned by the caller.
         """
         pass
@@ -580,3 +580,11 @@ class PulserConstraints:
 
         self.activation_config = dict()
         self.sequence_option = SequenceOption.OPTIONAL
+        # Purely digital pulse generators can set this flag to True if they implement the method
+        #   write_run_length_waveform(name, run_lengths, total_number_of_samples)
+        # It takes the waveform of each digital channel as run-lengths instead of sample arrays.
+        # "run_lengths" is a dict with keys being the generic digital channel names (i.e. 'd_ch1')
+        # and values being tuples of two 1D numpy arrays (<durations in samples (int64)>,
+        # <channel states (bool)>). It returns the same as write_waveform, i.e. the number of
+        # samples written and a list of created waveform names.
+        self.run_length_waveforms = False
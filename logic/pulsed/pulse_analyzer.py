@@ -79,7 +79,23 @@ class PulseAnalyzer(PulseAnalyzerBase):
     8) The keyword "method" must not be used in the analysis method parameters
 
     See BasicPulseAnalyzer class for an example usage.
+
+    Besides the analysis method parameters the settings hold the model used for the measurement
+    error ("error_model"):
+        'shot_noise': error returned by the analysis method
+        'welford': error estimated from the spread of the data point values of all data pulls
+        'ewma': error estimated from the exponentially weighted spread of the data point values of
+                all data pulls. Each pull is weighted with "error_model_alpha".
+    The 'welford' and 'ewma' models only apply to the analysis methods listed in
+    normalized_analysis_methods and accumulating_analysis_methods. The error of the analysis
+    method is used for all other methods.
     """
+    error_models = ('shot_noise', 'welford', 'ewma')
+    # The result of normalized analysis methods does not depend on the amount of accumulated
+    # counts, so its error is the standard error of the mean of the data pull results. The result
+    # of accumulating analysis methods is the sum of the results of all data pulls.
+    normalized_analysis_methods = ('mean_norm',)
+    accumulating_analysis_methods = ('sum', 'mean', 'mean_reference', 'pass_through')
 
     def __init__(self, pulsedmeasurementlogic):
         # Init base class
@@ -91,6 +107,9 @@ class PulseAnalyzer(PulseAnalyzerBase):
         self._parameters = dict()
         # Currently selected analysis method
         self._current_analysis_method = None
+        # Currently selected error model and weight of new pulls for the 'ewma' model
+        self._error_model = 'shot_noise'
+        self._error_model_alpha = 0.1
 
         # import path for analysis modules from default directory (logic.pulse_analysis_methods)
         path_list = [os.path.join(get_main_dir(), 'logic', 'pulsed', 'pulsed_analysis_methods')]
@@ -117,7 +136,8 @@ class PulseAnalyzer(PulseAnalyzerBase):
         if isinstance(pulsedmeasurementlogic.analysis_parameters, dict):
             # Delete unused parameters
             params = [p for p in pulsedmeasurementlogic.analysis_parameters if
-                      p not in self._parameters and p != 'method']
+                      p not in self._parameters and
+                      p not in ('method', 'error_model', 'error_model_alpha')]
             for param in params:
                 del pulsedmeasurementlogic.analysis_parameters[param]
             # Update parameter dict and current method
@@ -138,8 +158,10 @@ class PulseAnalyzer(PulseAnalyzerBase):
         # Get keyword arguments for the currently selected method
         settings_dict = self._get_analysis_method_kwargs(method)
 
-        # Attach current analysis method name
+        # Attach current analysis method name and error model
         settings_dict['method'] = self._current_analysis_method
+        settings_dict['error_model'] = self._error_model
+        settings_dict['error_model_alpha'] = self._error_model_alpha
         return settings_dict
 
     @analysis_settings.setter
@@ -163,11 +185,26 @@ class PulseAnalyzer(PulseAnalyzerBase):
                 else:
                     self.log.error('Analysis method "{0}" could not be found in PulseAnalyzer.'
                                    ''.format(value))
+            elif parameter == 'error_model':
+                if value in self.error_models:
+                    self._error_model = value
+                else:
+                    self.log.error('Error model "{0}" unknown. Available error models are: {1}.'
+                                   ''.format(value, self.error_models))
+            elif parameter == 'error_model_alpha':
+                if isinstance(value, (int, float)) and 0 < value <= 1:
+                    self._error_model_alpha = float(value)
+                else:
+                    self.log.error('Error model alpha must be a number in the interval (0, 1].')
             elif parameter in self._parameters:
                 self._parameters[parameter] = value
             else:
                 self.log.warning('No analysis parameter "{0}" found in PulseAnalyzer.\n'
                                  'Parameter will be ignored.'.format(parameter))
+        if self._error_model != self.applied_error_model:
+            self.log.warning('Error model "{0}" is not supported by analysis method "{1}". The '
+                             'error of the analysis method is used instead.'
+                             ''.format(self._error_model, self._current_analysis_method))
         return
 
     @property
@@ -189,8 +226,35 @@ class PulseAnalyzer(PulseAnalyzerBase):
         """
         settings_dict = self._parameters.copy()
         settings_dict['method'] = self._current_analysis_method
+        settings_dict['error_model'] = self._error_model
+        settings_dict['error_model_alpha'] = self._error_model_alpha
         return settings_dict
 
+    @property
+    def error_model(self):
+        return self._error_model
+
+    @property
+    def error_model_alpha(self):
+        return self._error_model_alpha
+
+    @property
+    def applied_error_model(self):
+        """ The error model applied to the currently selected analysis method.
+
+        @return str: error_model or 'shot_noise' if the analysis method does not support it
+        """
+        if self._current_analysis_method in self.normalized_analysis_methods or \
+                self._current_analysis_method in self.accumulating_analysis_methods:
+            return self._error_model
+        return 'shot_noise'
+
+    @property
+    def is_accumulating_analysis(self):
+        """ True if the result of the current analysis method is the sum of the data pull results.
+        """
+        return self._current_analysis_method in self.accumulating_analysis_methods
+
     def analyse_laser_pulses(self, laser_data):
         """
         Wrapper method to call the currently selected analysis method with laser_data and the
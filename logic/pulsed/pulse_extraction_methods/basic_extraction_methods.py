@@ -57,7 +57,7 @@ class BasicPulseExtractor(PulseExtractorBase):
 
         # apply gaussian filter to remove noise and compute the gradient of the timetrace sum
         try:
-            conv = ndimage.filters.gaussian_filter1d(timetrace_sum.astype(float), conv_std_dev)
+            conv = ndimage.gaussian_filter1d(timetrace_sum.astype(float), conv_std_dev)
         except:
             conv = np.zeros(timetrace_sum.size)
         try:
@@ -72,13 +72,14 @@ class BasicPulseExtractor(PulseExtractorBase):
 
         # If gaussian smoothing or derivative failed, the returned array only contains zeros.
         # Check for that and return also only zeros to indicate a failed pulse extraction.
-        if len(conv_deriv.nonzero()[0]) == 0:
+        if not conv_deriv.any():
             laser_arr = np.zeros(count_data.shape, dtype='int64')
         else:
             # slice the data array to cut off anything but laser pulses
             laser_arr = count_data[:, rising_ind:falling_ind]
 
-        return_dict['laser_counts_arr'] = laser_arr.astype('int64')
+        # The raw data is not altered afterwards, so int64 data does not need to be copied
+        return_dict['laser_counts_arr'] = laser_arr.astype('int64', copy=False)
         return_dict['laser_indices_rising'] = rising_ind
         return_dict['laser_indices_falling'] = falling_ind
 
@@ -254,6 +255,108 @@ class BasicPulseExtractor(PulseExtractorBase):
         return_dict['laser_indices_falling'] = falling_ind
         return return_dict
 
+    def ungated_conv_deriv_guided(self, count_data, conv_std_dev=20.0, delay_search_window=1e-6):
+        """ Extracts the laser pulses in the ungated timetrace data at the positions known from the
+            sampling information of the loaded pulse sequence.
+
+        @param numpy.ndarray count_data: The raw timetrace data (1D) from an ungated fast counter
+        @param float conv_std_dev: The standard deviation of the gaussian used for smoothing
+        @param float delay_search_window: Maximum delay (in s, both directions) of the laser
+                                          pulses in the timetrace with respect to the expected
+                                          positions.
+
+        @return dict: The extracted laser pulses of the timetrace as well as the indices for rising
+                      and falling flanks.
+
+        Procedure:
+            The laser flank positions given by "laser_rising_bins" and "laser_falling_bins" in the
+            sampling information are converted to fast counter bins.
+            A delay common to all laser pulses (e.g. laser/detector latency) is determined by
+            shifting the expected flanks within +-delay_search_window over the derivative of the
+            gaussian smoothed timetrace. Afterwards each flank is refined within +-conv_std_dev
+            bins around its expected position using a derivative with small and fixed smoothing
+            (like in ungated_conv_deriv).
+            The computational effort scales with the number of laser pulses times the size of the
+            search windows instead of the number of laser pulses times the timetrace length.
+
+            Falls back to ungated_conv_deriv if no suitable sampling information is available.
+        """
+        number_of_lasers = self.measurement_settings.get('number_of_lasers')
+        counter_bin_width = self.fast_counter_settings.get('bin_width')
+        try:
+            sample_rate = self.sampling_information['pulse_generator_settings']['sample_rate']
+            number_of_samples = int(self.sampling_information['number_of_samples'])
+            laser_rising_bins = np.asarray(self.sampling_information['laser_rising_bins'],
+                                           dtype='int64')
+            laser_falling_bins = np.asarray(self.sampling_information['laser_falling_bins'],
+                                            dtype='int64')
+        except (KeyError, TypeError):
+            laser_rising_bins = laser_falling_bins = np.empty(0, dtype='int64')
+        if not isinstance(number_of_lasers, int) or not isinstance(counter_bin_width, float) or \
+                number_of_lasers < 1 or count_data.size < 2 or \
+                len(laser_rising_bins) != number_of_lasers or \
+                len(laser_falling_bins) != number_of_lasers:
+            self.log.debug('No matching laser positions found in sampling information. '
+                           'Falling back to extraction method "conv_deriv".')
+            return self.ungated_conv_deriv(count_data=count_data, conv_std_dev=conv_std_dev)
+
+        # Expected falling flank for each rising flank. A laser pulse still on at the end of the
+        # sequence is switched off by the first falling flank of the next repetition.
+        falling_index = np.searchsorted(laser_falling_bins, laser_rising_bins, side='right')
+        expected_falling_bins = np.where(
+            falling_index < number_of_lasers,
+            laser_falling_bins[np.minimum(falling_index, number_of_lasers - 1)],
+            laser_falling_bins[0] + number_of_samples)
+
+        # convert to bins of fastcounter
+        bins_per_sample = 1 / (sample_rate * counter_bin_width)
+        rising_ind = np.rint(laser_rising_bins * bins_per_sample).astype('int64')
+        falling_ind = np.rint(expected_falling_bins * bins_per_sample).astype('int64')
+        last_index = count_data.size - 1
+
+        # derivatives of the timetrace with gaussian smoothing of conv_std_dev (flank detection)
+        # and with small and fixed smoothing (precise inflection point)
+        count_data_float = count_data.astype(float)
+        conv_deriv = np.gradient(ndimage.gaussian_filter1d(count_data_float, conv_std_dev))
+        conv_deriv_ref = np.gradient(ndimage.gaussian_filter1d(count_data_float, 10))
+
+        # Find the common delay maximizing the derivative at all rising flanks and minimizing it
+        # at all falling flanks
+        search_bins = int(round(delay_search_window / counter_bin_width))
+        delays = np.arange(-search_bins, search_bins + 1)
+        flank_scores = np.zeros(delays.size)
+        # Process the laser pulses in blocks to limit the size of the temporary index arrays
+        block_size = max(2**20 // delays.size, 1)
+        for start in range(0, number_of_lasers, block_size):
+            stop = start + block_size
+            flank_scores += conv_deriv[np.clip(rising_ind[start:stop, np.newaxis] + delays,
+                                               0, last_index)].sum(axis=0)
+            flank_scores -= conv_deriv[np.clip(falling_ind[start:stop, np.newaxis] + delays,
+                                               0, last_index)].sum(axis=0)
+        delay = delays[np.argmax(flank_scores)]
+
+        # refine each flank locally
+        laser_numbers = np.arange(number_of_lasers)
+        refine_range = np.arange(-int(conv_std_dev), int(conv_std_dev) + 1)
+        window = np.clip(rising_ind[:, np.newaxis] + delay + refine_range, 0, last_index)
+        rising_ind = window[laser_numbers, np.argmax(conv_deriv_ref[window], axis=1)]
+        window = np.clip(falling_ind[:, np.newaxis] + delay + refine_range, 0, last_index)
+        falling_ind = window[laser_numbers, np.argmin(conv_deriv_ref[window], axis=1)]
+
+        # slice all laser pulses out of the timetrace with a single gather. Bins beyond the end of
+        # the timetrace are set to zero.
+        laser_length = max(int(np.max(falling_ind - rising_ind)), 0)
+        gather_ind = rising_ind[:, np.newaxis] + np.arange(laser_length)
+        laser_arr = np.where(gather_ind <= last_index,
+                             count_data[np.minimum(gather_ind, last_index)],
+                             0)
+
+        return_dict = dict()
+        return_dict['laser_counts_arr'] = laser_arr.astype('int64')
+        return_dict['laser_indices_rising'] = rising_ind
+        return_dict['laser_indices_falling'] = falling_ind
+        return return_dict
+
     def ungated_threshold(self, count_data, count_threshold=10, min_laser_length=200e-9,
                           threshold_tolerance=20e-9):
         """
@@ -298,37 +401,36 @@ class BasicPulseExtractor(PulseExtractorBase):
         min_laser_length = round(min_laser_length / counter_bin_width)
 
         # get all bin indices with counts > threshold value
-        bigger_indices = np.where(count_data >= count_threshold)[0]
-
-        # get all indices with consecutive numbering (bin chains not interrupted by
-        # values < threshold
-        index_list = np.split(bigger_indices,
-                              np.where(np.diff(bigger_indices) >= threshold_tolerance)[0] + 1)
-        for i, index_group in enumerate(index_list):
-            if index_group.size > 0:
-                start, end = index_list[i][0], index_list[i][-1]
-                index_list[i] = np.arange(start, end + 1)
-        consecutive_indices_unfiltered = index_list
+        bigger_indices = np.flatnonzero(count_data >= count_threshold)
+
+        # get first and last index of all bin chains not interrupted by more than
+        # threshold_tolerance values < threshold
+        gaps = np.flatnonzero(np.diff(bigger_indices) >= threshold_tolerance)
+        if bigger_indices.size > 0:
+            starts = bigger_indices[np.concatenate(([0], gaps + 1))]
+            ends = bigger_indices[np.concatenate((gaps, [bigger_indices.size - 1]))]
+        else:
+            starts = np.empty(0, dtype='int64')
+            ends = np.empty(0, dtype='int64')
+        lengths = ends - starts + 1
 
         # sort out all groups shorter than minimum laser length
-        consecutive_indices = [item for item in consecutive_indices_unfiltered if
-                               len(item) > min_laser_length]
+        long_enough = lengths > min_laser_length
+        starts, ends, lengths = starts[long_enough], ends[long_enough], lengths[long_enough]
 
         # Check if the number of lasers matches the number of remaining index groups
-        if number_of_lasers != len(consecutive_indices):
+        if number_of_lasers != starts.size:
             return return_dict
 
-        # determine max length of laser pulse and initialize laser array
-        max_laser_length = max([index_array.size for index_array in consecutive_indices])
-        return_dict['laser_counts_arr'] = np.zeros((number_of_lasers, max_laser_length),
-                                                   dtype='int64')
-
-        # fill laser array with slices of raw data array. Also populate the rising/falling index
-        # arrays
-        for i, index_group in enumerate(consecutive_indices):
-            return_dict['laser_indices_rising'][i] = index_group[0]
-            return_dict['laser_indices_falling'][i] = index_group[-1]
-            return_dict['laser_counts_arr'][i, :index_group.size] = count_data[index_group]
+        # fill laser array with slices of raw data array (zero-padded to the longest laser pulse).
+        # Also populate the rising/falling index arrays
+        bin_offsets = np.arange(lengths.max())
+        in_laser = bin_offsets < lengths[:, np.newaxis]
+        laser_bins = np.where(in_laser, starts[:, np.newaxis] + bin_offsets, 0)
+        return_dict['laser_counts_arr'] = np.where(in_laser, count_data[laser_bins], 0).astype(
+            'int64', copy=False)
+        return_dict['laser_indices_rising'] = starts.astype('int64')
+        return_dict['laser_indices_falling'] = ends.astype('int64')
 
         return return_dict
 
@@ -382,11 +484,9 @@ class BasicPulseExtractor(PulseExtractorBase):
         num_col = max_laser_length + 2 * safety_bins
         # compute from laser_start_indices and laser length the respective position of the laser
         # pulses
-        laser_pulses = np.empty((num_rows, num_col))
-        for ii in range(num_rows):
-            laser_pulses[ii][:] = count_data[
-                np.arange(laser_rising_bins[ii] + delay_bins - safety_bins,
-                          laser_rising_bins[ii] + delay_bins + safety_bins + max_laser_length)]
+        laser_start_bins = laser_rising_bins + delay_bins - safety_bins
+        laser_pulses = count_data[laser_start_bins[:, np.newaxis] + np.arange(num_col)].astype(
+            float)
         # use the gated extraction method
         return_dict = self.gated_conv_deriv(laser_pulses, conv_std_dev)
         return return_dict
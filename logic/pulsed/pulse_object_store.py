@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the Qudi single-file storage for PulseBlock, PulseBlockEnsemble and
+PulseSequence instances.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class PulseObjectStore:
+    """
+    Transactional single-file storage (SQLite database) for pickled pulse objects.
+
+    Each object is stored by its kind ('block', 'ensemble' or 'sequence') and name together with a
+    version stamp that is incremented each time the object is overwritten. Listing the stored
+    names only reads the index, so objects can be de-serialized lazily when they are needed.
+    """
+    # File extensions of the pickle files used by older versions of SequenceGeneratorLogic
+    pickle_file_extensions = {'block': '.block', 'ensemble': '.ensemble', 'sequence': '.sequence'}
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS pulse_objects ('
+                                     'kind TEXT NOT NULL, '
+                                     'name TEXT NOT NULL, '
+                                     'version INTEGER NOT NULL, '
+                                     'data BLOB NOT NULL, '
+                                     'PRIMARY KEY (kind, name))')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS metadata ('
+                                     'key TEXT PRIMARY KEY, '
+                                     'value TEXT)')
+        return
+
+    def close(self):
+        """ Closes the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+        return
+
+    def get_index(self, kind):
+        """ Returns the names and version stamps of all stored objects of a kind without
+        de-serializing them.
+
+        @param str kind: The kind of pulse objects ('block', 'ensemble' or 'sequence')
+
+        @return OrderedDict: object names as keys and version stamps as values
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                'SELECT name, version FROM pulse_objects WHERE kind=? ORDER BY name', (kind,))
+            return OrderedDict(cursor.fetchall())
+
+    def load(self, kind, name):
+        """ De-serializes a single stored object.
+
+        Errors during de-serialization (e.g. pickle.UnpicklingError) are passed on to the caller.
+
+        @param str kind: The kind of pulse object ('block', 'ensemble' or 'sequence')
+        @param str name: The name of the object to load
+
+        @return object: The de-serialized object (None if no object is stored by that name)
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT data FROM pulse_objects WHERE kind=? AND name=?', (kind, name)).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(row[0])
+
+    def save(self, kind, pulse_objects):
+        """ Serializes one or more objects of the same kind and stores them in a single
+        transaction. Existing objects with the same names are overwritten and their version stamps
+        incremented.
+
+        @param str kind: The kind of pulse objects ('block', 'ensemble' or 'sequence')
+        @param pulse_objects: A single pulse object or an iterable of pulse objects (need to have a
+                              "name" attribute)
+        """
+        if hasattr(pulse_objects, 'name'):
+            pulse_objects = (pulse_objects,)
+        rows = [(kind, obj.name, pickle.dumps(obj)) for obj in pulse_objects]
+        with self._lock, self._connection:
+            self._insert_rows(rows)
+        return
+
+    def delete(self, kind, names):
+        """ Removes one or more objects of the same kind in a single transaction.
+
+        @param str kind: The kind of pulse objects ('block', 'ensemble' or 'sequence')
+        @param names: A single name or an iterable of names of the objects to remove
+        """
+        if isinstance(names, str):
+            names = (names,)
+        with self._lock, self._connection:
+            self._connection.executemany('DELETE FROM pulse_objects WHERE kind=? AND name=?',
+                                         [(kind, name) for name in names])
+        return
+
+    @property
+    def pickle_files_imported(self):
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT value FROM metadata WHERE key=?', ('pickle_files_imported',)).fetchone()
+        return row is not None and row[0] == '1'
+
+    def import_pickle_files(self, directory):
+        """ One-time migration of the pickle files of all pulse objects found in directory.
+
+        The serialized data is copied as it is, so the files are not de-serialized during the
+        migration. Objects already present in the store are not overwritten. The pickle files are
+        left untouched and are ignored after the migration has been completed.
+
+        @param str directory: The directory to import the pickle files from
+
+        @return dict: Number of imported objects for each kind
+        """
+        imported = {kind: 0 for kind in self.pickle_file_extensions}
+        if os.path.isdir(directory):
+            with os.scandir(directory) as scan:
+                file_entries = [entry for entry in scan if entry.is_file()]
+        else:
+            file_entries = list()
+
+        with self._lock, self._connection:
+            for kind, extension in self.pickle_file_extensions.items():
+                present = set(self.get_index(kind))
+                rows = list()
+                for entry in file_entries:
+                    if not entry.name.endswith(extension):
+                        continue
+                    name = entry.name[:-len(extension)]
+                    if name in present:
+                        continue
+                    with open(entry.path, 'rb') as file:
+                        rows.append((kind, name, file.read()))
+                self._insert_rows(rows)
+                imported[kind] = len(rows)
+            self._connection.execute('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)',
+                                     ('pickle_files_imported', '1'))
+        return imported
+
+    def _insert_rows(self, rows):
+        """ Inserts or overwrites (kind, name, data) rows. Needs to be called within a transaction.
+        """
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO pulse_objects (kind, name, version, data) VALUES (?, ?, '
+            'COALESCE((SELECT version FROM pulse_objects WHERE kind=? AND name=?), 0) + 1, ?)',
+            [(kind, name, kind, name, data) for kind, name, data in rows])
+        return
+
+
+class _NotLoaded:
+    """ Placeholder for pulse objects not loaded from storage yet.
+    """
+    def __repr__(self):
+        return '<not loaded>'
+
+
+NOT_LOADED = _NotLoaded()
+
+
+class LazyPulseObjectDict(OrderedDict):
+    """
+    OrderedDict of pulse objects that are only de-serialized upon first access.
+
+    Names of stored objects are registered with the placeholder NOT_LOADED as value. Accessing an
+    item calls loader(name) and replaces the placeholder with the returned object. If the loader
+    returns None (object could not be loaded), the name is removed and a KeyError is raised.
+    Iterating over names, len() and "in" never load any object.
+    """
+    def __init__(self, loader, names=None):
+        super().__init__()
+        self._loader = loader
+        if names is not None:
+            for name in names:
+                super().__setitem__(name, NOT_LOADED)
+        return
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if value is NOT_LOADED:
+            value = self._loader(key)
+            if value is None:
+                super().__delitem__(key)
+                raise KeyError(key)
+            super().__setitem__(key, value)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *args):
+        try:
+            value = self[key]
+        except KeyError:
+            if args:
+                return args[0]
+            raise
+        super().__delitem__(key)
+        return value
+
+    def values(self):
+        return [value for key, value in self.items()]
+
+    def items(self):
+        items = list()
+        for key in list(self.keys()):
+            try:
+                items.append((key, self[key]))
+            except KeyError:
+                pass
+        return items
+
+    def is_loaded(self, key):
+        """ Checks if the object stored by name has already been loaded.
+
+        @param str key: name of the object
+
+        @return bool: True if the object is present and loaded, False otherwise
+        """
+        return super().get(key, NOT_LOADED) is not NOT_LOADED
+
+    def loaded_keys(self):
+        """ Names of all objects that have already been loaded.
+
+        @return list: names of loaded objects
+        """
+        return [key for key, value in super().items() if value is not NOT_LOADED]
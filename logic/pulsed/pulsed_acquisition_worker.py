@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the worker pulling the raw data of a pulsed measurement from the fast counter
+in a separate thread and the immutable snapshot the measurement results are published in.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import time
+from collections import namedtuple
+
+from qtpy import QtCore
+
+from core.util.mutex import Mutex
+
+
+class PulsedMeasurementSnapshot(namedtuple('PulsedMeasurementSnapshot',
+                                           ['signal_data', 'signal_alt_data', 'measurement_error',
+                                            'laser_data', 'raw_data', 'elapsed_sweeps',
+                                            'elapsed_time', 'stage_latencies'])):
+    """
+    Immutable set of measurement results published after each analysis run.
+
+    All arrays are read-only and are never altered by the measurement logic afterwards, so a
+    snapshot can be read from any thread without holding a lock. stage_latencies is a dict with
+    the duration in seconds of each processing stage.
+    """
+    __slots__ = ()
+
+
+class PulsedAcquisitionWorker(QtCore.QObject):
+    """
+    Pulls the raw data from the fast counter periodically in its own thread.
+
+    The most recent data pull is held in a pending buffer until the analysis takes it. If the
+    analysis is still busy with the previous data, the pending data is replaced by the next pull.
+    Since fast counter data is accumulated, no counts are lost by skipping a pull.
+
+    The acquisition method has to return raw data owned by the caller (not a buffer the fast
+    counter reuses), since it is handed on to the published measurement results.
+    """
+    sigRawDataAcquired = QtCore.Signal()
+
+    def __init__(self, acquisition_method):
+        """
+        @param callable acquisition_method: Returns a tuple of the raw data and the info dict
+        """
+        super().__init__()
+        self._acquisition_method = acquisition_method
+        self._lock = Mutex()
+        self._pending_data = None
+        self._timer = None
+        return
+
+    @QtCore.Slot(float)
+    def start_acquisition(self, interval):
+        """ Starts (or restarts) pulling data every interval seconds.
+
+        @param float interval: time between two data pulls in s
+        """
+        # The timer is created here to live in the thread of the worker
+        if self._timer is None:
+            self._timer = QtCore.QTimer()
+            self._timer.setSingleShot(False)
+            self._timer.timeout.connect(self._acquire_data)
+        self._timer.setInterval(round(1000. * interval))
+        self._timer.start()
+        return
+
+    @QtCore.Slot()
+    def stop_acquisition(self):
+        """ Stops pulling data and discards the pending data.
+        """
+        if self._timer is not None:
+            self._timer.stop()
+        self.take_data()
+        return
+
+    def take_data(self):
+        """ Hands over the pending data to the caller.
+
+        @return tuple: raw data, info dict, acquisition latency in s and time.perf_counter() at the
+                       end of the data pull (None if no new data is pending)
+        """
+        with self._lock:
+            data, self._pending_data = self._pending_data, None
+        return data
+
+    @QtCore.Slot()
+    def _acquire_data(self):
+        start = time.perf_counter()
+        raw_data, info_dict = self._acquisition_method()
+        stop = time.perf_counter()
+        with self._lock:
+            analysis_notified = self._pending_data is not None
+            self._pending_data = (raw_data, info_dict, stop - start, stop)
+        if not analysis_notified:
+            self.sigRawDataAcquired.emit()
+        return
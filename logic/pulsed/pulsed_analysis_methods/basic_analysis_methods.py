@@ -56,34 +56,29 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         norm_start_bin = round(norm_start / bin_width)
         norm_end_bin = round(norm_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the sum and mean of the data in the normalization window
-            tmp_data = laser_arr[norm_start_bin:norm_end_bin]
-            reference_sum = np.sum(tmp_data)
-            reference_mean = (reference_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
-
-            # calculate the sum and mean of the data in the signal window
-            tmp_data = laser_arr[signal_start_bin:signal_end_bin]
-            signal_sum = np.sum(tmp_data)
-            signal_mean = (signal_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
-
-            # Calculate normalized signal while avoiding division by zero
-            if reference_mean > 0 and signal_mean >= 0:
-                signal_data[ii] = signal_mean / reference_mean
-            else:
-                signal_data[ii] = 0.0
-
-            # Calculate measurement error while avoiding division by zero
-            if reference_sum > 0 and signal_sum > 0:
-                # calculate with respect to gaussian error 'evolution'
-                error_data[ii] = signal_data[ii] * np.sqrt(1 / signal_sum + 1 / reference_sum)
-            else:
-                error_data[ii] = 0.0
+        # calculate the sum and mean of the data in the normalization window for all laser pulses
+        tmp_data = laser_data[:, norm_start_bin:norm_end_bin]
+        reference_sum = np.sum(tmp_data, axis=1)
+        reference_mean = (reference_sum / tmp_data.shape[1]) if tmp_data.shape[1] != 0 else \
+            np.zeros(num_of_lasers)
+
+        # calculate the sum and mean of the data in the signal window for all laser pulses
+        tmp_data = laser_data[:, signal_start_bin:signal_end_bin]
+        signal_sum = np.sum(tmp_data, axis=1)
+        signal_mean = (signal_sum / tmp_data.shape[1]) if tmp_data.shape[1] != 0 else \
+            np.zeros(num_of_lasers)
+
+        # Calculate normalized signal while avoiding division by zero
+        valid = (reference_mean > 0) & (signal_mean >= 0)
+        signal_data = np.zeros(num_of_lasers, dtype=float)
+        np.divide(signal_mean, reference_mean, out=signal_data, where=valid)
+
+        # Calculate measurement error while avoiding division by zero
+        valid = (reference_sum > 0) & (signal_sum > 0)
+        error_data = np.zeros(num_of_lasers, dtype=float)
+        # calculate with respect to gaussian error 'evolution'
+        error_data[valid] = signal_data[valid] * np.sqrt(1 / signal_sum[valid] +
+                                                         1 / reference_sum[valid])
 
         return signal_data, error_data
 
@@ -106,23 +101,12 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         signal_start_bin = round(signal_start / bin_width)
         signal_end_bin = round(signal_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
+        # calculate the sum of the data in the signal window for all laser pulses
+        signal_data = laser_data[:, signal_start_bin:signal_end_bin].sum(axis=1).astype(float)
 
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the sum of the data in the signal window
-            signal = laser_arr[signal_start_bin:signal_end_bin].sum()
-            signal_error = np.sqrt(signal)
-
-            # Avoid numpy C type variables overflow and NaN values
-            if signal < 0 or signal != signal:
-                signal_data[ii] = 0.0
-                error_data[ii] = 0.0
-            else:
-                signal_data[ii] = signal
-                error_data[ii] = signal_error
+        # Avoid numpy C type variables overflow and NaN values
+        signal_data[~(signal_data >= 0)] = 0.0
+        error_data = np.sqrt(signal_data)
 
         return signal_data, error_data
 
@@ -146,24 +130,16 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         signal_start_bin = round(signal_start / bin_width)
         signal_end_bin = round(signal_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the mean of the data in the signal window
-            signal = laser_arr[signal_start_bin:signal_end_bin].mean()
-            signal_sum = laser_arr[signal_start_bin:signal_end_bin].sum()
-            signal_error = np.sqrt(signal_sum) / (signal_end_bin - signal_start_bin)
-
-            # Avoid numpy C type variables overflow and NaN values
-            if signal < 0 or signal != signal:
-                signal_data[ii] = 0.0
-                error_data[ii] = 0.0
-            else:
-                signal_data[ii] = signal
-                error_data[ii] = signal_error
+        # calculate the mean of the data in the signal window for all laser pulses
+        tmp_data = laser_data[:, signal_start_bin:signal_end_bin]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            signal_data = tmp_data.mean(axis=1)
+            error_data = np.sqrt(tmp_data.sum(axis=1)) / (signal_end_bin - signal_start_bin)
+
+        # Avoid numpy C type variables overflow and NaN values
+        invalid = ~(signal_data >= 0)
+        signal_data[invalid] = 0.0
+        error_data[invalid] = 0.0
 
         return signal_data, error_data
 
@@ -214,25 +190,22 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         norm_start_bin = round(norm_start / bin_width)
         norm_end_bin = round(norm_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the sum and mean of the data in the normalization window
-            tmp_data = laser_arr[norm_start_bin:norm_end_bin]
-            reference_sum = np.sum(tmp_data)
-            reference_mean = (reference_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+        # calculate the sum and mean of the data in the normalization window for all laser pulses
+        tmp_data = laser_data[:, norm_start_bin:norm_end_bin]
+        reference_sum = np.sum(tmp_data, axis=1)
+        reference_mean = (reference_sum / tmp_data.shape[1]) if tmp_data.shape[1] != 0 else \
+            np.zeros(num_of_lasers)
 
-            # calculate the sum and mean of the data in the signal window
-            tmp_data = laser_arr[signal_start_bin:signal_end_bin]
-            signal_sum = np.sum(tmp_data)
-            signal_mean = (signal_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+        # calculate the sum and mean of the data in the signal window for all laser pulses
+        tmp_data = laser_data[:, signal_start_bin:signal_end_bin]
+        signal_sum = np.sum(tmp_data, axis=1)
+        signal_mean = (signal_sum / tmp_data.shape[1]) if tmp_data.shape[1] != 0 else \
+            np.zeros(num_of_lasers)
 
-            signal_data[ii] = signal_mean - reference_mean
+        signal_data = signal_mean - reference_mean
 
-            # calculate with respect to gaussian error 'evolution'
-            error_data[ii] = signal_data[ii] * np.sqrt(1 / abs(signal_sum) + 1 / abs(reference_sum))
+        # calculate with respect to gaussian error 'evolution'
+        with np.errstate(divide='ignore', invalid='ignore'):
+            error_data = signal_data * np.sqrt(1 / np.abs(signal_sum) + 1 / np.abs(reference_sum))
 
         return signal_data, error_data
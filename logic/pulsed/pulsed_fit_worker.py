@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the worker performing the fits of a pulsed measurement in a separate thread.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+from qtpy import QtCore
+
+from core.util.mutex import Mutex
+
+
+class PulsedFitWorker(QtCore.QObject):
+    """
+    Performs fits of the signal data in its own thread.
+
+    Only the most recent request per data set (signal or alternative signal data) is kept. If
+    another fit is requested while the previous request is still waiting, the previous request is
+    dropped. Each request carries an id that is passed on with the result, so the caller can
+    discard results of requests that have been superseded in the meantime.
+    """
+    sigFitFinished = QtCore.Signal(int, str, object, object, bool)
+    _sigProcessRequests = QtCore.Signal()
+
+    def __init__(self, fit_method):
+        """
+        @param callable fit_method: Called with the fit method name and the data (shape=(2,X)) to
+                                    fit. Returns a tuple of the fit method name actually used,
+                                    the fit data and the fit result.
+        """
+        super().__init__()
+        self._fit_method = fit_method
+        self._lock = Mutex()
+        # pending requests (request id, fit method name, data) for the signal data (False) and
+        # the alternative signal data (True)
+        self._pending_requests = dict()
+        self._sigProcessRequests.connect(self._process_requests, QtCore.Qt.QueuedConnection)
+        return
+
+    def request_fit(self, request_id, fit_method, data, use_alternative_data):
+        """ Schedules a fit. Thread-safe, can be called from any thread.
+
+        @param int request_id: id passed on with the result
+        @param str fit_method: name of the fit method to use
+        @param numpy.ndarray data: copy of the x and y data points to fit (shape=(2,X))
+        @param bool use_alternative_data: Flag indicating if the data is the alternative data
+        """
+        with self._lock:
+            processing_scheduled = len(self._pending_requests) > 0
+            self._pending_requests[use_alternative_data] = (request_id, fit_method, data)
+        if not processing_scheduled:
+            self._sigProcessRequests.emit()
+        return
+
+    def cancel_fit(self, use_alternative_data):
+        """ Drops the pending request for the (alternative) signal data if there is any.
+
+        @param bool use_alternative_data: Flag indicating the data set
+        """
+        with self._lock:
+            self._pending_requests.pop(use_alternative_data, None)
+        return
+
+    @QtCore.Slot()
+    def _process_requests(self):
+        while True:
+            with self._lock:
+                if not self._pending_requests:
+                    return
+                use_alternative_data = next(iter(self._pending_requests))
+                request_id, fit_method, data = self._pending_requests.pop(use_alternative_data)
+            fit_name, fit_data, fit_result = self._fit_method(fit_method, data)
+            self.sigFitFinished.emit(request_id, fit_name, fit_data, fit_result,
+                                     use_alternative_data)
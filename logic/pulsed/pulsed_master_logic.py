@@ -374,6 +374,14 @@ class PulsedMasterLogic(GenericLogic):
     def laser_data(self):
         return self.pulsedmeasurementlogic().laser_data
 
+    @property
+    def measurement_snapshot(self):
+        return self.pulsedmeasurementlogic().measurement_snapshot
+
+    @property
+    def stage_latencies(self):
+        return self.pulsedmeasurementlogic().stage_latencies
+
     @property
     def alternative_data_type(self):
         return self.pulsedmeasurementlogic().alternative_data_type
@@ -25,6 +25,7 @@ import numpy as np
 import copy
 import time
 import datetime
+import os
 import matplotlib.pyplot as plt
 
 from core.connector import Connector
@@ -37,6 +38,12 @@ from core.util.math import compute_ft
 from logic.generic_logic import GenericLogic
 from logic.pulsed.pulse_extractor import PulseExtractor
 from logic.pulsed.pulse_analyzer import PulseAnalyzer
+from logic.pulsed.pulsed_acquisition_worker import PulsedAcquisitionWorker
+from logic.pulsed.pulsed_acquisition_worker import PulsedMeasurementSnapshot
+from logic.pulsed.pulsed_fit_worker import PulsedFitWorker
+from logic.pulsed.raw_data_archive import RawDataArchive
+from logic.pulsed.raw_data_stash import RawDataStash
+from logic.pulsed.running_statistics import RunningStatistics, ExponentialRunningStatistics
 
 
 class PulsedMeasurementLogic(GenericLogic):
@@ -57,6 +64,33 @@ class PulsedMeasurementLogic(GenericLogic):
     analysis_import_path = ConfigOption(name='additional_analysis_path', default=None)
     # Optional file type descriptor for saving raw data to file
     _raw_data_save_type = ConfigOption(name='raw_data_save_type', default='text')
+    # Once the positions of the laser pulses in the raw data are stable, only process the counts
+    # that changed since the previous data pull instead of re-running the extraction every time.
+    # Only effective for ungated raw data and extraction methods that slice the laser pulses out
+    # of the raw data (gated raw data is not searched for laser pulses anyway).
+    _incremental_analysis = ConfigOption(name='incremental_analysis', default=False,
+                                         missing='nothing')
+    # Maximum deviation in bins between the laser pulse positions of two consecutive extractions
+    # for the positions to be considered stable
+    _incremental_analysis_tolerance = ConfigOption(name='incremental_analysis_tolerance',
+                                                   default=2, missing='nothing')
+    # Pull the raw data from the fast counter in a separate thread while the previous data is
+    # being analyzed
+    _threaded_acquisition = ConfigOption(name='threaded_acquisition', default=False,
+                                         missing='nothing')
+    # Append each pulled raw data trace to an on-disk archive for re-analysis with
+    # logic.pulsed.raw_data_archive.analyse_archive
+    _archive_raw_data = ConfigOption(name='archive_raw_data', default=False, missing='nothing')
+    # Number of raw data bytes collected before a compressed archive chunk is written to disk
+    _raw_data_archive_chunk_size = ConfigOption(name='raw_data_archive_chunk_size',
+                                                default=2**26, missing='nothing')
+    # Maximum number of bytes of compressed stashed raw data kept in memory. Beyond that the least
+    # recently used stashed raw data is spilled to disk (to raw_data_stash_path or a temporary
+    # directory if not given).
+    _raw_data_stash_memory = ConfigOption(name='raw_data_stash_memory', default=2**30,
+                                          missing='nothing')
+    _raw_data_stash_path = ConfigOption(name='raw_data_stash_path', default=None,
+                                        missing='nothing')
 
     # status variables
     # ext. microwave settings
@@ -112,6 +146,9 @@ class PulsedMeasurementLogic(GenericLogic):
     # Internal signals
     sigStartTimer = QtCore.Signal()
     sigStopTimer = QtCore.Signal()
+    sigStartAcquisition = QtCore.Signal(float)
+    sigStopAcquisition = QtCore.Signal()
+    sigPullData = QtCore.Signal()
 
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
@@ -129,6 +166,15 @@ class PulsedMeasurementLogic(GenericLogic):
 
         # threading
         self._threadlock = Mutex()
+        self._acquisition_thread = None
+        self._acquisition_worker = None
+        self._fit_thread = None
+        self._fit_worker = None
+        # Protects the fit container. Fits are not performed with _threadlock acquired.
+        self._fitlock = Mutex()
+        # id of the most recent fit request for the signal data (False) and the alternative signal
+        # data (True). Results of older requests are discarded.
+        self._fit_request_ids = {False: 0, True: 0}
 
         # measurement data
         self.signal_data = np.empty((2, 0), dtype=float)
@@ -136,9 +182,33 @@ class PulsedMeasurementLogic(GenericLogic):
         self.measurement_error = np.empty((2, 0), dtype=float)
         self.laser_data = np.zeros((10, 20), dtype='int64')
         self.raw_data = np.zeros((10, 20), dtype='int64')
-
-        self._saved_raw_data = OrderedDict()  # temporary saved raw data
+        # duration of each processing stage of the last analysis run in s
+        self._stage_latencies = dict()
+        # immutable copy of the latest results (PulsedMeasurementSnapshot)
+        self._measurement_snapshot = None
+        # Running statistics of the data points of the counts added by each data pull. Used for
+        # the measurement error if the analysis settings select the 'welford' or 'ewma' error
+        # model. _previous_laser_data holds the laser pulses of the previous data pull and
+        # _laser_positions the rising and falling flank indices of the current laser pulses.
+        self._pull_statistics = RunningStatistics()
+        self._ewm_pull_statistics = ExponentialRunningStatistics()
+        self._previous_laser_data = None
+        self._previous_laser_positions = None
+        self._laser_positions = None
+
+        self._saved_raw_data = None  # temporary saved raw data (RawDataStash)
         self._recalled_raw_data_tag = None  # the currently recalled raw data dict key
+        self._raw_data_archive = None  # RawDataArchive of the running measurement
+        self._raw_data_archive_path = None  # directory of the last raw data archive
+
+        # Fixed positions of the laser pulses in the raw data used for incremental analysis.
+        # Dict holding the raw data index of each laser_data element ('gather_index'), the
+        # laser_data index of each raw data element ('scatter_index', None if laser pulses overlap)
+        # and a copy of the last processed raw data ('raw_snapshot'). None if not fixed (yet).
+        self._fixed_extraction = None
+        # gather_index of the previous full extraction. Positions are fixed once two consecutive
+        # full extractions agree within incremental_analysis_tolerance bins.
+        self._extraction_candidate = None
 
         # Paused measurement flag
         self.__is_paused = False
@@ -205,11 +275,36 @@ class PulsedMeasurementLogic(GenericLogic):
         self._initialize_data_arrays()
 
         # recalled saved raw data dict key
+        self._saved_raw_data = RawDataStash(memory_budget=self._raw_data_stash_memory,
+                                            spill_directory=self._raw_data_stash_path)
         self._recalled_raw_data_tag = None
 
         # Connect internal signals
         self.sigStartTimer.connect(self.__analysis_timer.start, QtCore.Qt.QueuedConnection)
         self.sigStopTimer.connect(self.__analysis_timer.stop, QtCore.Qt.QueuedConnection)
+
+        # Create the acquisition worker living in its own thread
+        if self._threaded_acquisition:
+            self._acquisition_thread = QtCore.QThread()
+            self._acquisition_worker = PulsedAcquisitionWorker(self._get_raw_data)
+            self._acquisition_worker.moveToThread(self._acquisition_thread)
+            self._acquisition_worker.sigRawDataAcquired.connect(self._analyze_acquired_data,
+                                                                QtCore.Qt.QueuedConnection)
+            self.sigStartAcquisition.connect(self._acquisition_worker.start_acquisition,
+                                             QtCore.Qt.QueuedConnection)
+            # Blocking, so no data pull is in progress after the acquisition has been stopped
+            self.sigStopAcquisition.connect(self._acquisition_worker.stop_acquisition,
+                                            QtCore.Qt.BlockingQueuedConnection)
+            self.sigPullData.connect(self._acquisition_worker._acquire_data,
+                                     QtCore.Qt.QueuedConnection)
+            self._acquisition_thread.start()
+
+        # Create the fit worker living in its own thread
+        self._fit_thread = QtCore.QThread()
+        self._fit_worker = PulsedFitWorker(self._fit_data)
+        self._fit_worker.moveToThread(self._fit_thread)
+        self._fit_worker.sigFitFinished.connect(self._fit_finished, QtCore.Qt.QueuedConnection)
+        self._fit_thread.start()
         return
 
     def on_deactivate(self):
@@ -225,9 +320,29 @@ class PulsedMeasurementLogic(GenericLogic):
         self.extraction_parameters = self._pulseextractor.full_settings_dict
         self.analysis_parameters = self._pulseanalyzer.full_settings_dict
 
+        self._saved_raw_data.close()
+
         self.__analysis_timer.timeout.disconnect()
         self.sigStartTimer.disconnect()
         self.sigStopTimer.disconnect()
+
+        if self._acquisition_thread is not None:
+            self.sigStartAcquisition.disconnect()
+            self.sigStopAcquisition.disconnect()
+            self.sigPullData.disconnect()
+            self._acquisition_worker.sigRawDataAcquired.disconnect()
+            self._acquisition_thread.quit()
+            self._acquisition_thread.wait()
+            self._acquisition_thread = None
+            self._acquisition_worker = None
+
+        self._fit_worker.cancel_fit(False)
+        self._fit_worker.cancel_fit(True)
+        self._fit_worker.sigFitFinished.disconnect()
+        self._fit_thread.quit()
+        self._fit_thread.wait()
+        self._fit_thread = None
+        self._fit_worker = None
         return
 
     ############################################################################
@@ -572,6 +687,7 @@ class PulsedMeasurementLogic(GenericLogic):
             self._sampling_information = info_dict
         else:
             self._sampling_information = dict()
+        self._reset_fixed_extraction()
         return
 
     @property
@@ -584,6 +700,27 @@ class PulsedMeasurementLogic(GenericLogic):
             self.set_timer_interval(value)
         return
 
+    @property
+    def measurement_snapshot(self):
+        """ The latest measurement results as PulsedMeasurementSnapshot. Can be read without
+        blocking a running measurement.
+        """
+        return self._measurement_snapshot
+
+    @property
+    def stage_latencies(self):
+        """ Duration in seconds of each processing stage of the latest analysis run ('acquisition',
+        'archive' if archiving raw data, 'extraction', 'analysis', 'alt_data') and the age of the
+        raw data upon publication of the results ('data_age').
+        """
+        return self._stage_latencies.copy()
+
+    @property
+    def raw_data_archive_path(self):
+        """ Directory of the raw data archive of the running or last archived measurement.
+        """
+        return self._raw_data_archive_path
+
     @property
     def alternative_data_type(self):
         return str(self._alternative_data_type)
@@ -649,6 +786,8 @@ class PulsedMeasurementLogic(GenericLogic):
         # Use threadlock to update settings during a running measurement
         with self._threadlock:
             self._pulseanalyzer.analysis_settings = settings_dict
+            # Data pull results of the former settings are not comparable to the new ones
+            self._reset_pull_statistics()
             self.sigAnalysisSettingsUpdated.emit(self.analysis_settings)
         return
 
@@ -674,6 +813,8 @@ class PulsedMeasurementLogic(GenericLogic):
         # Use threadlock to update settings during a running measurement
         with self._threadlock:
             self._pulseextractor.extraction_settings = settings_dict
+            self._reset_fixed_extraction()
+            self._reset_pull_statistics()
             self.sigExtractionSettingsUpdated.emit(self.extraction_settings)
         return
 
@@ -709,7 +850,8 @@ class PulsedMeasurementLogic(GenericLogic):
             with self._threadlock:
                 if 'units' in settings_dict:
                     self._data_units = settings_dict.get('units')
-                    self.fc.set_units(self._data_units)
+                    with self._fitlock:
+                        self.fc.set_units(self._data_units)
                 if 'labels' in settings_dict:
                     self._data_labels = list(settings_dict.get('labels'))
 
@@ -778,6 +920,10 @@ class PulsedMeasurementLogic(GenericLogic):
                 # initialize data arrays
                 self._initialize_data_arrays()
 
+                # create archive for the raw data
+                if self._archive_raw_data:
+                    self._open_raw_data_archive()
+
                 # recall stashed raw data
                 if stashed_raw_data_tag in self._saved_raw_data:
                     self._recalled_raw_data_tag = stashed_raw_data_tag
@@ -803,7 +949,7 @@ class PulsedMeasurementLogic(GenericLogic):
 
                 # Set starting time and start timer (if present)
                 self.__start_time = time.time()
-                self.sigStartTimer.emit()
+                self._start_data_pulls()
 
                 # Set measurement paused flag
                 self.__is_paused = False
@@ -818,6 +964,7 @@ class PulsedMeasurementLogic(GenericLogic):
         """
         # Get raw data and analyze it a last time just before stopping the measurement.
         try:
+            self._stop_data_pulls()
             self._pulsed_analysis_loop()
         except:
             pass
@@ -825,7 +972,7 @@ class PulsedMeasurementLogic(GenericLogic):
         with self._threadlock:
             if self.module_state() == 'locked':
                 # stopping the timer
-                self.sigStopTimer.emit()
+                self._stop_data_pulls()
                 # Turn off fast counter
                 self.fast_counter_off()
                 # Turn off pulse generator
@@ -836,11 +983,14 @@ class PulsedMeasurementLogic(GenericLogic):
 
                 # stash raw data if requested
                 if stash_raw_data_tag:
-                    self._saved_raw_data[stash_raw_data_tag] = (self.raw_data.copy(),
+                    self._saved_raw_data[stash_raw_data_tag] = (self.raw_data,
                                                                 {'elapsed_sweeps': self.__elapsed_sweeps,
                                                                  'elapsed_time': self.__elapsed_time})
                 self._recalled_raw_data_tag = None
 
+                # write the remaining raw data to the archive
+                self._close_raw_data_archive()
+
                 # Set measurement paused flag
                 self.__is_paused = False
 
@@ -869,9 +1019,7 @@ class PulsedMeasurementLogic(GenericLogic):
         with self._threadlock:
             if self.module_state() == 'locked':
                 # pausing the timer
-                if self.__analysis_timer.isActive():
-                    # stopping the timer
-                    self.sigStopTimer.emit()
+                self._stop_data_pulls()
 
                 self.fast_counter_pause()
                 self.pulse_generator_off()
@@ -901,8 +1049,7 @@ class PulsedMeasurementLogic(GenericLogic):
                 self.pulse_generator_on()
 
                 # un-pausing the timer
-                if not self.__analysis_timer.isActive():
-                    self.sigStartTimer.emit()
+                self._start_data_pulls()
 
                 # Set measurement paused flag
                 self.__is_paused = False
@@ -927,9 +1074,9 @@ class PulsedMeasurementLogic(GenericLogic):
             if self.__timer_interval > 0:
                 self.__analysis_timer.setInterval(int(1000. * self.__timer_interval))
                 if self.module_state() == 'locked' and not self.__is_paused:
-                    self.sigStartTimer.emit()
+                    self._start_data_pulls()
             else:
-                self.sigStopTimer.emit()
+                self._stop_data_pulls()
 
             self.sigTimerUpdated.emit(self.__elapsed_time, self.__elapsed_sweeps,
                                       self.__timer_interval)
@@ -957,6 +1104,7 @@ class PulsedMeasurementLogic(GenericLogic):
                 self._alternative_data_type = alt_data_type
 
             self._compute_alt_data()
+            self._publish_measurement_snapshot()
             self.sigMeasurementDataUpdated.emit()
         return
 
@@ -965,7 +1113,10 @@ class PulsedMeasurementLogic(GenericLogic):
         """ Analyse and display the data
         """
         if self.module_state() == 'locked':
-            self._pulsed_analysis_loop()
+            if self._acquisition_worker is not None:
+                self.sigPullData.emit()
+            else:
+                self._pulsed_analysis_loop()
         return
 
     @QtCore.Slot(str)
@@ -974,6 +1125,11 @@ class PulsedMeasurementLogic(GenericLogic):
         """
         Performs the chosen fit on the measured data.
 
+        If no data is given, the fit of the (alternative) signal data is performed in the fit
+        worker thread and the result is emitted with sigFitUpdated once it is available. A newer
+        fit request for the same data supersedes a pending one. Only 'No Fit' is applied
+        immediately.
+
         @param str fit_method: name of the fit method to use
         @param bool use_alternative_data: Flag indicating if the signal data (False) or the
                                           alternative signal data (True) should be fitted.
@@ -981,36 +1137,74 @@ class PulsedMeasurementLogic(GenericLogic):
         @param 2D numpy.ndarray data: the x and y data points for the fit (shape=(2,X))
 
         @return (2D numpy.ndarray, result object): the resulting fit data and the fit result object
+                                                   if data is given as parameter
         """
-        # Set current fit
-        self.fc.set_current_fit(fit_method)
-
-        if data is None:
-            data = self.signal_alt_data if use_alternative_data else self.signal_data
-            update_fit_data = True
-        else:
-            update_fit_data = False
+        if data is not None:
+            if len(data) < 2 or len(data[0]) < 2 or len(data[1]) < 2:
+                self.log.debug('The data you are trying to fit does not contain enough data for '
+                               'a fit.')
+                return
+            _, fit_data, fit_result = self._fit_data(fit_method, data)
+            return fit_data, fit_result
 
+        # Published data arrays are never altered, but the copy keeps the fit independent.
+        data = np.array(self.signal_alt_data if use_alternative_data else self.signal_data)
         if len(data) < 2 or len(data[0]) < 2 or len(data[1]) < 2:
             self.log.debug('The data you are trying to fit does not contain enough data for a fit.')
             return
 
-        x_fit, y_fit, result = self.fc.do_fit(data[0], data[1])
+        self._fit_request_ids[use_alternative_data] += 1
+        request_id = self._fit_request_ids[use_alternative_data]
+        if fit_method == 'No Fit':
+            # Does not wait for the fit container, which may be busy with a fit in the worker
+            self._fit_worker.cancel_fit(use_alternative_data)
+            fit_x = np.linspace(data[0][0], data[0][-1],
+                                int(len(data[0]) * self.fc.fit_granularity_fact))
+            self._fit_finished(request_id, fit_method, np.array([fit_x, np.zeros(fit_x.shape)]),
+                               None, use_alternative_data)
+        else:
+            self._fit_worker.request_fit(request_id, fit_method, data, use_alternative_data)
+        return
 
-        fit_data = np.array([x_fit, y_fit])
+    def _fit_data(self, fit_method, data):
+        """
+        Fits the data with the fit container. Called from the fit worker thread.
 
-        if update_fit_data:
-            if use_alternative_data:
-                self.signal_fit_alt_data = fit_data
-                self.alt_fit_result = copy.deepcopy(self.fc.current_fit_result)
-                self.sigFitUpdated.emit(self.fc.current_fit, self.signal_fit_alt_data,
-                                        self.alt_fit_result, use_alternative_data)
-            else:
-                self.signal_fit_data = fit_data
-                self.fit_result = copy.deepcopy(self.fc.current_fit_result)
-                self.sigFitUpdated.emit(self.fc.current_fit, self.signal_fit_data, self.fit_result,
-                                        use_alternative_data)
-        return fit_data, self.fc.current_fit_result
+        @param str fit_method: name of the fit method to use
+        @param 2D numpy.ndarray data: the x and y data points for the fit (shape=(2,X))
+
+        @return (str, 2D numpy.ndarray, result object): the name of the fit method used, the
+                                                        resulting fit data and the fit result
+        """
+        with self._fitlock:
+            self.fc.set_current_fit(fit_method)
+            try:
+                x_fit, y_fit, result = self.fc.do_fit(data[0], data[1])
+            except:
+                self.log.exception('Fit "{0}" of pulsed measurement data failed.'
+                                   ''.format(fit_method))
+                self.fc.set_current_fit('No Fit')
+                x_fit, y_fit, result = self.fc.do_fit(data[0], data[1])
+            return (self.fc.current_fit,
+                    np.array([x_fit, y_fit]),
+                    copy.deepcopy(self.fc.current_fit_result))
+
+    @QtCore.Slot(int, str, object, object, bool)
+    def _fit_finished(self, request_id, fit_name, fit_data, fit_result, use_alternative_data):
+        """
+        Stores the result of a fit of the (alternative) signal data and emits sigFitUpdated.
+        Results of superseded fit requests are discarded.
+        """
+        if request_id != self._fit_request_ids[use_alternative_data]:
+            return
+        if use_alternative_data:
+            self.signal_fit_alt_data = fit_data
+            self.alt_fit_result = fit_result
+        else:
+            self.signal_fit_data = fit_data
+            self.fit_result = fit_result
+        self.sigFitUpdated.emit(fit_name, fit_data, fit_result, use_alternative_data)
+        return
 
     def _apply_invoked_settings(self):
         """
@@ -1024,7 +1218,8 @@ class PulsedMeasurementLogic(GenericLogic):
         if 'units' in self._measurement_information:
             with self._threadlock:
                 self._data_units = self._measurement_information.get('units')
-                self.fc.set_units(self._data_units)
+                with self._fitlock:
+                    self.fc.set_units(self._data_units)
         if 'labels' in self._measurement_information:
             with self._threadlock:
                 self._data_labels = list(self._measurement_information.get('labels'))
@@ -1097,66 +1292,288 @@ class PulsedMeasurementLogic(GenericLogic):
                                                                         self.__fast_counter_gates))
         return
 
+    def _start_data_pulls(self):
+        """ Starts pulling data periodically, either by the analysis timer or by the acquisition
+        worker.
+        """
+        if self._acquisition_worker is not None:
+            if self.__timer_interval > 0:
+                self.sigStartAcquisition.emit(self.__timer_interval)
+        else:
+            self.sigStartTimer.emit()
+        return
+
+    def _stop_data_pulls(self):
+        """ Stops pulling data periodically. Returns after a data pull by the acquisition worker in
+        progress has been finished.
+        """
+        if self._acquisition_worker is not None:
+            self.sigStopAcquisition.emit()
+        else:
+            self.sigStopTimer.emit()
+        return
+
     def _pulsed_analysis_loop(self):
         """ Acquires laser pulses from fast counter,
             calculates fluorescence signal and creates plots.
         """
         with self._threadlock:
             if self.module_state() == 'locked':
-                # Update elapsed time
-
-                self._extract_laser_pulses()
+                start = time.perf_counter()
+                fc_data, info_dict = self._get_raw_data()
+                stop = time.perf_counter()
+                self._process_raw_data(fc_data, info_dict, stop - start, stop)
 
-                tmp_signal, tmp_error = self._analyze_laser_pulses()
-
-                # exclude laser pulses to ignore
-                if len(self._laser_ignore_list) > 0:
-                    # Convert relative negative indices into absolute positive indices
-                    while self._laser_ignore_list[0] < 0:
-                        neg_index = self._laser_ignore_list[0]
-                        self._laser_ignore_list[0] = len(tmp_signal) + neg_index
-                        self._laser_ignore_list.sort()
-
-                    tmp_signal = np.delete(tmp_signal, self._laser_ignore_list)
-                    tmp_error = np.delete(tmp_error, self._laser_ignore_list)
-
-                # order data according to alternating flag
-                if self._alternating:
-                    if len(self.signal_data[0]) != len(tmp_signal[::2]):
-                        self.log.error('Length of controlled variable ({0}) does not match length of number of readout '
-                                       'pulses ({1}).'.format(len(self.signal_data[0]), len(tmp_signal[::2])))
-                        return
-                    self.signal_data[1] = tmp_signal[::2]
-                    self.signal_data[2] = tmp_signal[1::2]
-                    self.measurement_error[1] = tmp_error[::2]
-                    self.measurement_error[2] = tmp_error[1::2]
-                else:
-                    if len(self.signal_data[0]) != len(tmp_signal):
-                        self.log.error('Length of controlled variable ({0}) does not match length of number of readout '
-                                       'pulses ({1}).'.format(len(self.signal_data[0]), len(tmp_signal)))
-                        return
-                    self.signal_data[1] = tmp_signal
-                    self.measurement_error[1] = tmp_error
+            # emit signals
+            self.sigTimerUpdated.emit(self.__elapsed_time, self.__elapsed_sweeps,
+                                      self.__timer_interval)
+            self.sigMeasurementDataUpdated.emit()
+            return
 
-                # Compute alternative data array from signal
-                self._compute_alt_data()
+    @QtCore.Slot()
+    def _analyze_acquired_data(self):
+        """ Analyzes the raw data pulled by the acquisition worker.
+        """
+        with self._threadlock:
+            data = self._acquisition_worker.take_data()
+            if data is None or self.module_state() != 'locked':
+                return
+            self._process_raw_data(*data)
 
             # emit signals
             self.sigTimerUpdated.emit(self.__elapsed_time, self.__elapsed_sweeps,
                                       self.__timer_interval)
             self.sigMeasurementDataUpdated.emit()
-            return
+        return
+
+    def _process_raw_data(self, fc_data, info_dict, acquisition_latency, acquired_at):
+        """
+        Extracts and analyzes the laser pulses of the raw data and publishes the results.
+        Needs to be called with _threadlock acquired.
+
+        @param numpy.ndarray fc_data: The raw data (including recalled raw data)
+        @param dict info_dict: dict with keys 'elapsed_sweeps' and 'elapsed_time'
+        @param float acquisition_latency: time needed to pull the raw data in s
+        @param float acquired_at: time.perf_counter() at the end of the data pull
+        """
+        latencies = {'acquisition': acquisition_latency}
+        if self._raw_data_archive is not None:
+            start = time.perf_counter()
+            try:
+                self._raw_data_archive.append(fc_data, info_dict['elapsed_sweeps'],
+                                              info_dict['elapsed_time'])
+            except OSError:
+                self.log.exception('Writing raw data archive "{0}" failed. Raw data will no '
+                                   'longer be archived.'.format(self._raw_data_archive_path))
+                self._close_raw_data_archive()
+            latencies['archive'] = time.perf_counter() - start
+        start = time.perf_counter()
+        self._extract_laser_pulses(fc_data, info_dict)
+        stop = time.perf_counter()
+        latencies['extraction'] = stop - start
+
+        start = stop
+        tmp_signal, tmp_error = self._analyze_laser_pulses()
+        pull_signal = self._analyze_pulled_laser_pulses()
+
+        # exclude laser pulses to ignore
+        if len(self._laser_ignore_list) > 0:
+            # Convert relative negative indices into absolute positive indices
+            while self._laser_ignore_list[0] < 0:
+                neg_index = self._laser_ignore_list[0]
+                self._laser_ignore_list[0] = len(tmp_signal) + neg_index
+                self._laser_ignore_list.sort()
+
+            tmp_signal = np.delete(tmp_signal, self._laser_ignore_list)
+            tmp_error = np.delete(tmp_error, self._laser_ignore_list)
+            if pull_signal is not None:
+                pull_signal = np.delete(pull_signal, self._laser_ignore_list)
+
+        # Replace the error of the analysis method by the spread of the data pulls
+        if pull_signal is not None:
+            self._pull_statistics.update(pull_signal)
+            self._ewm_pull_statistics.update(pull_signal)
+        tmp_error = self._get_error_model_error(tmp_error)
+
+        # order data according to alternating flag. New arrays are created, so published results
+        # are never altered.
+        signal_data = self.signal_data.copy()
+        measurement_error = self.measurement_error.copy()
+        if self._alternating:
+            if len(signal_data[0]) != len(tmp_signal[::2]):
+                self.log.error('Length of controlled variable ({0}) does not match length of number of readout '
+                               'pulses ({1}).'.format(len(signal_data[0]), len(tmp_signal[::2])))
+                return
+            signal_data[1] = tmp_signal[::2]
+            signal_data[2] = tmp_signal[1::2]
+            measurement_error[1] = tmp_error[::2]
+            measurement_error[2] = tmp_error[1::2]
+        else:
+            if len(signal_data[0]) != len(tmp_signal):
+                self.log.error('Length of controlled variable ({0}) does not match length of number of readout '
+                               'pulses ({1}).'.format(len(signal_data[0]), len(tmp_signal)))
+                return
+            signal_data[1] = tmp_signal
+            measurement_error[1] = tmp_error
+        self.signal_data = signal_data
+        self.measurement_error = measurement_error
+        stop = time.perf_counter()
+        latencies['analysis'] = stop - start
+
+        # Compute alternative data array from signal
+        self._compute_alt_data()
+        latencies['alt_data'] = time.perf_counter() - stop
+
+        latencies['data_age'] = time.perf_counter() - acquired_at
+        self._stage_latencies = latencies
+        self._publish_measurement_snapshot()
+        return
+
+    def _publish_measurement_snapshot(self):
+        """ Creates a read-only PulsedMeasurementSnapshot of the current results.
+        """
+        # raw_data is owned by the module and never altered in place (see _get_raw_data).
+        # laser_data is altered in place by the incremental analysis.
+        if self._fixed_extraction is not None:
+            laser_data = self.laser_data.copy()
+        else:
+            laser_data = self.laser_data
+        arrays = list()
+        for arr in (self.signal_data, self.signal_alt_data, self.measurement_error, laser_data,
+                    self.raw_data):
+            arr = arr.view()
+            arr.flags.writeable = False
+            arrays.append(arr)
+        self._measurement_snapshot = PulsedMeasurementSnapshot(*arrays,
+                                                               elapsed_sweeps=self.__elapsed_sweeps,
+                                                               elapsed_time=self.__elapsed_time,
+                                                               stage_latencies=self.stage_latencies)
+        return
+
+    def _extract_laser_pulses(self, fc_data, info_dict):
+        """
+        Extracts the laser pulses from the raw data.
 
-    def _extract_laser_pulses(self):
-        # Get counter raw data (including recalled raw data from previous measurement)
-        fc_data, info_dict = self._get_raw_data()
+        @param numpy.ndarray fc_data: The raw data (including recalled raw data)
+        @param dict info_dict: dict with keys 'elapsed_sweeps' and 'elapsed_time'
+        """
         self.raw_data = fc_data
         self.__elapsed_sweeps = info_dict['elapsed_sweeps']
         self.__elapsed_time = info_dict['elapsed_time']
 
+        # Only add the counts changed since the last pull if the laser pulse positions are fixed
+        if self._fixed_extraction is not None and \
+                self._fixed_extraction['raw_snapshot'].shape == fc_data.shape:
+            self._add_raw_data_changes(fc_data)
+            return
+
         # extract laser pulses from raw data
         return_dict = self._pulseextractor.extract_laser_pulses(self.raw_data)
         self.laser_data = return_dict['laser_counts_arr']
+        self._laser_positions = (return_dict.get('laser_indices_rising'),
+                                 return_dict.get('laser_indices_falling'))
+        if self._incremental_analysis:
+            self._update_fixed_extraction(return_dict)
+        return
+
+    @QtCore.Slot()
+    def refresh_laser_extraction(self):
+        """ Discards the fixed laser pulse positions used for incremental analysis, so the laser
+        pulses are extracted from the full raw data again.
+        """
+        with self._threadlock:
+            self._reset_fixed_extraction()
+        return
+
+    def _reset_fixed_extraction(self):
+        self._fixed_extraction = None
+        self._extraction_candidate = None
+        return
+
+    def _update_fixed_extraction(self, return_dict):
+        """
+        Determines the raw data index of each element of the extracted laser pulses. Fixes these
+        positions for incremental analysis if they agree with the previous full extraction within
+        incremental_analysis_tolerance bins.
+        Extraction methods that do not simply slice the laser pulses out of the raw data are not
+        supported.
+
+        @param dict return_dict: result dictionary of the extraction method
+        """
+        laser_data = self.laser_data
+        raw_data = self.raw_data
+        rising = np.asarray(return_dict.get('laser_indices_rising', -1), dtype='int64')
+        if raw_data.ndim == 1 and laser_data.ndim == 2 and rising.shape == (
+                laser_data.shape[0],) and raw_data.any() and laser_data.any():
+            # each laser pulse starts at its rising flank
+            gather_index = rising[:, np.newaxis] + np.arange(laser_data.shape[1])
+            gather_index[gather_index >= raw_data.size] = -1
+        else:
+            gather_index = None
+
+        # The extraction result must be reproduced by the gather index
+        if gather_index is not None and (gather_index.min() < -1 or not np.array_equal(
+                np.where(gather_index >= 0, raw_data.ravel()[gather_index], 0), laser_data)):
+            gather_index = None
+
+        if self._is_stable_extraction(gather_index):
+            valid = gather_index >= 0
+            if not valid.any() or np.bincount(gather_index[valid]).max() == 1:
+                scatter_index = np.full(raw_data.size, -1, dtype='int64')
+                scatter_index[gather_index[valid]] = np.flatnonzero(valid)
+            else:
+                scatter_index = None
+            self.laser_data = np.array(laser_data, dtype='int64', order='C')
+            self._fixed_extraction = {'gather_index': gather_index,
+                                      'scatter_index': scatter_index,
+                                      'raw_snapshot': np.array(raw_data, dtype='int64')}
+            self.log.debug('Laser pulse positions fixed. Continuing with incremental analysis.')
+        self._extraction_candidate = gather_index
+        return
+
+    def _is_stable_extraction(self, gather_index):
+        """
+        Checks if the laser pulse positions of the current full extraction agree with the previous
+        one within incremental_analysis_tolerance bins.
+
+        @param numpy.ndarray gather_index: raw data index of each laser_data element (or None)
+
+        @return bool: True if the positions can be fixed, False otherwise
+        """
+        candidate = self._extraction_candidate
+        if gather_index is None or candidate is None or gather_index.shape != candidate.shape:
+            return False
+        valid = gather_index >= 0
+        if not np.array_equal(valid, candidate >= 0):
+            return False
+        if not valid.any():
+            return True
+        deviation = np.abs(gather_index[valid] - candidate[valid]).max()
+        return deviation <= self._incremental_analysis_tolerance
+
+    def _add_raw_data_changes(self, fc_data):
+        """
+        Adds the counts changed since the last data pull to the laser pulses using the fixed laser
+        pulse positions.
+
+        @param numpy.ndarray fc_data: The current raw data (including recalled raw data)
+        """
+        snapshot = self._fixed_extraction['raw_snapshot']
+        gather_index = self._fixed_extraction['gather_index']
+        scatter_index = self._fixed_extraction['scatter_index']
+        changes = (fc_data - snapshot).ravel()
+        np.copyto(snapshot, fc_data, casting='unsafe')
+        number_of_changes = np.count_nonzero(changes)
+        if scatter_index is not None and 4 * number_of_changes < gather_index.size:
+            # Only few raw data bins received new counts. Add these to the laser pulses.
+            changed = np.flatnonzero(changes)
+            laser_index = scatter_index[changed]
+            in_laser = laser_index >= 0
+            self.laser_data.ravel()[laser_index[in_laser]] += changes[changed[in_laser]]
+        elif number_of_changes > 0:
+            # Most bins changed. Gathering the laser pulses from the raw data is cheaper.
+            self.laser_data = snapshot.ravel().take(gather_index, mode='clip')
+            self.laser_data[gather_index < 0] = 0
         return
 
     def _analyze_laser_pulses(self):
@@ -1170,6 +1587,68 @@ class PulsedMeasurementLogic(GenericLogic):
             tmp_error = np.zeros(self.laser_data.shape[0])
         return tmp_signal, tmp_error
 
+    def _analyze_pulled_laser_pulses(self):
+        """
+        Analyzes the counts added to the laser pulses since the previous data pull. Only done if
+        the 'welford' or 'ewma' error model is applied.
+
+        @return numpy.ndarray: data points of the pulled counts (None if not available)
+        """
+        if self._pulseanalyzer.applied_error_model == 'shot_noise':
+            if self._previous_laser_data is not None:
+                self._reset_pull_statistics()
+            return None
+
+        previous = self._previous_laser_data
+        previous_positions = self._previous_laser_positions
+        self._previous_laser_data = self.laser_data.copy()
+        self._previous_laser_positions = self._laser_positions
+        # The counts of the first pull may contain recalled raw data or counts of several pulls.
+        # Counts of laser pulses extracted at different positions can not be subtracted.
+        if previous is None or previous.shape != self.laser_data.shape:
+            return None
+        if previous_positions is not self._laser_positions and not all(
+                np.array_equal(old, new) for old, new in zip(previous_positions,
+                                                             self._laser_positions)):
+            return None
+        pulled_data = self.laser_data - previous
+        if not pulled_data.any():
+            return None
+        pull_signal, _ = self._pulseanalyzer.analyse_laser_pulses(pulled_data)
+        return pull_signal
+
+    def _get_error_model_error(self, tmp_error):
+        """
+        Returns the measurement error according to the error model in the analysis settings.
+
+        @param numpy.ndarray tmp_error: the error returned by the analysis method
+        @return numpy.ndarray: the measurement error of each data point
+        """
+        error_model = self._pulseanalyzer.applied_error_model
+        if error_model == 'welford':
+            statistics = self._pull_statistics
+        elif error_model == 'ewma':
+            statistics = self._ewm_pull_statistics
+            statistics.alpha = self._pulseanalyzer.error_model_alpha
+        else:
+            return tmp_error
+        # Fall back to the error of the analysis method until the spread can be estimated
+        if statistics.count < 2 or statistics.mean.shape != tmp_error.shape:
+            return tmp_error
+        if self._pulseanalyzer.is_accumulating_analysis:
+            # The result is the sum of the first pull and all pulls in the statistics
+            return np.sqrt(statistics.variance * (statistics.count + 1))
+        return statistics.standard_error
+
+    def _reset_pull_statistics(self):
+        """ Restarts the running statistics of the data pulls.
+        """
+        self._pull_statistics.reset()
+        self._ewm_pull_statistics.reset()
+        self._previous_laser_data = None
+        self._previous_laser_positions = None
+        return
+
     def _get_raw_data(self):
         """
         Get the raw count data from the fast counting hardware and perform sanity checks.
@@ -1184,6 +1663,7 @@ class PulsedMeasurementLogic(GenericLogic):
         else:
             info_dict = {'elapsed_sweeps': None, 'elapsed_time': None}
         fc_data = netobtain(fc_data)
+        hardware_data = fc_data
 
         if isinstance(info_dict, dict) and info_dict.get('elapsed_sweeps') is not None:
             elapsed_sweeps = info_dict['elapsed_sweeps']
@@ -1196,18 +1676,22 @@ class PulsedMeasurementLogic(GenericLogic):
             elapsed_time = time.time() - self.__start_time
 
         # add old raw data from previous measurements if necessary
-        if self._saved_raw_data.get(self._recalled_raw_data_tag) is not None:
+        stashed = None
+        if self._recalled_raw_data_tag is not None:
+            stashed = self._saved_raw_data.get(self._recalled_raw_data_tag)
+        if stashed is not None:
             # self.log.info('Found old saved raw data with tag "{0}".'
             #               ''.format(self._recalled_raw_data_tag))
-            elapsed_sweeps += self._saved_raw_data[self._recalled_raw_data_tag][1]['elapsed_sweeps']
-            elapsed_time += self._saved_raw_data[self._recalled_raw_data_tag][1]['elapsed_time']
+            stashed_data, stashed_info = stashed
+            elapsed_sweeps += stashed_info['elapsed_sweeps']
+            elapsed_time += stashed_info['elapsed_time']
             if not fc_data.any():
                 self.log.warning('Only zeros received from fast counter!\n'
                                  'Using recalled raw data only.')
-                fc_data = self._saved_raw_data[self._recalled_raw_data_tag][0]
-            elif self._saved_raw_data[self._recalled_raw_data_tag][0].shape == fc_data.shape:
+                fc_data = np.array(stashed_data, dtype='int64')
+            elif stashed_data.shape == fc_data.shape:
                 self.log.debug('Recalled raw data has the same shape as current data.')
-                fc_data = self._saved_raw_data[self._recalled_raw_data_tag][0] + fc_data
+                fc_data = np.add(stashed_data, fc_data, dtype='int64')
             else:
                 self.log.warning('Recalled raw data has not the same shape as current data.'
                                  '\nDid NOT add recalled raw data to current time trace.')
@@ -1215,8 +1699,52 @@ class PulsedMeasurementLogic(GenericLogic):
             self.log.warning('Only zeros received from fast counter!')
             fc_data = np.zeros(fc_data.shape, dtype='int64')
 
+        # The returned raw data ends up in the published results. Read-only data is a buffer the
+        # fast counter reuses for later calls (see FastCounterInterface.get_data_trace), so it is
+        # copied. This is the only copy of the raw data per data pull.
+        if fc_data is hardware_data and not fc_data.flags.writeable:
+            fc_data = fc_data.copy()
         return fc_data, {'elapsed_sweeps': elapsed_sweeps, 'elapsed_time': elapsed_time}
 
+    def _open_raw_data_archive(self):
+        """ Creates a new raw data archive in the data directory of this module. The settings
+        needed for re-analysis are stored along with the raw data.
+        """
+        timestamp = datetime.datetime.now()
+        self._raw_data_archive_path = os.path.join(
+            self.savelogic().get_path_for_module('PulsedMeasurement'),
+            timestamp.strftime('%Y%m%d-%H%M-%S' + '_raw_data_archive'))
+        settings = {'fast_counter_settings': self.fast_counter_settings,
+                    'measurement_settings': self.measurement_settings,
+                    'sampling_information': copy.deepcopy(self.sampling_information),
+                    'extraction_settings': self.extraction_settings,
+                    'analysis_settings': self.analysis_settings,
+                    'extraction_import_path': self.extraction_import_path,
+                    'analysis_import_path': self.analysis_import_path}
+        try:
+            self._raw_data_archive = RawDataArchive(self._raw_data_archive_path,
+                                                    settings,
+                                                    chunk_size=self._raw_data_archive_chunk_size)
+        except OSError:
+            self.log.exception('Unable to create raw data archive in "{0}". Raw data will not be '
+                               'archived.'.format(self._raw_data_archive_path))
+            self._raw_data_archive = None
+        return
+
+    def _close_raw_data_archive(self):
+        """ Writes the remaining raw data to the archive of the running measurement.
+        """
+        if self._raw_data_archive is None:
+            return
+        try:
+            self._raw_data_archive.close()
+            self.log.info('Raw data archived in "{0}".'.format(self._raw_data_archive_path))
+        except OSError:
+            self.log.exception('Writing raw data archive "{0}" failed.'
+                               ''.format(self._raw_data_archive_path))
+        self._raw_data_archive = None
+        return
+
     def _initialize_data_arrays(self):
         """
         Initializing the signal, error, laser and raw data arrays.
@@ -1241,7 +1769,11 @@ class PulsedMeasurementLogic(GenericLogic):
             self.raw_data = np.zeros((self._number_of_lasers, number_of_bins), dtype='int64')
         else:
             self.raw_data = np.zeros(number_of_bins, dtype='int64')
+        self._reset_fixed_extraction()
+        self._reset_pull_statistics()
 
+        self._stage_latencies = dict()
+        self._publish_measurement_snapshot()
         self.sigMeasurementDataUpdated.emit()
         return
 
@@ -1339,6 +1871,7 @@ class PulsedMeasurementLogic(GenericLogic):
             parameters['analysis parameters'] = self.analysis_settings
             parameters['extraction parameters'] = self.extraction_settings
             parameters['fast counter settings'] = self.fast_counter_settings
+            parameters['Data pulls in error statistics'] = self._pull_statistics.count
 
             if save_figure:
                 # Prepare the figure to save as a "data thumbnail"
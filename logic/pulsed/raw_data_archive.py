@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the on-disk archive of the raw data traces pulled during a pulsed measurement
+and the tools to re-analyse archived measurements offline.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import copy
+import logging
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+
+class RawDataArchive:
+    """
+    Appends the raw data traces pulled during a pulsed measurement to a directory of compressed
+    chunk files.
+
+    Each trace is stored as the difference to the previous trace together with a time stamp, the
+    elapsed sweeps and the elapsed measurement time. Only the first trace of every
+    full_trace_interval-th chunk (and of the first chunk after a change of the trace shape) is
+    stored completely, so the differences also apply across chunk boundaries. Chunks are
+    compressed and written to disk in a background thread. The measurement settings needed to
+    re-analyse the traces are stored once upon creation of the archive.
+    """
+    settings_file_name = 'archive_settings.pickle'
+    chunk_file_name = 'chunk_{0:06d}.npz'
+
+    def __init__(self, directory, settings, chunk_size=2**26, full_trace_interval=16):
+        """
+        @param str directory: path of the archive directory (created if not present)
+        @param dict settings: measurement settings needed for re-analysis with the keys
+                              'fast_counter_settings', 'measurement_settings',
+                              'sampling_information', 'extraction_settings',
+                              'analysis_settings', 'extraction_import_path' and
+                              'analysis_import_path' (see
+                              PulsedMeasurementLogic._open_raw_data_archive)
+        @param int chunk_size: number of raw data bytes to collect before writing a chunk
+        @param int full_trace_interval: number of chunks after which a full trace is stored again
+        """
+        self.directory = directory
+        self._chunk_size = int(chunk_size)
+        self._full_trace_interval = max(1, int(full_trace_interval))
+        self._chunk_number = 0
+        self._full_trace_chunk = 0
+        self._previous_trace = None
+        self._buffer = list()
+        self._buffered_bytes = 0
+        self._buffer_starts_with_full_trace = False
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._write_result = None
+
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, self.settings_file_name), 'wb') as file:
+            pickle.dump(settings, file)
+        return
+
+    def append(self, raw_data, elapsed_sweeps, elapsed_time, timestamp=None):
+        """ Adds a raw data trace to the archive. Errors raised while writing a previous chunk are
+        passed on.
+
+        @param numpy.ndarray raw_data: accumulated raw data (1D for ungated, 2D for gated counter)
+        @param int elapsed_sweeps: number of sweeps accumulated in raw_data
+        @param float elapsed_time: measurement time accumulated in raw_data in s
+        @param float timestamp: time.time() of the data pull (defaults to now)
+        """
+        if self._write_result is not None and self._write_result.done():
+            self._check_write_result()
+
+        raw_data = np.asarray(raw_data, dtype='int64')
+        if self._previous_trace is not None and raw_data.shape != self._previous_trace.shape:
+            self._write_chunk()
+            self._previous_trace = None
+        if not self._buffer:
+            self._buffer_starts_with_full_trace = self._previous_trace is None or \
+                self._chunk_number - self._full_trace_chunk >= self._full_trace_interval
+            if self._buffer_starts_with_full_trace:
+                self._full_trace_chunk = self._chunk_number
+        if self._buffer or not self._buffer_starts_with_full_trace:
+            trace = raw_data - self._previous_trace
+        else:
+            trace = raw_data.copy()
+        self._previous_trace = raw_data.copy()
+        self._buffer.append((trace,
+                             time.time() if timestamp is None else timestamp,
+                             -1 if elapsed_sweeps is None else elapsed_sweeps,
+                             elapsed_time))
+        self._buffered_bytes += trace.nbytes
+        if self._buffered_bytes >= self._chunk_size:
+            self._write_chunk()
+        return
+
+    def close(self):
+        """ Writes the remaining traces to disk and waits for all chunks to be written.
+        """
+        try:
+            self._write_chunk()
+            self._check_write_result()
+        finally:
+            self._writer.shutdown(wait=True)
+        return
+
+    def _check_write_result(self):
+        """ Waits for the chunk being written and passes on errors raised during writing.
+        """
+        if self._write_result is None:
+            return
+        result, self._write_result = self._write_result, None
+        result.result()
+        return
+
+    def _write_chunk(self):
+        if not self._buffer:
+            return
+        traces, timestamps, sweeps, elapsed_times = zip(*self._buffer)
+        traces = np.stack(traces)
+        # The differences between traces are small, so a smaller integer type is usually enough
+        traces = traces.astype(np.result_type(np.min_scalar_type(traces.min()),
+                                              np.min_scalar_type(traces.max())), copy=False)
+        file_path = os.path.join(self.directory, self.chunk_file_name.format(self._chunk_number))
+        self._buffer = list()
+        self._buffered_bytes = 0
+        self._chunk_number += 1
+        # Only one chunk is written at a time, so buffered chunks can not pile up in memory
+        self._check_write_result()
+        self._write_result = self._writer.submit(
+            np.savez_compressed,
+            file_path,
+            traces=traces,
+            full_trace=np.array(self._buffer_starts_with_full_trace),
+            timestamps=np.array(timestamps, dtype=float),
+            elapsed_sweeps=np.array(sweeps, dtype='int64'),
+            elapsed_time=np.array(elapsed_times, dtype=float))
+        return
+
+
+class RawDataArchiveReader:
+    """
+    Read access to a directory written by RawDataArchive.
+
+    Only the time stamps and sweep counts of all chunks are loaded upon creation. Traces are
+    reconstructed from their differences when requested, starting from the last chunk beginning
+    with a full trace.
+    """
+
+    def __init__(self, directory):
+        """
+        @param str directory: path of the archive directory
+        """
+        self.directory = directory
+        with open(os.path.join(directory, RawDataArchive.settings_file_name), 'rb') as file:
+            self.settings = pickle.load(file)
+
+        self._chunk_paths = list()
+        timestamps = list()
+        sweeps = list()
+        elapsed_times = list()
+        self._chunk_offsets = [0]
+        self._full_trace_chunks = list()
+        chunk_number = 0
+        while True:
+            path = os.path.join(directory, RawDataArchive.chunk_file_name.format(chunk_number))
+            if not os.path.isfile(path):
+                break
+            with np.load(path) as chunk:
+                timestamps.append(chunk['timestamps'])
+                sweeps.append(chunk['elapsed_sweeps'])
+                elapsed_times.append(chunk['elapsed_time'])
+                if 'full_trace' not in chunk.files or chunk['full_trace']:
+                    self._full_trace_chunks.append(chunk_number)
+            self._chunk_paths.append(path)
+            self._chunk_offsets.append(self._chunk_offsets[-1] + len(timestamps[-1]))
+            chunk_number += 1
+        self.timestamps = np.concatenate(timestamps) if timestamps else np.empty(0, dtype=float)
+        self.elapsed_sweeps = np.concatenate(sweeps) if sweeps else np.empty(0, dtype='int64')
+        self.elapsed_time = np.concatenate(elapsed_times) if elapsed_times else np.empty(0,
+                                                                                       dtype=float)
+        return
+
+    @property
+    def number_of_traces(self):
+        return self.timestamps.size
+
+    def get_trace(self, index):
+        """ Reconstructs the accumulated raw data of a single trace.
+
+        @param int index: index of the trace (negative indices count from the last trace)
+
+        @return numpy.ndarray: accumulated raw data of the trace
+        """
+        if index < 0:
+            index += self.number_of_traces
+        if not 0 <= index < self.number_of_traces:
+            raise IndexError('Trace index {0} out of range for archive with {1:d} traces.'
+                             ''.format(index, self.number_of_traces))
+        chunk_index = int(np.searchsorted(self._chunk_offsets, index, side='right')) - 1
+        first_chunk = self._full_trace_chunks[
+            int(np.searchsorted(self._full_trace_chunks, chunk_index, side='right')) - 1]
+        raw_data = None
+        for current_chunk in range(first_chunk, chunk_index + 1):
+            with np.load(self._chunk_paths[current_chunk]) as chunk:
+                traces = chunk['traces']
+            if current_chunk == chunk_index:
+                traces = traces[:index - self._chunk_offsets[chunk_index] + 1]
+            if raw_data is None:
+                raw_data = traces.sum(axis=0, dtype='int64')
+            else:
+                raw_data += traces.sum(axis=0, dtype='int64')
+        return raw_data
+
+    def iter_traces(self):
+        """ Iterates over all traces in the order they were pulled.
+
+        @return generator: yields tuples of time stamp, elapsed sweeps, elapsed time and the
+                           accumulated raw data
+        """
+        index = 0
+        raw_data = None
+        full_trace_chunks = set(self._full_trace_chunks)
+        for chunk_number, path in enumerate(self._chunk_paths):
+            with np.load(path) as chunk:
+                traces = chunk['traces']
+            if chunk_number in full_trace_chunks:
+                raw_data = np.zeros(traces.shape[1:], dtype='int64')
+            for trace in traces:
+                raw_data += trace
+                yield (self.timestamps[index], self.elapsed_sweeps[index],
+                       self.elapsed_time[index], raw_data.copy())
+                index += 1
+
+    def get_window(self, start_time=None, stop_time=None):
+        """ Counts accumulated between two points in measurement time. The window boundaries are
+        rounded down to the last pulled trace.
+
+        @param float start_time: start of the window in s of elapsed measurement time
+                                 (None for measurement start)
+        @param float stop_time: end of the window in s of elapsed measurement time
+                                (None for measurement end)
+
+        @return tuple(numpy.ndarray, int, float): raw data, sweeps and measurement time
+                                                  accumulated within the window
+        """
+        if self.number_of_traces < 1:
+            raise ValueError('Raw data archive "{0}" contains no traces.'.format(self.directory))
+        if stop_time is None:
+            stop_index = self.number_of_traces - 1
+        else:
+            stop_index = int(np.searchsorted(self.elapsed_time, stop_time, side='right')) - 1
+            if stop_index < 0:
+                raise ValueError('No trace pulled before {0} s.'.format(stop_time))
+        raw_data = self.get_trace(stop_index)
+        sweeps = int(self.elapsed_sweeps[stop_index])
+        elapsed_time = float(self.elapsed_time[stop_index])
+        if start_time is not None:
+            start_index = int(np.searchsorted(self.elapsed_time, start_time, side='right')) - 1
+            if 0 <= start_index < stop_index:
+                start_data = self.get_trace(start_index)
+                if start_data.shape == raw_data.shape:
+                    raw_data -= start_data
+                    sweeps -= int(self.elapsed_sweeps[start_index])
+                    elapsed_time -= float(self.elapsed_time[start_index])
+        return raw_data, sweeps, elapsed_time
+
+
+class ArchivedMeasurementContext:
+    """
+    Stand-in for PulsedMeasurementLogic providing PulseExtractor and PulseAnalyzer with the
+    settings stored in a raw data archive.
+    """
+
+    def __init__(self, settings, extraction_settings=None, analysis_settings=None):
+        """
+        @param dict settings: settings stored in the raw data archive
+        @param dict extraction_settings: extraction settings overriding the archived ones
+        @param dict analysis_settings: analysis settings overriding the archived ones
+        """
+        self._settings = settings
+        self.extraction_import_path = settings.get('extraction_import_path')
+        self.analysis_import_path = settings.get('analysis_import_path')
+        self.extraction_parameters = dict(settings.get('extraction_settings', dict()))
+        self.analysis_parameters = dict(settings.get('analysis_settings', dict()))
+        if extraction_settings:
+            self.extraction_parameters.update(extraction_settings)
+        if analysis_settings:
+            self.analysis_parameters.update(analysis_settings)
+        self.log = logging.getLogger(__name__)
+        return
+
+    @property
+    def fast_counter_settings(self):
+        return copy.deepcopy(self._settings['fast_counter_settings'])
+
+    @property
+    def measurement_settings(self):
+        return copy.deepcopy(self._settings['measurement_settings'])
+
+    @property
+    def sampling_information(self):
+        return copy.deepcopy(self._settings['sampling_information'])
+
+
+def analyse_archive(directory, start_time=None, stop_time=None, extraction_settings=None,
+                    analysis_settings=None):
+    """
+    Re-analyses the raw data of an archived measurement accumulated within a time window.
+
+    @param str directory: path of the raw data archive
+    @param float start_time: start of the window in s of elapsed measurement time
+    @param float stop_time: end of the window in s of elapsed measurement time
+    @param dict extraction_settings: extraction settings to use instead of the archived ones
+    @param dict analysis_settings: analysis settings to use instead of the archived ones
+
+    @return dict: signal_data and measurement_error (arranged like in PulsedMeasurementLogic),
+                  laser_data, elapsed_sweeps, elapsed_time and the settings used
+    """
+    # Imported here to keep the module light-weight when only writing archives
+    from logic.pulsed.pulse_extractor import PulseExtractor
+    from logic.pulsed.pulse_analyzer import PulseAnalyzer
+
+    archive = RawDataArchiveReader(directory)
+    raw_data, elapsed_sweeps, elapsed_time = archive.get_window(start_time, stop_time)
+    context = ArchivedMeasurementContext(archive.settings, extraction_settings, analysis_settings)
+    extractor = PulseExtractor(context)
+    analyzer = PulseAnalyzer(context)
+
+    laser_data = extractor.extract_laser_pulses(raw_data)['laser_counts_arr']
+    if laser_data.any():
+        tmp_signal, tmp_error = analyzer.analyse_laser_pulses(laser_data)
+    else:
+        tmp_signal = np.zeros(laser_data.shape[0])
+        tmp_error = np.zeros(laser_data.shape[0])
+
+    measurement_settings = context.measurement_settings
+    ignore_list = sorted(i % len(tmp_signal) for i in measurement_settings['laser_ignore_list'])
+    if ignore_list:
+        tmp_signal = np.delete(tmp_signal, ignore_list)
+        tmp_error = np.delete(tmp_error, ignore_list)
+
+    controlled_variable = np.asarray(measurement_settings['controlled_variable'], dtype=float)
+    if measurement_settings['alternating']:
+        signal_data = np.array([controlled_variable, tmp_signal[::2], tmp_signal[1::2]])
+        measurement_error = np.array([controlled_variable, tmp_error[::2], tmp_error[1::2]])
+    else:
+        signal_data = np.array([controlled_variable, tmp_signal])
+        measurement_error = np.array([controlled_variable, tmp_error])
+
+    return {'signal_data': signal_data,
+            'measurement_error': measurement_error,
+            'laser_data': laser_data,
+            'elapsed_sweeps': elapsed_sweeps,
+            'elapsed_time': elapsed_time,
+            'extraction_settings': extractor.extraction_settings,
+            'analysis_settings': analyzer.analysis_settings}
+
+
+def analyse_archives(jobs, max_workers=None):
+    """
+    Runs several re-analyses of archived measurements in parallel processes, e.g. to sweep
+    extraction parameters across time windows of many archived runs.
+
+    @param list jobs: dicts with the keyword arguments for analyse_archive
+    @param int max_workers: maximum number of processes (defaults to the number of processors)
+
+    @return list: the results of analyse_archive in the order of jobs
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(analyse_archive, **job) for job in jobs]
+        return [future.result() for future in futures]
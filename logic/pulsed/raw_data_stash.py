@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the storage for raw data stashed between pulsed measurements.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import copy
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import numpy as np
+
+
+class RawDataStash(MutableMapping):
+    """
+    Mapping of tags to stashed raw data tuples (raw_data, info_dict) with bounded memory usage.
+
+    The raw data is stored in the smallest integer type holding all values and compressed in
+    memory. If the compressed data of all tags exceeds memory_budget bytes, the least recently
+    used tags are spilled to disk (uncompressed, to be memory-mapped upon access).
+
+    Returned raw data arrays are read-only and may have a smaller integer type than the stashed
+    ones. The decompressed data of the most recently accessed tag is kept, so repeated access to
+    the same tag (e.g. during a measurement continuing stashed raw data) does not decompress again.
+    """
+    _compression_level = 1
+
+    def __init__(self, memory_budget=2**30, spill_directory=None):
+        """
+        @param int memory_budget: maximum number of bytes of compressed raw data kept in memory
+        @param str spill_directory: directory to spill raw data to (temporary directory if None)
+        """
+        self._memory_budget = int(memory_budget)
+        self._spill_directory = spill_directory
+        self._temporary_directory = None
+        self._file_counter = 0
+        self._lock = threading.RLock()
+        # tag -> dict with 'info', 'shape', 'dtype' and either 'compressed' (bytes) or 'path'
+        self._entries = OrderedDict()
+        self._memory_usage = 0
+        # (tag, array) of the most recently accessed tag
+        self._accessed = None
+        return
+
+    @property
+    def memory_usage(self):
+        """ Number of bytes of compressed raw data held in memory.
+        """
+        return self._memory_usage
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def __contains__(self, tag):
+        return tag in self._entries
+
+    def __getitem__(self, tag):
+        with self._lock:
+            entry = self._entries[tag]
+            self._entries.move_to_end(tag)
+            if self._accessed is not None and self._accessed[0] == tag:
+                raw_data = self._accessed[1]
+            elif 'path' in entry:
+                raw_data = np.load(entry['path'], mmap_mode='r')
+            else:
+                raw_data = np.frombuffer(zlib.decompress(entry['compressed']),
+                                         dtype=entry['dtype']).reshape(entry['shape'])
+                self._accessed = (tag, raw_data)
+            return raw_data, copy.deepcopy(entry['info'])
+
+    def __setitem__(self, tag, value):
+        raw_data, info_dict = value
+        raw_data = np.asarray(raw_data)
+        if raw_data.size > 0:
+            dtype = np.result_type(np.min_scalar_type(raw_data.min()),
+                                   np.min_scalar_type(raw_data.max()))
+        else:
+            dtype = raw_data.dtype
+        compressed = zlib.compress(np.ascontiguousarray(raw_data, dtype=dtype).tobytes(),
+                                   self._compression_level)
+        with self._lock:
+            if tag in self._entries:
+                self._remove_entry(tag)
+            self._entries[tag] = {'info': copy.deepcopy(info_dict),
+                                  'shape': raw_data.shape,
+                                  'dtype': dtype,
+                                  'compressed': compressed}
+            self._memory_usage += len(compressed)
+            self._enforce_memory_budget()
+        return
+
+    def __delitem__(self, tag):
+        with self._lock:
+            self._remove_entry(tag)
+        return
+
+    def clear(self):
+        with self._lock:
+            for tag in list(self._entries):
+                self._remove_entry(tag)
+        return
+
+    def close(self):
+        """ Removes all stashed raw data including the spilled files.
+        """
+        with self._lock:
+            self.clear()
+            if self._temporary_directory is not None:
+                shutil.rmtree(self._temporary_directory, ignore_errors=True)
+                self._temporary_directory = None
+        return
+
+    def _remove_entry(self, tag):
+        entry = self._entries.pop(tag)
+        if self._accessed is not None and self._accessed[0] == tag:
+            self._accessed = None
+        if 'path' in entry:
+            try:
+                os.remove(entry['path'])
+            except OSError:
+                pass
+        else:
+            self._memory_usage -= len(entry['compressed'])
+        return
+
+    def _enforce_memory_budget(self):
+        """ Spills the least recently used tags to disk until the memory budget is met.
+        """
+        for tag, entry in list(self._entries.items()):
+            if self._memory_usage <= self._memory_budget:
+                break
+            if 'path' in entry:
+                continue
+            raw_data = np.frombuffer(zlib.decompress(entry['compressed']),
+                                     dtype=entry['dtype']).reshape(entry['shape'])
+            path = os.path.join(self._get_spill_directory(),
+                                'raw_data_stash_{0:d}.npy'.format(self._file_counter))
+            self._file_counter += 1
+            np.save(path, raw_data)
+            self._memory_usage -= len(entry.pop('compressed'))
+            entry['path'] = path
+            if self._accessed is not None and self._accessed[0] == tag:
+                self._accessed = None
+        return
+
+    def _get_spill_directory(self):
+        if self._spill_directory is not None:
+            os.makedirs(self._spill_directory, exist_ok=True)
+            return self._spill_directory
+        if self._temporary_directory is None:
+            self._temporary_directory = tempfile.mkdtemp(prefix='qudi_raw_data_stash_')
+        return self._temporary_directory
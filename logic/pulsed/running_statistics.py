@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains running (online) statistics of the data points of a pulsed measurement across
+data pulls.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+
+
+class RunningStatistics:
+    """
+    Element-wise running mean and variance of a sequence of equally shaped arrays using Welford's
+    algorithm. Memory usage does not depend on the number of samples.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = None
+        self._sum_of_squares = None
+        return
+
+    def reset(self):
+        self.count = 0
+        self.mean = None
+        self._sum_of_squares = None
+        return
+
+    def update(self, values):
+        """ Adds a sample. A sample of different shape restarts the statistics.
+
+        @param numpy.ndarray values: the sample
+        """
+        values = np.asarray(values, dtype=float)
+        if self.mean is None or self.mean.shape != values.shape:
+            self.count = 0
+            self.mean = np.zeros(values.shape, dtype=float)
+            self._sum_of_squares = np.zeros(values.shape, dtype=float)
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self._sum_of_squares += delta * (values - self.mean)
+        return
+
+    @property
+    def variance(self):
+        """ Unbiased sample variance (zero for less than two samples).
+        """
+        if self.mean is None:
+            return np.empty(0, dtype=float)
+        if self.count < 2:
+            return np.zeros(self.mean.shape, dtype=float)
+        return self._sum_of_squares / (self.count - 1)
+
+    @property
+    def standard_error(self):
+        """ Standard error of the mean.
+        """
+        if self.count < 1:
+            return self.variance
+        return np.sqrt(self.variance / self.count)
+
+
+class ExponentialRunningStatistics:
+    """
+    Element-wise exponentially weighted running mean and variance of a sequence of equally shaped
+    arrays. Each new sample is weighted with alpha, so recent drifts dominate the statistics.
+    """
+
+    def __init__(self, alpha=0.1):
+        """
+        @param float alpha: weight of each new sample (0 < alpha <= 1)
+        """
+        self.alpha = alpha
+        self.count = 0
+        self.mean = None
+        self._variance = None
+        return
+
+    def reset(self):
+        self.count = 0
+        self.mean = None
+        self._variance = None
+        return
+
+    def update(self, values):
+        """ Adds a sample. A sample of different shape restarts the statistics.
+
+        @param numpy.ndarray values: the sample
+        """
+        values = np.asarray(values, dtype=float)
+        if self.mean is None or self.mean.shape != values.shape:
+            self.count = 1
+            self.mean = values.copy()
+            self._variance = np.zeros(values.shape, dtype=float)
+            return
+        self.count += 1
+        delta = values - self.mean
+        increment = self.alpha * delta
+        self.mean += increment
+        self._variance = (1 - self.alpha) * (self._variance + delta * increment)
+        return
+
+    @property
+    def variance(self):
+        if self.mean is None:
+            return np.empty(0, dtype=float)
+        return self._variance.copy()
+
+    @property
+    def standard_error(self):
+        """ Standard error of the exponentially weighted mean of uncorrelated samples.
+        """
+        return np.sqrt(self.variance * self.alpha / (2 - self.alpha))
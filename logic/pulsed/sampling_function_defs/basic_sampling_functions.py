@@ -25,6 +25,18 @@ from collections import OrderedDict
 from logic.pulsed.sampling_functions import SamplingBase
 
 
+def _sine_into(time_array, amplitude, frequency, phase, out):
+    """
+    In-place version of amplitude * sin(2 * pi * frequency * time_array + phase).
+    The float64 array out must not be the same array as time_array.
+    """
+    np.multiply(time_array, 2 * np.pi * frequency, out=out)
+    np.add(out, phase, out=out)
+    np.sin(out, out=out)
+    np.multiply(out, amplitude, out=out)
+    return out
+
+
 class Idle(SamplingBase):
     """
     Object representing an idle element (zero voltage)
@@ -37,6 +49,14 @@ class Idle(SamplingBase):
         samples_arr = np.zeros(len(time_array))
         return samples_arr
 
+    @staticmethod
+    def get_samples_into(time_array, out, scale=1.0):
+        out[:] = 0
+        return
+
+    def get_frequencies(self):
+        return tuple()
+
 
 class DC(SamplingBase):
     """
@@ -61,6 +81,13 @@ class DC(SamplingBase):
         samples_arr = self._get_dc(time_array, self.voltage)
         return samples_arr
 
+    def get_samples_into(self, time_array, out, scale=1.0):
+        out[:] = self.voltage * scale
+        return
+
+    def get_frequencies(self):
+        return tuple()
+
 
 class Sin(SamplingBase):
     """
@@ -96,6 +123,16 @@ class Sin(SamplingBase):
         samples_arr = self._get_sine(time_array, self.amplitude, self.frequency, phase_rad)
         return samples_arr
 
+    def get_samples_into(self, time_array, out, scale=1.0):
+        phase_rad = np.pi * self.phase / 180
+        samples_arr = _sine_into(time_array, self.amplitude, self.frequency, phase_rad,
+                                 np.empty(len(time_array), dtype='float64'))
+        np.multiply(samples_arr, scale, out=out)
+        return
+
+    def get_frequencies(self):
+        return self.frequency,
+
 
 class DoubleSinSum(SamplingBase):
     """
@@ -154,6 +191,22 @@ class DoubleSinSum(SamplingBase):
         samples_arr += self._get_sine(time_array, self.amplitude_2, self.frequency_2, phase_rad)
         return samples_arr
 
+    def get_samples_into(self, time_array, out, scale=1.0):
+        samples_arr = np.empty(len(time_array), dtype='float64')
+        sine_arr = np.empty(len(time_array), dtype='float64')
+        # First sine wave
+        _sine_into(time_array, self.amplitude_1, self.frequency_1, np.pi * self.phase_1 / 180,
+                   samples_arr)
+
+        # Second sine wave (add on previous)
+        samples_arr += _sine_into(time_array, self.amplitude_2, self.frequency_2,
+                                  np.pi * self.phase_2 / 180, sine_arr)
+        np.multiply(samples_arr, scale, out=out)
+        return
+
+    def get_frequencies(self):
+        return self.frequency_1, self.frequency_2
+
 
 class DoubleSinProduct(SamplingBase):
     """
@@ -212,6 +265,22 @@ class DoubleSinProduct(SamplingBase):
         samples_arr *= self._get_sine(time_array, self.amplitude_2, self.frequency_2, phase_rad)
         return samples_arr
 
+    def get_samples_into(self, time_array, out, scale=1.0):
+        samples_arr = np.empty(len(time_array), dtype='float64')
+        sine_arr = np.empty(len(time_array), dtype='float64')
+        # First sine wave
+        _sine_into(time_array, self.amplitude_1, self.frequency_1, np.pi * self.phase_1 / 180,
+                   samples_arr)
+
+        # Second sine wave (multiply with previous)
+        samples_arr *= _sine_into(time_array, self.amplitude_2, self.frequency_2,
+                                  np.pi * self.phase_2 / 180, sine_arr)
+        np.multiply(samples_arr, scale, out=out)
+        return
+
+    def get_frequencies(self):
+        return self.frequency_1, self.frequency_2
+
 
 class TripleSinSum(SamplingBase):
     """
@@ -292,6 +361,26 @@ class TripleSinSum(SamplingBase):
         samples_arr += self._get_sine(time_array, self.amplitude_3, self.frequency_3, phase_rad)
         return samples_arr
 
+    def get_samples_into(self, time_array, out, scale=1.0):
+        samples_arr = np.empty(len(time_array), dtype='float64')
+        sine_arr = np.empty(len(time_array), dtype='float64')
+        # First sine wave
+        _sine_into(time_array, self.amplitude_1, self.frequency_1, np.pi * self.phase_1 / 180,
+                   samples_arr)
+
+        # Second sine wave (add on previous)
+        samples_arr += _sine_into(time_array, self.amplitude_2, self.frequency_2,
+                                  np.pi * self.phase_2 / 180, sine_arr)
+
+        # Third sine wave (add on previous)
+        samples_arr += _sine_into(time_array, self.amplitude_3, self.frequency_3,
+                                  np.pi * self.phase_3 / 180, sine_arr)
+        np.multiply(samples_arr, scale, out=out)
+        return
+
+    def get_frequencies(self):
+        return self.frequency_1, self.frequency_2, self.frequency_3
+
 
 class TripleSinProduct(SamplingBase):
     """
@@ -372,6 +461,26 @@ class TripleSinProduct(SamplingBase):
         samples_arr *= self._get_sine(time_array, self.amplitude_3, self.frequency_3, phase_rad)
         return samples_arr
 
+    def get_samples_into(self, time_array, out, scale=1.0):
+        samples_arr = np.empty(len(time_array), dtype='float64')
+        sine_arr = np.empty(len(time_array), dtype='float64')
+        # First sine wave
+        _sine_into(time_array, self.amplitude_1, self.frequency_1, np.pi * self.phase_1 / 180,
+                   samples_arr)
+
+        # Second sine wave (multiply with previous)
+        samples_arr *= _sine_into(time_array, self.amplitude_2, self.frequency_2,
+                                  np.pi * self.phase_2 / 180, sine_arr)
+
+        # Third sine wave (multiply with previous)
+        samples_arr *= _sine_into(time_array, self.amplitude_3, self.frequency_3,
+                                  np.pi * self.phase_3 / 180, sine_arr)
+        np.multiply(samples_arr, scale, out=out)
+        return
+
+    def get_frequencies(self):
+        return self.frequency_1, self.frequency_2, self.frequency_3
+
 
 class Chirp(SamplingBase):
     """
@@ -414,6 +523,22 @@ class Chirp(SamplingBase):
                         time_array - time_array[0]) / time_diff / 2) + phase_rad)
         return samples_arr
 
+    def get_samples_into(self, time_array, out, scale=1.0):
+        phase_rad = np.deg2rad(self.phase)
+        freq_diff = self.stop_freq - self.start_freq
+        time_diff = time_array[-1] - time_array[0]
+        # instantaneous frequency term
+        samples_arr = np.subtract(time_array, time_array[0])
+        np.multiply(samples_arr, freq_diff / time_diff / 2, out=samples_arr)
+        np.add(samples_arr, self.start_freq, out=samples_arr)
+        # phase and sine
+        np.multiply(samples_arr, time_array, out=samples_arr)
+        np.multiply(samples_arr, 2 * np.pi, out=samples_arr)
+        np.add(samples_arr, phase_rad, out=samples_arr)
+        np.sin(samples_arr, out=samples_arr)
+        np.multiply(samples_arr, self.amplitude * scale, out=out)
+        return
+
 class AllenEberlyChirp(SamplingBase):
 
     """
@@ -491,6 +616,38 @@ class AllenEberlyChirp(SamplingBase):
                              phi_tanh_chirp(time_array))
         return samples_arr
 
+    def get_samples_into(self, time_array, out, scale=1.0):
+        phase_rad = np.deg2rad(self.phase)  # initial phase
+        freq_range_max = self.stop_freq - self.start_freq  # frequency range
+        t_start = time_array[0]  # start time of the pulse
+        pulse_duration = time_array[-1] - time_array[0]  # pulse duration
+        freq_center = (self.stop_freq + self.start_freq) / 2  # central frequency
+        tau_run = self.tau_pulse  # see get_samples
+        amp_conv = 2 * self.amplitude  # amplitude, corrected from parabola pulse estimation
+        sech_truncation = 1 / np.cosh(pulse_duration / (2 * tau_run))
+
+        # linear part of the phase: phase_rad + 2*pi*freq_center*(t - t_start)
+        phase_arr = np.subtract(time_array, t_start)
+        np.multiply(phase_arr, 2 * np.pi * freq_center, out=phase_arr)
+        np.add(phase_arr, phase_rad, out=phase_arr)
+
+        # cosh((t - t_start - pulse_duration/2) / tau_run) * sech(pulse_duration / (2*tau_run))
+        cosh_arr = np.subtract(time_array, t_start + pulse_duration / 2)
+        np.divide(cosh_arr, tau_run, out=cosh_arr)
+        np.cosh(cosh_arr, out=cosh_arr)
+        np.multiply(cosh_arr, sech_truncation, out=cosh_arr)
+
+        # sech envelope (Rabi frequency) written directly into the output
+        np.divide(amp_conv * sech_truncation * scale, cosh_arr, out=out)
+
+        # tanh chirp part of the phase
+        np.log(cosh_arr, out=cosh_arr)
+        np.multiply(cosh_arr, np.pi * freq_range_max * tau_run, out=cosh_arr)
+        np.add(phase_arr, cosh_arr, out=phase_arr)
+        np.cos(phase_arr, out=phase_arr)
+        np.multiply(out, phase_arr, out=out)
+        return
+
 # FIXME: Not implemented yet!
 # class ImportedSamples(object):
 #     """
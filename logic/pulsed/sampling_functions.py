@@ -26,6 +26,7 @@ import sys
 import inspect
 import copy
 import logging
+import numpy as np
 from collections import OrderedDict
 
 
@@ -67,6 +68,36 @@ class SamplingBase:
         hash_other = hash(tuple(hash_list))
         return hash_self == hash_other
 
+    def get_samples_into(self, time_array, out, scale=1.0):
+        """
+        Calculates the samples for the given time array, multiplies them by scale and writes the
+        result into the preallocated array out (e.g. a float32 slice of the sample array to write).
+
+        This default implementation calls get_samples and should be overridden by sampling
+        functions that can evaluate in place without creating large temporary arrays.
+
+        @param numpy.ndarray time_array: 1D float64 array of sample times in seconds
+        @param numpy.ndarray out: 1D array of the same length as time_array to write into
+        @param float scale: Factor to multiply the samples by (e.g. normalization to the channel
+                            pp-amplitude)
+        """
+        np.multiply(self.get_samples(time_array), scale, out=out)
+        return
+
+    def get_frequencies(self):
+        """
+        Frequencies (in Hz) of all periodic components of this sampling function.
+
+        Used to decide if already calculated samples can be reused for a different start time. If
+        the start times of two time arrays of the same length differ by a whole number of periods
+        for each returned frequency, the samples are considered identical.
+        An empty tuple means the samples do not depend on time at all. None (default) means the
+        samples can only be reused for an identical time array.
+
+        @return tuple: frequencies in Hz of all periodic components (None if not periodic)
+        """
+        return None
+
     def get_dict_representation(self):
         dict_repr = dict()
         dict_repr['name'] = type(self).__name__
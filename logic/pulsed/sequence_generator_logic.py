@@ -23,12 +23,18 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 import numpy as np
 import os
 import pickle
+import re
+import sqlite3
 import time
 import copy
+import hashlib
+import queue
+import threading
 import traceback
 
 from qtpy import QtCore
 from collections import OrderedDict
+from fractions import Fraction
 from core.statusvariable import StatusVar
 from core.connector import Connector
 from core.configoption import ConfigOption
@@ -38,6 +44,7 @@ from core.util.network import netobtain
 from logic.generic_logic import GenericLogic
 from logic.pulsed.pulse_objects import PulseBlock, PulseBlockEnsemble, PulseSequence
 from logic.pulsed.pulse_objects import PulseObjectGenerator, PulseBlockElement
+from logic.pulsed.pulse_object_store import PulseObjectStore, LazyPulseObjectDict
 from logic.pulsed.sampling_functions import SamplingFunctions
 from interface.pulser_interface import SequenceOption
 
@@ -65,6 +72,21 @@ class SequenceGeneratorLogic(GenericLogic):
                                        default=os.path.join(get_home_dir(), 'saved_pulsed_assets'),
                                        missing='warn')
     _overhead_bytes = ConfigOption(name='overhead_bytes', default=0, missing='nothing')
+    # Sample the next chunk in a worker thread while the previous one is written to the device.
+    # Only effective if overhead_bytes splits waveforms into multiple chunks. Doubles the memory
+    # needed for the sample arrays.
+    _pipelined_sampling = ConfigOption(name='pipelined_sampling', default=False, missing='nothing')
+    # Maximum memory in bytes used to keep already calculated analog element samples for reuse
+    # during sampling. Set to 0 to disable the reuse of element samples.
+    _sample_memo_bytes = ConfigOption(name='sample_memo_bytes', default=64 * 1024**2,
+                                      missing='nothing')
+    # Write PulseBlockEnsembles with long constant (e.g. idle) segments as PulseSequence that
+    # repeats a short constant waveform instead of sampling the whole segment. Only used for pulse
+    # generators with sequence capability. Constant segments shorter than auto_sequencing_samples
+    # are sampled as usual.
+    _auto_sequencing = ConfigOption(name='auto_sequencing', default=False, missing='nothing')
+    _auto_sequencing_samples = ConfigOption(name='auto_sequencing_samples', default=1000000,
+                                            missing='nothing')
     # Optional additional paths to import from
     _additional_methods_import_path = ConfigOption(name='additional_predefined_methods_path',
                                                    default=None,
@@ -130,14 +152,35 @@ class SequenceGeneratorLogic(GenericLogic):
         # A flag indicating if sampling of a sequence is in progress
         self.__sequence_generation_in_progress = False
 
+        # Cache of waveforms written to the pulse generator. Keys are the waveform names (without
+        # channel suffix) and values are dicts holding the content hash of the sampled ensemble,
+        # the created waveform names and the names of the referenced PulseBlocks.
+        self._waveform_cache = dict()
+        self._waveform_cache_hits = 0
+        self._waveform_cache_misses = 0
+
+        # Names of the waveforms and sequences present on the pulse generator (tuple of two sets).
+        # Used to check the sampling information of lazily loaded pulse objects without querying
+        # the device for each object. None if the names need to be queried again.
+        self._device_asset_names = None
+
+        # Least recently used memo of analog element samples. Keys are built by
+        # _get_sample_memo_key and values are the normalized float32 sample arrays.
+        self._sample_memo = OrderedDict()
+        self._sample_memo_size = 0
+        self._sample_memo_hits = 0
+        self._sample_memo_misses = 0
+
         # Get instance of PulseObjectGenerator which takes care of collecting all predefined methods
         self._pog = None
 
         # The created pulse objects (PulseBlock, PulseBlockEnsemble, PulseSequence) are saved in
-        # these dictionaries. The keys are the names.
-        self._saved_pulse_blocks = OrderedDict()
-        self._saved_pulse_block_ensembles = OrderedDict()
-        self._saved_pulse_sequences = OrderedDict()
+        # these dictionaries. The keys are the names. Objects are loaded from the pulse object
+        # store upon first access.
+        self._pulse_object_store = None
+        self._saved_pulse_blocks = LazyPulseObjectDict(self._load_block_from_store)
+        self._saved_pulse_block_ensembles = LazyPulseObjectDict(self._load_ensemble_from_store)
+        self._saved_pulse_sequences = LazyPulseObjectDict(self._load_sequence_from_store)
         return
 
     def on_activate(self):
@@ -187,23 +230,40 @@ class SequenceGeneratorLogic(GenericLogic):
         # Read back settings from device and update instance variables accordingly
         self._read_settings_from_device()
 
-        # Update saved blocks/ensembles/sequences from serialized files
-        self._saved_pulse_blocks = OrderedDict()
-        self._saved_pulse_block_ensembles = OrderedDict()
-        self._saved_pulse_sequences = OrderedDict()
-        self._update_blocks_from_file()
-        self._update_ensembles_from_file()
-        self._update_sequences_from_file()
+        # Open the pulse object store and import pulse objects saved as separate pickle files by
+        # older versions of this module (only done once).
+        self._pulse_object_store = PulseObjectStore(
+            os.path.join(self._assets_storage_dir, 'pulse_objects.db'))
+        if not self._pulse_object_store.pickle_files_imported:
+            imported = self._pulse_object_store.import_pickle_files(self._assets_storage_dir)
+            if any(imported.values()):
+                self.log.info('Imported {0:d} PulseBlocks, {1:d} PulseBlockEnsembles and {2:d} '
+                              'PulseSequences from pickle files into "{3}".'
+                              ''.format(imported['block'], imported['ensemble'],
+                                        imported['sequence'],
+                                        self._pulse_object_store.file_path))
+
+        # Update saved blocks/ensembles/sequences from the pulse object store
+        self._update_blocks_from_store()
+        self._update_ensembles_from_store()
+        self._update_sequences_from_store()
 
         # Get instance of PulseObjectGenerator which takes care of collecting all predefined methods
         self._pog = PulseObjectGenerator(sequencegeneratorlogic=self)
 
         self.__sequence_generation_in_progress = False
+        self._waveform_cache = dict()
+        self._waveform_cache_hits = 0
+        self._waveform_cache_misses = 0
+        self._clear_sample_memo()
         return
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        if self._pulse_object_store is not None:
+            self._pulse_object_store.close()
+            self._pulse_object_store = None
         return
 
     # @_saved_pulse_blocks.constructor
@@ -446,15 +506,19 @@ class SequenceGeneratorLogic(GenericLogic):
             self.log.error('Can´t clear the pulser as it is running. Switch off the pulser and try again.')
             return -1
         self.pulsegenerator().clear_all()
-        # Delete all sampling information from all PulseBlockEnsembles and PulseSequences
-        for seq_name in self.saved_pulse_sequences:
-            seq = self.saved_pulse_sequences[seq_name]
+        self._invalidate_waveform_cache()
+        self._device_asset_names = None
+        # Delete all sampling information from all PulseBlockEnsembles and PulseSequences.
+        # Objects not loaded yet are checked against the (now empty) device upon loading.
+        sequences = [self.saved_pulse_sequences[name] for name in
+                     self.saved_pulse_sequences.loaded_keys()]
+        for seq in sequences:
             seq.sampling_information = dict()
-            self.save_sequence(seq)
-        for ens_name in self.saved_pulse_block_ensembles:
-            ens = self.saved_pulse_block_ensembles[ens_name]
+        ensembles = [self.saved_pulse_block_ensembles[name] for name in
+                     self.saved_pulse_block_ensembles.loaded_keys()]
+        for ens in ensembles:
             ens.sampling_information = dict()
-            self.save_ensemble(ens)
+        self._save_pulse_objects(ensembles=ensembles, sequences=sequences)
         self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
         self.sigAvailableSequencesUpdated.emit(self.sampled_sequences)
         self.sigLoadedAssetUpdated.emit('', '')
@@ -491,6 +555,10 @@ class SequenceGeneratorLogic(GenericLogic):
                     self.sigLoadedAssetUpdated.emit(*self.loaded_asset)
                     return
 
+            # Ensembles written by auto-sequencing are played by their generated PulseSequence
+            if ensemble.sampling_information.get('auto_sequence'):
+                return self.load_sequence(ensemble.sampling_information['auto_sequence'])
+
             if self.pulsegenerator().get_status()[0] > 0:
                 self.log.error('Can´t load a waveform, because pulser running. Switch off the pulser and try again.')
                 return -1
@@ -707,9 +775,7 @@ class SequenceGeneratorLogic(GenericLogic):
 
         @param PulseBlock block: PulseBlock instance to save
         """
-        self._saved_pulse_blocks[block.name] = block
-        self._save_block_to_file(block)
-        self.sigBlockDictUpdated.emit(self._saved_pulse_blocks)
+        self._save_pulse_objects(blocks=[block])
         return
 
     def get_block(self, name):
@@ -731,76 +797,31 @@ class SequenceGeneratorLogic(GenericLogic):
         # Delete from dict
         if name in self.saved_pulse_blocks:
             del (self._saved_pulse_blocks[name])
+            self._invalidate_waveform_cache(block_name=name)
 
         # Delete from disk
-        filepath = os.path.join(self._assets_storage_dir, '{0}.block'.format(name))
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        self._delete_from_store('block', name)
 
         self.sigBlockDictUpdated.emit(self.saved_pulse_blocks)
         return
 
-    def _load_block_from_file(self, block_name):
+    def _load_block_from_store(self, block_name):
         """
-        De-serializes a PulseBlock instance from file.
+        De-serializes a PulseBlock instance from the pulse object store.
 
         @param str block_name: The name of the PulseBlock instance to de-serialize
         @return PulseBlock: The de-serialized PulseBlock instance
         """
-        block = None
-        filepath = os.path.join(self._assets_storage_dir, '{0}.block'.format(block_name))
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'rb') as file:
-                    block = pickle.load(file)
-            except pickle.UnpicklingError:
-                self.log.error('Failed to de-serialize PulseBlock "{0}" from file.'
-                               ''.format(block_name))
-                os.remove(filepath)
-            except ModuleNotFoundError:
-                self.log.error('Failed to de-serialize PulseBlock "{0}" from file because of missing dependencies.\n'
-                               'For better debugging I dumped the traceback to debug.'.format(block_name))
-                self.log.debug('{0!s}'.format(traceback.format_exc()))
-        return block
-
-    def _update_blocks_from_file(self):
-        """
-        Update the saved_pulse_blocks dict by de-serializing stored file.
-        """
-        # Get all files in asset directory ending on ".block" and extract a sorted list of
-        # PulseBlock names
-        with os.scandir(self._assets_storage_dir) as scan:
-            names = natural_sort(f.name[:-6] for f in scan if f.is_file and f.name.endswith('.block'))
-
-        # Load all blocks from file
-        for block_name in names:
-            block = self._load_block_from_file(block_name)
-            if block is not None:
-                self._saved_pulse_blocks[block_name] = block
+        return self._load_from_store('block', block_name)
 
-        self.sigBlockDictUpdated.emit(self._saved_pulse_blocks)
-        return
-
-    def _save_block_to_file(self, block):
+    def _update_blocks_from_store(self):
         """
-        Saves a single PulseBlock instance to file by serialization using pickle.
-
-        @param PulseBlock block: The PulseBlock instance to be saved
+        Update the saved_pulse_blocks dict with the names found in the pulse object store.
+        The PulseBlock instances are de-serialized upon first access.
         """
-        filename = '{0}.block'.format(block.name)
-        try:
-            with open(os.path.join(self._assets_storage_dir, filename), 'wb') as file:
-                pickle.dump(block, file)
-        except:
-            self.log.error('Failed to serialize PulseBlock "{0}" to file.'.format(block.name))
-        return
-
-    def _save_blocks_to_file(self):
-        """
-        Saves the saved_pulse_blocks dict items to files.
-        """
-        for block in self._saved_pulse_blocks.values():
-            self._save_block_to_file(block)
+        self._saved_pulse_blocks = LazyPulseObjectDict(
+            self._load_block_from_store, natural_sort(self._pulse_object_store.get_index('block')))
+        self.sigBlockDictUpdated.emit(self._saved_pulse_blocks)
         return
 
     def save_ensemble(self, ensemble):
@@ -808,9 +829,7 @@ class SequenceGeneratorLogic(GenericLogic):
 
         @param PulseBlockEnsemble ensemble: PulseBlockEnsemble instance to save
         """
-        self._saved_pulse_block_ensembles[ensemble.name] = ensemble
-        self._save_ensemble_to_file(ensemble)
-        self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
+        self._save_pulse_objects(ensembles=[ensemble])
         return
 
     def get_ensemble(self, name):
@@ -832,89 +851,46 @@ class SequenceGeneratorLogic(GenericLogic):
         # Delete from dict
         if name in self.saved_pulse_block_ensembles:
             # check if ensemble has already been sampled and delete associated waveforms
-            if self.saved_pulse_block_ensembles[name].sampling_information:
-                self._delete_waveform(
-                    self.saved_pulse_block_ensembles[name].sampling_information['waveforms'])
+            ensemble = self.saved_pulse_block_ensembles.get(name)
+            if ensemble is not None and ensemble.sampling_information:
+                self._delete_waveform(ensemble.sampling_information['waveforms'])
                 self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
             # delete PulseBlockEnsemble
-            del self._saved_pulse_block_ensembles[name]
+            self._saved_pulse_block_ensembles.pop(name, None)
 
         # Delete from disk
-        filepath = os.path.join(self._assets_storage_dir, '{0}.ensemble'.format(name))
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        self._delete_from_store('ensemble', name)
 
         self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
         return
 
-    def _load_ensemble_from_file(self, ensemble_name):
+    def _load_ensemble_from_store(self, ensemble_name):
         """
-        De-serializes a PulseBlockEnsemble instance from file.
+        De-serializes a PulseBlockEnsemble instance from the pulse object store.
+        Outdated sampling information (waveforms not present on the device) is removed.
 
         @param str ensemble_name: The name of the PulseBlockEnsemble instance to de-serialize
         @return PulseBlockEnsemble: The de-serialized PulseBlockEnsemble instance
         """
-        ensemble = None
-        filepath = os.path.join(self._assets_storage_dir, '{0}.ensemble'.format(ensemble_name))
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'rb') as file:
-                    ensemble = pickle.load(file)
-            except pickle.UnpicklingError:
-                self.log.error('Failed to de-serialize PulseBlockEnsemble "{0}" from file. '
-                               'Deleting broken file.'.format(ensemble_name))
-                os.remove(filepath)
+        ensemble = self._load_from_store('ensemble', ensemble_name)
+        if ensemble is not None and ensemble.sampling_information.get('waveforms'):
+            waveform_set = set(ensemble.sampling_information['waveforms'])
+            if not self._get_device_asset_names()[0].issuperset(waveform_set):
+                ensemble.sampling_information = dict()
         return ensemble
 
-    def _update_ensembles_from_file(self):
+    def _update_ensembles_from_store(self):
         """
-        Update the saved_pulse_block_ensembles dict from temporary file.
+        Update the saved_pulse_block_ensembles dict with the names found in the pulse object
+        store. The PulseBlockEnsemble instances are de-serialized upon first access.
         """
-        # Get all files in asset directory ending on ".ensemble" and extract a sorted list of
-        # PulseBlockEnsemble names
-        with os.scandir(self._assets_storage_dir) as scan:
-            names = natural_sort(f.name[:-9] for f in scan if f.is_file and f.name.endswith('.ensemble'))
-
-        # Get all waveforms currently stored on pulser hardware in order to delete outdated
-        # sampling_information dicts
-        sampled_waveforms = set(self.sampled_waveforms)
-
-        # Load all ensembles from file
-        for ensemble_name in names:
-            ensemble = self._load_ensemble_from_file(ensemble_name)
-            if ensemble is not None:
-                if ensemble.sampling_information.get('waveforms'):
-                    waveform_set = set(ensemble.sampling_information['waveforms'])
-                    if not sampled_waveforms.issuperset(waveform_set):
-                        ensemble.sampling_information = dict()
-                self._saved_pulse_block_ensembles[ensemble_name] = ensemble
-
+        self._device_asset_names = None
+        self._saved_pulse_block_ensembles = LazyPulseObjectDict(
+            self._load_ensemble_from_store,
+            natural_sort(self._pulse_object_store.get_index('ensemble')))
         self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
         return
 
-    def _save_ensemble_to_file(self, ensemble):
-        """
-        Saves a single PulseBlockEnsemble instance to file by serialization using pickle.
-
-        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to be saved
-        """
-        filename = '{0}.ensemble'.format(ensemble.name)
-        try:
-            with open(os.path.join(self._assets_storage_dir, filename), 'wb') as file:
-                pickle.dump(ensemble, file)
-        except:
-            self.log.error('Failed to serialize PulseBlockEnsemble "{0}" to file.'
-                           ''.format(ensemble.name))
-        return
-
-    def _save_ensembles_to_file(self):
-        """
-        Saves the saved_pulse_block_ensembles dict items to files.
-        """
-        for ensemble in self.saved_pulse_block_ensembles.values():
-            self._save_ensemble_to_file(ensemble)
-        return
-
     def save_sequence(self, sequence):
         """ Saves a PulseSequence instance
 
@@ -923,9 +899,7 @@ class SequenceGeneratorLogic(GenericLogic):
 
         @return: str: name of the serialized object, if needed.
         """
-        self._saved_pulse_sequences[sequence.name] = sequence
-        self._save_sequence_to_file(sequence)
-        self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
+        self._save_pulse_objects(sequences=[sequence])
         return
 
     def get_sequence(self, name):
@@ -947,44 +921,37 @@ class SequenceGeneratorLogic(GenericLogic):
         if name in self.saved_pulse_sequences:
             # check if sequence has already been sampled and delete associated sequence from pulser.
             # Also delete associated waveforms if sequence has been sampled within rotating frame.
-            if self.saved_pulse_sequences[name].sampling_information:
+            sequence = self.saved_pulse_sequences.get(name)
+            if sequence is not None and sequence.sampling_information:
                 self._delete_sequence(name)
-                if self.saved_pulse_sequences[name].rotating_frame:
-                    self._delete_waveform(
-                        self.saved_pulse_sequences[name].sampling_information['waveforms'])
+                if sequence.rotating_frame:
+                    self._delete_waveform(sequence.sampling_information['waveforms'])
                     self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
             # delete PulseSequence
-            del self._saved_pulse_sequences[name]
+            self._saved_pulse_sequences.pop(name, None)
 
         # Delete from disk
-        filepath = os.path.join(self._assets_storage_dir, '{0}.sequence'.format(name))
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        self._delete_from_store('sequence', name)
 
         self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
         return
 
-    def _load_sequence_from_file(self, sequence_name):
+    def _load_sequence_from_store(self, sequence_name):
         """
-        De-serializes a PulseSequence instance from file.
+        De-serializes a PulseSequence instance from the pulse object store.
+        Outdated sampling information (sequence or waveforms not present on the device) is
+        removed.
 
         @param str sequence_name: The name of the PulseSequence instance to de-serialize
         @return PulseSequence: The de-serialized PulseSequence instance
         """
-        filepath = os.path.join(self._assets_storage_dir, '{0}.sequence'.format(sequence_name))
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'rb') as file:
-                    sequence = pickle.load(file)
-                # FIXME: Due to the pickling the dict namespace merging gets lost on the way.
-                # Restored it here but a better way needs to be found.
-                for step in range(len(sequence)):
-                    sequence[step].__dict__ = sequence[step]
-            except pickle.UnpicklingError:
-                self.log.error('Failed to de-serialize PulseSequence "{0}" from file.'
-                               ''.format(sequence_name))
-                os.remove(filepath)
-                return None
+        sequence = self._load_from_store('sequence', sequence_name)
+        if sequence is None:
+            return None
+        # FIXME: Due to the pickling the dict namespace merging gets lost on the way.
+        # Restored it here but a better way needs to be found.
+        for step in range(len(sequence)):
+            sequence[step].__dict__ = sequence[step]
 
         # Conversion for backwards compatibility
         if len(sequence) > 0 and not isinstance(sequence[0].flag_high, list):
@@ -1007,7 +974,7 @@ class SequenceGeneratorLogic(GenericLogic):
                     self.log.error('Failed to de-serialize PulseSequence "{0}" from file.'
                                    '"flag_high" step parameter is of unknown type'
                                    ''.format(sequence_name))
-                    os.remove(filepath)
+                    self._delete_from_store('sequence', sequence_name)
                     return None
 
                 # Try to convert "flag_trigger" step parameter
@@ -1023,60 +990,128 @@ class SequenceGeneratorLogic(GenericLogic):
                     self.log.error('Failed to de-serialize PulseSequence "{0}" from file.'
                                    '"flag_trigger" step parameter is of unknown type'
                                    ''.format(sequence_name))
-                    os.remove(filepath)
+                    self._delete_from_store('sequence', sequence_name)
                     return None
-            self._save_sequence_to_file(sequence)
+            self._save_to_store('sequence', [sequence])
+
+        # Remove sampling information if the sequence or its waveforms are not present on the device
+        device_waveforms, device_sequences = self._get_device_asset_names()
+        if sequence.name not in device_sequences:
+            sequence.sampling_information = dict()
+        elif sequence.sampling_information:
+            waveform_set = set(sequence.sampling_information['waveforms'])
+            if not device_waveforms.issuperset(waveform_set):
+                sequence.sampling_information = dict()
         return sequence
 
-    def _update_sequences_from_file(self):
+    def _get_device_asset_names(self):
         """
-        Update the saved_pulse_sequences dict from files.
-        """
-        # Get all files in asset directory ending on ".sequence" and extract a sorted list of
-        # PulseSequence names
-        with os.scandir(self._assets_storage_dir) as scan:
-            names = natural_sort(f.name[:-9] for f in scan if f.is_file and f.name.endswith('.sequence'))
-
-        # Get all waveforms and sequences currently stored on pulser hardware in order to delete
-        # outdated sampling_information dicts
-        sampled_waveforms = set(self.sampled_waveforms)
-        sampled_sequences = set(self.sampled_sequences)
+        Names of the waveforms and sequences present on the pulse generator. The names are queried
+        once and cached until the pulse object store is refreshed or waveforms/sequences are
+        written to or deleted from the device.
 
-        # Load all sequences from file
-        for sequence_name in names:
-            sequence = self._load_sequence_from_file(sequence_name)
-            if sequence is not None:
-                if sequence.name not in sampled_sequences:
-                    sequence.sampling_information = dict()
-                elif sequence.sampling_information:
-                    waveform_set = set(sequence.sampling_information['waveforms'])
-                    if not sampled_waveforms.issuperset(waveform_set):
-                        sequence.sampling_information = dict()
-                self._saved_pulse_sequences[sequence_name] = sequence
+        @return (set, set): waveform names and sequence names
+        """
+        if self._device_asset_names is None:
+            self._device_asset_names = (set(self.sampled_waveforms), set(self.sampled_sequences))
+        return self._device_asset_names
 
+    def _update_sequences_from_store(self):
+        """
+        Update the saved_pulse_sequences dict with the names found in the pulse object store.
+        The PulseSequence instances are de-serialized upon first access.
+        """
+        self._device_asset_names = None
+        self._saved_pulse_sequences = LazyPulseObjectDict(
+            self._load_sequence_from_store,
+            natural_sort(self._pulse_object_store.get_index('sequence')))
         self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
         return
 
-    def _save_sequence_to_file(self, sequence):
+    def _save_pulse_objects(self, blocks=None, ensembles=None, sequences=None):
+        """
+        Saves PulseBlock, PulseBlockEnsemble and PulseSequence instances. All instances of the same
+        type are written to the pulse object store in a single transaction and each dict update
+        signal is emitted only once.
+
+        @param list blocks: optional, PulseBlock instances to save
+        @param list ensembles: optional, PulseBlockEnsemble instances to save
+        @param list sequences: optional, PulseSequence instances to save
+        """
+        if blocks:
+            for block in blocks:
+                # Waveforms sampled from a previous version of this block are outdated if it has
+                # changed. Only loaded blocks can have been sampled.
+                if self._saved_pulse_blocks.is_loaded(block.name) and \
+                        repr(self._saved_pulse_blocks[block.name]) != repr(block):
+                    self._invalidate_waveform_cache(block_name=block.name)
+                self._saved_pulse_blocks[block.name] = block
+            self._save_to_store('block', blocks)
+            self.sigBlockDictUpdated.emit(self._saved_pulse_blocks)
+        if ensembles:
+            for ensemble in ensembles:
+                self._saved_pulse_block_ensembles[ensemble.name] = ensemble
+            self._save_to_store('ensemble', ensembles)
+            self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
+        if sequences:
+            for sequence in sequences:
+                self._saved_pulse_sequences[sequence.name] = sequence
+            self._save_to_store('sequence', sequences)
+            self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
+        return
+
+    def _save_to_store(self, kind, pulse_objects):
         """
-        Saves a single PulseSequence instance to file by serialization using pickle.
+        Serializes pulse objects of the same kind into the pulse object store.
 
-        @param PulseSequence sequence: The PulseSequence instance to be saved
+        @param str kind: The kind of pulse objects ('block', 'ensemble' or 'sequence')
+        @param list pulse_objects: The PulseBlock, PulseBlockEnsemble or PulseSequence instances
         """
-        filename = '{0}.sequence'.format(sequence.name)
         try:
-            with open(os.path.join(self._assets_storage_dir, filename), 'wb') as file:
-                pickle.dump(sequence, file)
+            self._pulse_object_store.save(kind, pulse_objects)
         except:
-            self.log.error('Failed to serialize PulseSequence "{0}" to file.'.format(sequence.name))
+            self.log.exception('Failed to serialize {0} instances "{1}" to file.'.format(
+                kind, '", "'.join(obj.name for obj in pulse_objects)))
         return
 
-    def _save_sequences_to_file(self):
+    def _load_from_store(self, kind, name):
         """
-        Saves the saved_pulse_sequences dict items to files.
+        De-serializes a single pulse object from the pulse object store. Broken entries are
+        removed from the store.
+
+        @param str kind: The kind of pulse object ('block', 'ensemble' or 'sequence')
+        @param str name: The name of the pulse object
+        @return object: The de-serialized pulse object (None if loading failed)
         """
-        for sequence in self.saved_pulse_sequences.values():
-            self._save_sequence_to_file(sequence)
+        pulse_object = None
+        try:
+            pulse_object = self._pulse_object_store.load(kind, name)
+        except pickle.UnpicklingError:
+            self.log.error('Failed to de-serialize {0} "{1}" from file. Deleting broken entry.'
+                           ''.format(kind, name))
+            self._delete_from_store(kind, name)
+        except ModuleNotFoundError:
+            self.log.error('Failed to de-serialize {0} "{1}" from file because of missing '
+                           'dependencies.\nFor better debugging I dumped the traceback to debug.'
+                           ''.format(kind, name))
+            self.log.debug('{0!s}'.format(traceback.format_exc()))
+        except Exception:
+            # e.g. classes changed since the object was stored. Keep the entry in the store but
+            # drop it from the (lazy) pulse object dict.
+            self.log.exception('Failed to de-serialize {0} "{1}" from file.'.format(kind, name))
+        return pulse_object
+
+    def _delete_from_store(self, kind, name):
+        """
+        Removes a single pulse object from the pulse object store.
+
+        @param str kind: The kind of pulse object ('block', 'ensemble' or 'sequence')
+        @param str name: The name of the pulse object
+        """
+        try:
+            self._pulse_object_store.delete(kind, name)
+        except sqlite3.Error:
+            self.log.exception('Failed to delete {0} "{1}" from file.'.format(kind, name))
         return
 
     def generate_predefined_sequence(self, predefined_sequence_name, kwargs_dict):
@@ -1111,11 +1146,9 @@ class SequenceGeneratorLogic(GenericLogic):
             return
 
         # Save objects
-        for block in blocks:
-            self.save_block(block)
         for ensemble in ensembles:
             ensemble.sampling_information = dict()
-            self.save_ensemble(ensemble)
+        self._save_pulse_objects(blocks=blocks, ensembles=ensembles)
 
         if self.pulse_generator_constraints.sequence_option == SequenceOption.FORCED and len(sequences) < 1:
             self.log.info('Adding default sequence for: {0:s}'.format(predefined_sequence_name))
@@ -1126,7 +1159,7 @@ class SequenceGeneratorLogic(GenericLogic):
 
         for sequence in sequences:
             sequence.sampling_information = dict()
-            self.save_sequence(sequence)
+        self._save_pulse_objects(sequences=sequences)
 
         created_name = gen_params.get('name') if 'name' not in kwargs_dict else kwargs_dict['name']
         self.sigPredefinedSequenceGenerated.emit(created_name, len(sequences) > 0)
@@ -1215,8 +1248,10 @@ class SequenceGeneratorLogic(GenericLogic):
 
     def analyze_block_ensemble(self, ensemble):
         """
-        This helper method runs through each element of a PulseBlockEnsemble object and extracts
+        This helper method analyzes all elements of a PulseBlockEnsemble object and extracts
         important information about the Waveform that can be created out of this object.
+        The elements of each PulseBlock are gathered in arrays which are expanded across all block
+        repetitions, so no Python loop over individual element instances is needed.
         Especially the discretization due to the set self.sample_rate is taken into account.
         The positions in time (as integer time bins) of the PulseBlockElement transitions are
         determined here (all the "rounding-to-best-match-value").
@@ -1258,94 +1293,65 @@ class SequenceGeneratorLogic(GenericLogic):
         laser_channel = self.generation_parameters['gate_channel'] if self.generation_parameters[
             'gate_channel'] else self.generation_parameters['laser_channel']
 
-        # memorize the digital channel state of the previous element
-        tmp_digital_high = dict()
-        # memorize the laser_on flag of the previous element (in case of non-digital laser channel)
-        tmp_laser_on = False
         # Set of used analog and digital channels
         digital_channels = set()
         analog_channels = set()
-        # check for active channels and initialize tmp_digital_high/tmp_laser_on with the state of
-        # the very last element in the ensemble
+        # check for active channels and get the digital channel states/laser_on flag of the very
+        # last element in the ensemble. These serve as the previous state of the very first element.
+        last_digital_high = dict()
+        last_laser_on = False
         if len(ensemble) > 0:
             block = self.get_block(ensemble[0][0])
             digital_channels = block.digital_channels
             analog_channels = block.analog_channels
             block = self.get_block(ensemble[-1][0])
             if len(block) > 0:
-                tmp_digital_high = block[-1].digital_high.copy()
-                tmp_laser_on = block[-1].laser_on
-            else:
-                tmp_digital_high = {chnl: False for chnl in digital_channels}
-                tmp_laser_on = False
-
-        # dicts containing the bins where the digital channels are rising/falling
-        digital_rising_bins = {chnl: list() for chnl in digital_channels}
-        digital_falling_bins = {chnl: list() for chnl in digital_channels}
-        laser_rising_bins = list()
-        laser_falling_bins = list()
-
-        # Array to store the length in bins for all elements including repetitions in the order
-        # they are occuring in the waveform later on.
-        elements_length_bins = list()
-
-        # variables to keep track of the current timeframe
-        current_end_time = 0.0
-        current_start_bin = 0
-
-        # Loop through all blocks in the ensemble
-        for block_name, reps in ensemble:
-            # Get the stored PulseBlock instance
-            block = self.get_block(block_name)
-
-            # Iterate over all repetitions of the current block
-            for rep_no in range(reps + 1):
-                # Iterate over the Block_Elements inside the current block
-                for element in block:
-                    # save bin position if a transition from low to high or vice versa has occurred
-                    # in a digital channel
-                    if tmp_digital_high != element.digital_high:
-                        for chnl, state in element.digital_high.items():
-                            if not tmp_digital_high[chnl] and state:
-                                digital_rising_bins[chnl].append(current_start_bin)
-                            elif tmp_digital_high[chnl] and not state:
-                                digital_falling_bins[chnl].append(current_start_bin)
-                        tmp_digital_high = element.digital_high.copy()
-
-                    if not laser_channel.startswith('d') and tmp_laser_on != element.laser_on:
-                        if not tmp_laser_on and element.laser_on:
-                            laser_rising_bins.append(current_start_bin)
-                        else:
-                            laser_falling_bins.append(current_start_bin)
-                        tmp_laser_on = element.laser_on
-
-                    # Calculate length of the current element with current repetition count in sec
-                    # and add this to the ideal end time for the sequence up until this point.
-                    current_end_time += element.init_length_s + rep_no * element.increment_s
-
-                    # Nearest possible match including the discretization in bins
-                    current_end_bin = int(np.rint(current_end_time * self.__sample_rate))
-
-                    # append current element length in discrete bins to temporary array
-                    elements_length_bins.append(current_end_bin - current_start_bin)
-
-                    # advance bin offset for next element
-                    current_start_bin = current_end_bin
-
-        elements_length_bins = np.array(elements_length_bins, dtype='int64')
+                last_digital_high = block[-1].digital_high
+                last_laser_on = block[-1].laser_on
+        # Fixed channel order for the columns of the digital state table
+        digital_channel_list = natural_sort(digital_channels)
+
+        # Get element tables (lengths, digital states and laser_on flags) with one row per element
+        # in the order they are occuring in the waveform later on.
+        element_lengths, element_digital_high, element_laser_on = self._get_ensemble_element_tables(
+            ensemble, digital_channel_list)
+
+        # Ideal end time of each element (accumulated in chronological order) and the nearest
+        # possible match including the discretization in bins
+        element_end_times = np.cumsum(element_lengths)
+        element_end_bins = np.rint(element_end_times * self.__sample_rate).astype('int64')
+        elements_length_bins = np.diff(element_end_bins, prepend=0).astype('int64')
+        element_start_bins = element_end_bins - elements_length_bins
+        ideal_length = float(element_end_times[-1]) if len(element_end_times) > 0 else 0.0
+
+        # Detect low-to-high and high-to-low transitions of each element with respect to the
+        # previous element and save the start bin of the element if a transition has occurred.
+        # Remove duplicates.
+        digital_rising_bins = dict()
+        digital_falling_bins = dict()
+        if len(elements_length_bins) > 0:
+            prev_digital_high = np.roll(element_digital_high, 1, axis=0)
+            prev_digital_high[0] = [bool(last_digital_high.get(chnl, False)) for chnl in
+                                    digital_channel_list]
+            rising = element_digital_high & ~prev_digital_high
+            falling = prev_digital_high & ~element_digital_high
+        else:
+            rising = falling = element_digital_high
+        for index, chnl in enumerate(digital_channel_list):
+            digital_rising_bins[chnl] = np.unique(element_start_bins[rising[:, index]])
+            digital_falling_bins[chnl] = np.unique(element_start_bins[falling[:, index]])
 
-        # convert rising/falling indices to numpy.ndarrays. Remove duplicates.
-        for chnl in digital_channels:
-            digital_rising_bins[chnl] = sorted(set(digital_rising_bins[chnl]))
-            digital_falling_bins[chnl] = sorted(set(digital_falling_bins[chnl]))
-            digital_rising_bins[chnl] = np.array(digital_rising_bins[chnl], dtype='int64')
-            digital_falling_bins[chnl] = np.array(digital_falling_bins[chnl], dtype='int64')
         if laser_channel.startswith('d'):
             laser_rising_bins = digital_rising_bins[laser_channel]
             laser_falling_bins = digital_falling_bins[laser_channel]
         else:
-            laser_rising_bins = np.array(sorted(set(laser_rising_bins)), dtype='int64')
-            laser_falling_bins = np.array(sorted(set(laser_falling_bins)), dtype='int64')
+            if len(elements_length_bins) > 0:
+                prev_laser_on = np.roll(element_laser_on, 1)
+                prev_laser_on[0] = bool(last_laser_on)
+            else:
+                prev_laser_on = element_laser_on
+            laser_rising_bins = np.unique(element_start_bins[element_laser_on & ~prev_laser_on])
+            laser_falling_bins = np.unique(element_start_bins[prev_laser_on & ~element_laser_on])
 
         return_dict = dict()
         return_dict['number_of_samples'] = np.sum(elements_length_bins)
@@ -1357,11 +1363,55 @@ class SequenceGeneratorLogic(GenericLogic):
         return_dict['digital_channels'] = digital_channels
         return_dict['channel_set'] = analog_channels.union(digital_channels)
         return_dict['generation_parameters'] = self.generation_parameters.copy()
-        return_dict['ideal_length'] = current_end_time
+        return_dict['ideal_length'] = ideal_length
         return_dict['laser_rising_bins'] = laser_rising_bins
         return_dict['laser_falling_bins'] = laser_falling_bins
         return return_dict
 
+    def _get_ensemble_element_tables(self, ensemble, digital_channel_list):
+        """
+        Build element tables for each PulseBlock in a PulseBlockEnsemble and expand them across all
+        block repetitions. The resulting tables hold one entry per element in the order they are
+        occuring in the waveform later on.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to tabulate
+        @param list digital_channel_list: Digital channel descriptors defining the column order of
+                                          the digital state table
+        @return (numpy.ndarray, numpy.ndarray, numpy.ndarray): element lengths in seconds (float64,
+                                                               incl. length increments), 2D bool
+                                                               table of digital channel states and
+                                                               laser_on flags (bool)
+        """
+        element_lengths = list()
+        element_digital_high = list()
+        element_laser_on = list()
+        for block_name, reps in ensemble:
+            block = self.get_block(block_name)
+            if len(block) == 0:
+                continue
+            init_length = np.array([elem.init_length_s for elem in block], dtype='float64')
+            increment = np.array([elem.increment_s for elem in block], dtype='float64')
+            digital_high = np.array(
+                [[elem.digital_high[chnl] for chnl in digital_channel_list] for elem in block],
+                dtype=bool).reshape((len(block), len(digital_channel_list)))
+            laser_on = np.array([elem.laser_on for elem in block], dtype=bool)
+
+            rep_no = np.repeat(np.arange(reps + 1, dtype='int64'), len(block))
+            element_lengths.append(np.tile(init_length, reps + 1) +
+                                   rep_no * np.tile(increment, reps + 1))
+            element_digital_high.append(np.tile(digital_high, (reps + 1, 1)))
+            element_laser_on.append(np.tile(laser_on, reps + 1))
+
+        if element_lengths:
+            element_lengths = np.concatenate(element_lengths)
+            element_digital_high = np.concatenate(element_digital_high)
+            element_laser_on = np.concatenate(element_laser_on)
+        else:
+            element_lengths = np.empty(0, dtype='float64')
+            element_digital_high = np.empty((0, len(digital_channel_list)), dtype=bool)
+            element_laser_on = np.empty(0, dtype=bool)
+        return element_lengths, element_digital_high, element_laser_on
+
     def analyze_sequence(self, sequence):
         """
         This helper method runs through each step of a PulseSequence object and extracts
@@ -1661,6 +1711,9 @@ class SequenceGeneratorLogic(GenericLogic):
         The chunkwise write mode is used to save memory usage at the expense of time.
         In other words: The whole sample arrays are never created at any time. This results in more
         function calls and general overhead causing much longer time to complete.
+        If the ConfigOption "pipelined_sampling" is set, the chunks are sampled in a worker thread
+        into two alternating sets of sample arrays while the previous chunk is written to the
+        device. So sampling and writing of consecutive chunks overlap in time.
 
         In addition the pulse_block_ensemble gets analyzed and important parameters used during
         sampling get stored in the ensemble object "sampling_information" attribute.
@@ -1690,11 +1743,10 @@ class SequenceGeneratorLogic(GenericLogic):
         # Set the waveform name (excluding the device specific channel naming suffix, i.e. '_ch1')
         waveform_name = name_tag if name_tag else ensemble.name
 
-        # check for old waveforms associated with the ensemble and delete them from pulse generator.
-        self._delete_waveform_by_nametag(waveform_name)
-
         # Take current time
         start_time = time.time()
+        self._sample_memo_hits = 0
+        self._sample_memo_misses = 0
 
         # get important parameters from the ensemble
         ensemble_info = self.analyze_block_ensemble(ensemble)
@@ -1738,6 +1790,137 @@ class SequenceGeneratorLogic(GenericLogic):
                 self.log.warn('Extending waveform {0} by {2} bins. New length {1}.'.format(
                     ensemble.name, ensemble_info['number_of_samples'], extension_samples))
 
+        # Split long constant segments of the ensemble off into a PulseSequence that repeats short
+        # constant waveforms. Falls back to writing plain waveforms if not applicable.
+        auto_sequence = None
+        if self._auto_sequencing and waveform_name == ensemble.name and \
+                not self.__sequence_generation_in_progress:
+            auto_sequence = self._sample_auto_sequence(ensemble=ensemble,
+                                                       ensemble_info=ensemble_info,
+                                                       offset_bin=offset_bin)
+        if auto_sequence is not None:
+            written_waveforms = auto_sequence.sampling_information['waveforms']
+        else:
+            written_waveforms = self._sample_ensemble_waveforms(ensemble=ensemble,
+                                                                ensemble_info=ensemble_info,
+                                                                waveform_name=waveform_name,
+                                                                offset_bin=offset_bin)
+        if written_waveforms is None:
+            if not self.__sequence_generation_in_progress:
+                self.module_state.unlock()
+            self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
+            self.sigSampleEnsembleComplete.emit(None)
+            return -1, list(), dict()
+
+        # if the rotating frame should be preserved (default) increment the offset counter by the
+        # number of samples written.
+        if ensemble.rotating_frame:
+            offset_bin += ensemble_info['number_of_samples']
+
+        # Save sampling related parameters to the sampling_information container within the
+        # PulseBlockEnsemble.
+        # This step is only performed if the resulting waveforms are named by the PulseBlockEnsemble
+        # and not by a sequence nametag
+        if waveform_name == ensemble.name:
+            ensemble.sampling_information = dict()
+            ensemble.sampling_information.update(ensemble_info)
+            ensemble.sampling_information['pulse_generator_settings'] = self.pulse_generator_settings
+            ensemble.sampling_information['waveforms'] = natural_sort(written_waveforms)
+            if auto_sequence is not None:
+                ensemble.sampling_information['auto_sequence'] = auto_sequence.name
+            self.save_ensemble(ensemble)
+
+        memo_lookups = self._sample_memo_hits + self._sample_memo_misses
+        if memo_lookups > 0:
+            memo_str = ' (element sample memo hit rate: {0:.1f}% of {1:d})'.format(
+                100 * self._sample_memo_hits / memo_lookups, memo_lookups)
+        else:
+            memo_str = ''
+        self.log.info('Time needed for sampling and writing PulseBlockEnsemble {0} to device: {1} '
+                      'sec{2}'.format(ensemble.name, int(np.rint(time.time() - start_time)),
+                                      memo_str))
+        if ensemble_info['number_of_samples'] == 0:
+            self.log.warning('Empty waveform (0 samples) created from PulseBlockEnsemble "{0}".'
+                             ''.format(ensemble.name))
+        if not self.__sequence_generation_in_progress:
+            self.module_state.unlock()
+        self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
+        self.sigSampleEnsembleComplete.emit(ensemble)
+        return offset_bin, natural_sort(written_waveforms), ensemble_info
+
+    def _sample_ensemble_waveforms(self, ensemble, ensemble_info, waveform_name, offset_bin):
+        """ Samples a PulseBlockEnsemble and writes the waveforms to the pulse generator unless
+        waveforms with identical content are already present on the device (waveform cache).
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to sample
+        @param dict ensemble_info: Information dict as returned by analyze_block_ensemble
+        @param str waveform_name: Name of the waveform to create on the device
+        @param int offset_bin: Starting bin offset for the time arrays (rotating frame)
+
+        @return list: Sorted names of the waveforms on the device (None if writing failed)
+        """
+        # Skip sampling and writing if waveforms with identical content are already on the device
+        content_hash = self._get_ensemble_content_hash(ensemble, offset_bin)
+        cached_waveforms = self._get_cached_waveforms(waveform_name, content_hash)
+        if cached_waveforms is not None:
+            self.log.info('Waveforms for PulseBlockEnsemble "{0}" with identical content found on '
+                          'device. Sampling skipped (waveform cache hits/misses: {1:d}/{2:d}).'
+                          ''.format(ensemble.name, self._waveform_cache_hits,
+                                    self._waveform_cache_misses))
+            return cached_waveforms
+
+        self.log.debug('No waveforms for PulseBlockEnsemble "{0}" with identical content found on '
+                       'device (waveform cache hits/misses: {1:d}/{2:d}).'
+                       ''.format(ensemble.name, self._waveform_cache_hits,
+                                 self._waveform_cache_misses))
+        # check for old waveforms associated with the ensemble and delete them from pulse
+        # generator.
+        self._delete_waveform_by_nametag(waveform_name)
+        written_waveforms = self._write_ensemble(ensemble=ensemble,
+                                                 ensemble_info=ensemble_info,
+                                                 waveform_name=waveform_name,
+                                                 offset_bin=offset_bin)
+        if written_waveforms is None:
+            return None
+        written_waveforms = natural_sort(written_waveforms)
+        self._waveform_cache[waveform_name] = {
+            'hash': content_hash,
+            'waveforms': written_waveforms,
+            'blocks': {block_name for block_name, reps in ensemble.block_list}}
+        return written_waveforms
+
+    def _write_ensemble(self, ensemble, ensemble_info, waveform_name, offset_bin):
+        """ Writes a PulseBlockEnsemble to the pulse generator either as samples or, for purely
+        digital pulse generators accepting them, as run-lengths.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to write
+        @param dict ensemble_info: Information dict as returned by analyze_block_ensemble
+        @param str waveform_name: Name of the waveform to create on the device
+        @param int offset_bin: Starting bin offset for the time arrays (rotating frame)
+
+        @return set: Names of the waveforms created on the device (None if writing failed)
+        """
+        # Purely digital pulse generators accepting run-lengths do not need any sample arrays.
+        if not ensemble_info['analog_channels'] and \
+                self.pulse_generator_constraints.run_length_waveforms:
+            return self._write_ensemble_run_lengths(ensemble=ensemble,
+                                                    ensemble_info=ensemble_info,
+                                                    waveform_name=waveform_name)
+        return self._write_ensemble_samples(ensemble=ensemble,
+                                            ensemble_info=ensemble_info,
+                                            waveform_name=waveform_name,
+                                            offset_bin=offset_bin)
+
+    def _write_ensemble_samples(self, ensemble, ensemble_info, waveform_name, offset_bin):
+        """ Samples a PulseBlockEnsemble chunk by chunk and writes the samples to the pulse generator.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to sample
+        @param dict ensemble_info: Information dict as returned by analyze_block_ensemble
+        @param str waveform_name: Name of the waveform to create on the device
+        @param int offset_bin: Starting bin offset for the time arrays (rotating frame)
+
+        @return set: Names of the waveforms created on the device (None if sampling failed)
+        """
         # Calculate the byte size per sample.
         # One analog sample per channel is 4 bytes (np.float32) and one digital sample per channel
         # is 1 byte (np.bool).
@@ -1753,32 +1936,164 @@ class SequenceGeneratorLogic(GenericLogic):
         else:
             array_length = self._overhead_bytes // bytes_per_sample
 
-        # Allocate the sample arrays that are used for a single write command
-        analog_samples = dict()
-        digital_samples = dict()
+        # Sampling and writing of chunks is only pipelined if there is more than one chunk to write
+        use_pipeline = self._pipelined_sampling and array_length < ensemble_info['number_of_samples']
+
+        # Allocate the sample arrays that are used for a single write command.
+        # In pipelined mode two sets of arrays are needed (double buffering).
+        buffer_sets = list()
         try:
-            for chnl in ensemble_info['analog_channels']:
-                analog_samples[chnl] = np.empty(array_length, dtype='float32')
-            for chnl in ensemble_info['digital_channels']:
-                digital_samples[chnl] = np.empty(array_length, dtype=bool)
+            for ii in range(2 if use_pipeline else 1):
+                analog_samples = dict()
+                digital_samples = dict()
+                for chnl in ensemble_info['analog_channels']:
+                    analog_samples[chnl] = np.empty(array_length, dtype='float32')
+                for chnl in ensemble_info['digital_channels']:
+                    digital_samples[chnl] = np.empty(array_length, dtype=bool)
+                buffer_sets.append((analog_samples, digital_samples))
         except MemoryError:
             self.log.error('Sampling of PulseBlockEnsemble "{0}" failed due to a MemoryError.\n'
                            'The sample array needed is too large to allocate in memory.\n'
                            'Try using the overhead_bytes ConfigOption to limit memory usage.'
                            ''.format(ensemble.name))
-            if not self.__sequence_generation_in_progress:
-                self.module_state.unlock()
-            self.sigSampleEnsembleComplete.emit(None)
-            return -1, list(), dict()
+            return None
+
+        if use_pipeline:
+            chunks = self._pipeline_ensemble_chunks(ensemble=ensemble,
+                                                    ensemble_info=ensemble_info,
+                                                    offset_bin=offset_bin,
+                                                    array_length=array_length,
+                                                    buffer_sets=buffer_sets)
+        else:
+            analog_buffer, digital_buffer = buffer_sets[0]
 
+            def get_buffers(length):
+                return ({chnl: arr[:length] for chnl, arr in analog_buffer.items()},
+                        {chnl: arr[:length] for chnl, arr in digital_buffer.items()})
+
+            chunks = self._sample_ensemble_chunks(ensemble=ensemble,
+                                                  ensemble_info=ensemble_info,
+                                                  offset_bin=offset_bin,
+                                                  array_length=array_length,
+                                                  get_buffers=get_buffers)
+
+        # set of written waveform names on the device
+        written_waveforms = set()
+        # Write each sampled chunk to the device
+        try:
+            for analog_samples, digital_samples, is_first_chunk, is_last_chunk in chunks:
+                chunk_length = max([len(arr) for arr in analog_samples.values()] +
+                                   [len(arr) for arr in digital_samples.values()])
+                written_samples, wfm_list = self.pulsegenerator().write_waveform(
+                    name=waveform_name,
+                    analog_samples=analog_samples,
+                    digital_samples=digital_samples,
+                    is_first_chunk=is_first_chunk,
+                    is_last_chunk=is_last_chunk,
+                    total_number_of_samples=ensemble_info['number_of_samples'])
+                self._device_asset_names = None
+
+                # Update written waveforms set
+                written_waveforms.update(wfm_list)
+
+                # check if write process was successful
+                if written_samples != chunk_length:
+                    self.log.error('Sampling of PulseBlockEnsemble "{0}" failed. Write to device '
+                                   'was unsuccessful.\nThe number of actually written samples '
+                                   '({1:d}) does not match the number of samples staged to write '
+                                   '({2:d}).'.format(ensemble.name, written_samples, chunk_length))
+                    return None
+        finally:
+            chunks.close()
+        return written_waveforms
+
+    def _write_ensemble_run_lengths(self, ensemble, ensemble_info, waveform_name):
+        """ Compiles a purely digital PulseBlockEnsemble into run-lengths and writes them to a pulse
+        generator supporting run-length waveforms (see PulserConstraints.run_length_waveforms).
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to compile
+        @param dict ensemble_info: Information dict as returned by analyze_block_ensemble
+        @param str waveform_name: Name of the waveform to create on the device
+
+        @return set: Names of the waveforms created on the device (None if writing failed)
+        """
+        written_samples, wfm_list = self.pulsegenerator().write_run_length_waveform(
+            name=waveform_name,
+            run_lengths=self._compile_ensemble_run_lengths(ensemble, ensemble_info),
+            total_number_of_samples=ensemble_info['number_of_samples'])
+        self._device_asset_names = None
+
+        # check if write process was successful
+        if written_samples != ensemble_info['number_of_samples']:
+            self.log.error('Compiling PulseBlockEnsemble "{0}" to run-lengths failed. Write to '
+                           'device was unsuccessful.\nThe number of actually written samples '
+                           '({1:d}) does not match the number of samples in the ensemble ({2:d}).'
+                           ''.format(ensemble.name, written_samples,
+                                     ensemble_info['number_of_samples']))
+            return None
+        return set(wfm_list)
+
+    def _compile_ensemble_run_lengths(self, ensemble, ensemble_info):
+        """ Compiles a purely digital PulseBlockEnsemble directly into run-lengths for each digital
+        channel. The run-lengths are derived from the element bin boundaries determined by
+        analyze_block_ensemble, so no sample arrays are created at any time.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to compile
+        @param dict ensemble_info: Information dict as returned by analyze_block_ensemble
+
+        @return dict: keys are the digital channel descriptors, values are tuples of two 1D arrays
+                      (<durations in samples (int64)>, <channel states (bool)>). Consecutive runs
+                      of a channel always differ in state and the durations of each channel add up
+                      to the total number of samples of the ensemble.
+        """
+        digital_channel_list = natural_sort(ensemble_info['digital_channels'])
+        element_digital_high = self._get_ensemble_element_tables(ensemble, digital_channel_list)[1]
+
+        # Elements shorter than a single sample do not show up in the waveform
+        elements_length_bins = ensemble_info['elements_length_bins']
+        non_empty = elements_length_bins > 0
+        elements_length_bins = elements_length_bins[non_empty]
+        element_digital_high = element_digital_high[non_empty]
+
+        run_lengths = dict()
+        for index, chnl in enumerate(digital_channel_list):
+            states = element_digital_high[:, index]
+            if len(states) == 0:
+                run_lengths[chnl] = (np.empty(0, dtype='int64'), np.empty(0, dtype=bool))
+                continue
+            # Merge consecutive elements with the same channel state into a single run
+            run_starts = np.concatenate(([0], np.flatnonzero(states[1:] != states[:-1]) + 1))
+            run_lengths[chnl] = (np.add.reduceat(elements_length_bins, run_starts).astype('int64'),
+                                 states[run_starts])
+        return run_lengths
+
+    def _sample_ensemble_chunks(self, ensemble, ensemble_info, offset_bin, array_length,
+                                get_buffers):
+        """ Generator sampling a PulseBlockEnsemble chunk by chunk.
+
+        Iterates through all blocks, repetitions and elements of the ensemble and fills the sample
+        arrays provided by get_buffers. Each time the arrays are full (or the end of the ensemble
+        is reached) they are yielded to be written to the device.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to sample
+        @param dict ensemble_info: Information dict as returned by analyze_block_ensemble
+        @param int offset_bin: Starting bin offset for the time arrays (rotating frame)
+        @param int array_length: Maximum number of samples per chunk
+        @param callable get_buffers: Called with the chunk length in samples. Must return a tuple
+                                     of two dicts (analog_samples, digital_samples) with the arrays
+                                     to fill for the next chunk.
+
+        @return generator: yields tuples (analog_samples, digital_samples, is_first_chunk,
+                           is_last_chunk) for each chunk
+        """
         # integer to keep track of the sampls already processed
         processed_samples = 0
         # Index to keep track of the samples written into the preallocated samples array
         array_write_index = 0
         # Keep track of the number of elements already written
         element_count = 0
-        # set of written waveform names on the device
-        written_waveforms = set()
+        if ensemble_info['number_of_samples'] > 0:
+            analog_samples, digital_samples = get_buffers(array_length)
         # Iterate over all blocks within the PulseBlockEnsemble object
         for block_name, reps in ensemble.block_list:
             block = self.get_block(block_name)
@@ -1796,24 +2111,33 @@ class SequenceGeneratorLogic(GenericLogic):
                     while element_samples_written != element_length_bins:
                         samples_to_add = min(array_length - array_write_index,
                                              element_length_bins - element_samples_written)
-                        # create floating point time array for the current element inside rotating
-                        # frame if analog samples are to be calculated.
-                        if pulse_function:
-                            time_arr = (offset_bin + np.arange(
-                                samples_to_add, dtype='float64')) / self.__sample_rate
-
                         # Calculate respective part of the sample arrays
                         for chnl in digital_high:
                             digital_samples[chnl][array_write_index:array_write_index + samples_to_add] = digital_high[
                                 chnl]
+                        # The time array is calculated only once for all channels and only if
+                        # the samples are not already available from the element sample memo.
+                        time_arr = None
                         for chnl in pulse_function:
-                            analog_samples[chnl][array_write_index:array_write_index + samples_to_add] = pulse_function[
-                                                                                                             chnl].get_samples(
-                                time_arr) / (self.__analog_levels[0][chnl] / 2)
-
+                            samples_slice = analog_samples[chnl][array_write_index:array_write_index + samples_to_add]
+                            memo_key = None
+                            if self._sample_memo_bytes > 0:
+                                memo_key = self._get_sample_memo_key(
+                                    pulse_function[chnl], chnl, offset_bin, samples_to_add)
+                                if self._load_memo_samples(memo_key, samples_slice):
+                                    continue
+                            if time_arr is None:
+                                # create floating point time array for the current element inside
+                                # rotating frame.
+                                time_arr = np.arange(offset_bin, offset_bin + samples_to_add,
+                                                     dtype='float64')
+                                np.divide(time_arr, self.__sample_rate, out=time_arr)
+                            pulse_function[chnl].get_samples_into(
+                                time_arr, samples_slice, 2 / self.__analog_levels[0][chnl])
+                            if memo_key is not None:
+                                self._store_memo_samples(memo_key, samples_slice)
                         # Free memory
-                        if pulse_function:
-                            del time_arr
+                        del time_arr
 
                         element_samples_written += samples_to_add
                         array_write_index += samples_to_add
@@ -1823,35 +2147,12 @@ class SequenceGeneratorLogic(GenericLogic):
                         if ensemble.rotating_frame:
                             offset_bin += samples_to_add
 
-                        # Check if the temporary sample array is full and write to the device if so.
+                        # Check if the temporary sample array is full and hand it over for writing.
                         if array_write_index == array_length:
                             # Set first/last chunk flags
                             is_first_chunk = array_write_index == processed_samples
                             is_last_chunk = processed_samples == ensemble_info['number_of_samples']
-                            written_samples, wfm_list = self.pulsegenerator().write_waveform(
-                                name=waveform_name,
-                                analog_samples=analog_samples,
-                                digital_samples=digital_samples,
-                                is_first_chunk=is_first_chunk,
-                                is_last_chunk=is_last_chunk,
-                                total_number_of_samples=ensemble_info['number_of_samples'])
-
-                            # Update written waveforms set
-                            written_waveforms.update(wfm_list)
-
-                            # check if write process was successful
-                            if written_samples != array_length:
-                                self.log.error('Sampling of block "{0}" in ensemble "{1}" failed. '
-                                               'Write to device was unsuccessful.\nThe number of '
-                                               'actually written samples ({2:d}) does not match '
-                                               'the number of samples staged to write ({3:d}).'
-                                               ''.format(block_name, ensemble.name, written_samples,
-                                                         array_length))
-                                if not self.__sequence_generation_in_progress:
-                                    self.module_state.unlock()
-                                self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
-                                self.sigSampleEnsembleComplete.emit(None)
-                                return -1, list(), dict()
+                            yield analog_samples, digital_samples, is_first_chunk, is_last_chunk
 
                             # Reset array write start pointer
                             array_write_index = 0
@@ -1861,37 +2162,182 @@ class SequenceGeneratorLogic(GenericLogic):
                             # be shorter than the previous chunks)
                             if array_length > ensemble_info['number_of_samples'] - processed_samples:
                                 array_length = ensemble_info['number_of_samples'] - processed_samples
-                                analog_samples = dict()
-                                digital_samples = dict()
-                                for chnl in ensemble_info['analog_channels']:
-                                    analog_samples[chnl] = np.empty(array_length, dtype='float32')
-                                for chnl in ensemble_info['digital_channels']:
-                                    digital_samples[chnl] = np.empty(array_length, dtype=bool)
+                            if not is_last_chunk:
+                                analog_samples, digital_samples = get_buffers(array_length)
 
                     # Increment element index
                     element_count += 1
+        return
 
-        # Save sampling related parameters to the sampling_information container within the
-        # PulseBlockEnsemble.
-        # This step is only performed if the resulting waveforms are named by the PulseBlockEnsemble
-        # and not by a sequence nametag
-        if waveform_name == ensemble.name:
-            ensemble.sampling_information = dict()
-            ensemble.sampling_information.update(ensemble_info)
-            ensemble.sampling_information['pulse_generator_settings'] = self.pulse_generator_settings
-            ensemble.sampling_information['waveforms'] = natural_sort(written_waveforms)
-            self.save_ensemble(ensemble)
+    def _load_memo_samples(self, memo_key, out):
+        """ Copies samples from the element sample memo into out if available.
 
-        self.log.info('Time needed for sampling and writing PulseBlockEnsemble {0} to device: {1} sec'
-                      ''.format(ensemble.name, int(np.rint(time.time() - start_time))))
-        if ensemble_info['number_of_samples'] == 0:
-            self.log.warning('Empty waveform (0 samples) created from PulseBlockEnsemble "{0}".'
-                             ''.format(ensemble.name))
-        if not self.__sequence_generation_in_progress:
-            self.module_state.unlock()
-        self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
-        self.sigSampleEnsembleComplete.emit(ensemble)
-        return offset_bin, natural_sort(written_waveforms), ensemble_info
+        @param tuple memo_key: The memo key as returned by _get_sample_memo_key
+        @param numpy.ndarray out: The array slice to write the samples into
+
+        @return bool: True if the samples were found in the memo, False otherwise
+        """
+        samples = self._sample_memo.get(memo_key)
+        if samples is None:
+            self._sample_memo_misses += 1
+            return False
+        self._sample_memo.move_to_end(memo_key)
+        self._sample_memo_hits += 1
+        out[:] = samples
+        return True
+
+    def _store_memo_samples(self, memo_key, samples):
+        """ Stores a copy of the given samples in the element sample memo. Least recently used
+        samples are dropped until the memo fits into the memory limit set by ConfigOption
+        "sample_memo_bytes".
+
+        @param tuple memo_key: The memo key as returned by _get_sample_memo_key
+        @param numpy.ndarray samples: The normalized samples to store
+        """
+        if samples.nbytes > self._sample_memo_bytes:
+            return
+        while self._sample_memo and \
+                self._sample_memo_size + samples.nbytes > self._sample_memo_bytes:
+            self._sample_memo_size -= self._sample_memo.popitem(last=False)[1].nbytes
+        self._sample_memo[memo_key] = samples.copy()
+        self._sample_memo_size += samples.nbytes
+        return
+
+    def _get_sample_memo_key(self, pulse_function, channel, offset_bin, length):
+        """ Creates the key for the element sample memo.
+
+        Samples of periodic sampling functions are reused for any start bin that results in the
+        same phase of all periodic components (see SamplingBase.get_frequencies). The phases are
+        calculated with exact (integer or rational) arithmetic so equal keys always belong to
+        phases that are truly equal. Samples of other sampling functions are only reused for the
+        same start bin.
+
+        @param SamplingBase pulse_function: The sampling function of the element and channel
+        @param str channel: The analog channel descriptor
+        @param int offset_bin: The bin of the first sample
+        @param int length: The number of samples
+
+        @return tuple: hashable memo key
+        """
+        phase_key = self._get_phase_key(pulse_function.get_frequencies(), offset_bin)
+        return (repr(pulse_function), self.__sample_rate, self.__analog_levels[0][channel],
+                int(length), phase_key)
+
+    def _get_phase_key(self, frequencies, offset_bin):
+        """ Creates a hashable representation of the phases of periodic signal components at a
+        start bin. Start bins with equal phase keys result in identical samples.
+
+        The phases (in units of full periods) are calculated with exact integer or rational
+        arithmetic, so equal keys always belong to phases that are truly equal.
+
+        @param tuple frequencies: Frequencies in Hz of all periodic components (see
+                                  SamplingBase.get_frequencies). None if not periodic.
+        @param int offset_bin: The start bin
+
+        @return tuple: hashable phase key
+        """
+        if frequencies is None:
+            return 'bin', int(offset_bin)
+        phase_key = list()
+        sample_rate = float(self.__sample_rate)
+        for freq in frequencies:
+            freq = float(freq)
+            if freq.is_integer() and sample_rate.is_integer():
+                phase_key.append((int(offset_bin) * int(freq)) % int(sample_rate))
+            else:
+                phase_key.append(Fraction(freq) * int(offset_bin) / Fraction(sample_rate) % 1)
+        return tuple(phase_key)
+
+    def _get_ensemble_phase_key(self, ensemble, offset_bin):
+        """ Creates a phase key (see _get_phase_key) for the start bin of a PulseBlockEnsemble
+        taking into account the analog sampling functions of all its elements.
+        Start bins with equal keys result in identical samples of the ensemble.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance
+        @param int offset_bin: The start bin
+
+        @return tuple: hashable phase key
+        """
+        frequencies = set()
+        for block_name, reps in ensemble.block_list:
+            for element in self.get_block(block_name).element_list:
+                for pulse_function in element.pulse_function.values():
+                    func_frequencies = pulse_function.get_frequencies()
+                    if func_frequencies is None:
+                        return self._get_phase_key(None, offset_bin)
+                    frequencies.update(float(freq) for freq in func_frequencies)
+        return self._get_phase_key(tuple(sorted(frequencies)), offset_bin)
+
+    def _clear_sample_memo(self):
+        """ Removes all samples from the element sample memo.
+        """
+        self._sample_memo = OrderedDict()
+        self._sample_memo_size = 0
+        return
+
+    def _pipeline_ensemble_chunks(self, ensemble, ensemble_info, offset_bin, array_length,
+                                  buffer_sets):
+        """ Generator running _sample_ensemble_chunks in a worker thread.
+
+        The worker fills the next free set of sample arrays while the caller writes the previously
+        yielded chunk to the device. A chunk's arrays are handed back to the worker as soon as the
+        next chunk is requested, so the number of chunks in flight is bounded by len(buffer_sets).
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to sample
+        @param dict ensemble_info: Information dict as returned by analyze_block_ensemble
+        @param int offset_bin: Starting bin offset for the time arrays (rotating frame)
+        @param int array_length: Maximum number of samples per chunk
+        @param list buffer_sets: List of tuples (analog_samples, digital_samples) holding
+                                 preallocated sample arrays of length array_length
+
+        @return generator: yields tuples (analog_samples, digital_samples, is_first_chunk,
+                           is_last_chunk) for each chunk
+        """
+        free_buffers = queue.Queue()
+        for buffer_set in buffer_sets:
+            free_buffers.put(buffer_set)
+        sampled_chunks = queue.Queue()
+        stop_event = threading.Event()
+
+        def get_buffers(length):
+            analog_buffer, digital_buffer = free_buffers.get()
+            return ({chnl: arr[:length] for chnl, arr in analog_buffer.items()},
+                    {chnl: arr[:length] for chnl, arr in digital_buffer.items()})
+
+        def sampling_worker():
+            try:
+                for chunk in self._sample_ensemble_chunks(ensemble=ensemble,
+                                                          ensemble_info=ensemble_info,
+                                                          offset_bin=offset_bin,
+                                                          array_length=array_length,
+                                                          get_buffers=get_buffers):
+                    if stop_event.is_set():
+                        break
+                    sampled_chunks.put(chunk)
+            except Exception as e:
+                sampled_chunks.put(e)
+            sampled_chunks.put(None)
+
+        worker = threading.Thread(target=sampling_worker, name='EnsembleSamplingWorker',
+                                  daemon=True)
+        worker.start()
+        try:
+            while True:
+                chunk = sampled_chunks.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+                # The chunk has been written. Hand the arrays back to the sampling worker.
+                free_buffers.put((chunk[0], chunk[1]))
+        finally:
+            # Make sure the worker terminates even if writing has been aborted
+            stop_event.set()
+            for buffer_set in buffer_sets:
+                free_buffers.put(buffer_set)
+            worker.join()
+        return
 
     @QtCore.Slot(str)
     def sample_pulse_sequence(self, sequence):
@@ -1939,6 +2385,7 @@ class SequenceGeneratorLogic(GenericLogic):
         # delete already written sequences on the device memory.
         if sequence.name in self.sampled_sequences:
             self.pulsegenerator().delete_sequence(sequence.name)
+            self._device_asset_names = None
 
         # Make sure the PulseSequence is contained in the saved sequences dict
         sequence.sampling_information = dict()
@@ -1951,6 +2398,10 @@ class SequenceGeneratorLogic(GenericLogic):
         written_waveforms = set()
         # Keep track of generated PulseBlockEnsembles and their corresponding ensemble_info dict
         generated_ensembles = dict()
+        # Keep track of the content hashes of all sampled PulseBlockEnsembles (including the offset
+        # phase). Steps with identical ensemble content share the waveforms sampled first.
+        # Keys are the content hashes and values the name tags the waveforms were sampled with.
+        sampled_content_hashes = dict()
 
         # Create a list in the process with each element holding the created waveform names as a
         # tuple and the corresponding sequence parameters as defined in the PulseSequence object
@@ -1971,11 +2422,24 @@ class SequenceGeneratorLogic(GenericLogic):
                 name_tag = seq_step.ensemble
                 offset_bin = 0  # Keep the offset at 0
 
+            ensemble = self.get_ensemble(seq_step.ensemble)
+            content_hash = self._get_ensemble_content_hash(ensemble, offset_bin)
+
+            # Share the waveforms of an identical ensemble sampled for a previous step
+            if content_hash in sampled_content_hashes:
+                shared_tag = sampled_content_hashes[content_hash]
+                if shared_tag != name_tag:
+                    self.log.debug('Sequence step {0:d} shares waveforms with identical '
+                                   'PulseBlockEnsemble "{1}".'.format(step_index, shared_tag))
+                generated_ensembles[name_tag] = generated_ensembles[shared_tag]
+                if ensemble.rotating_frame:
+                    offset_bin += generated_ensembles[shared_tag]['number_of_samples']
             # Only sample ensembles if they have not already been sampled
-            if sequence.rotating_frame or \
+            elif sequence.rotating_frame or \
                     not self.get_ensemble(name_tag).sampling_information or \
                     self.get_ensemble(name_tag).sampling_information['pulse_generator_settings'] != self.pulse_generator_settings:
 
+                step_offset_bin = offset_bin
                 offset_bin, waveform_list, ensemble_info = self.sample_pulse_block_ensemble(
                     ensemble=seq_step.ensemble,
                     offset_bin=offset_bin,
@@ -1993,6 +2457,10 @@ class SequenceGeneratorLogic(GenericLogic):
                 # Add to generated ensembles
                 ensemble_info['waveforms'] = waveform_list
                 generated_ensembles[name_tag] = ensemble_info
+                sampled_content_hashes[content_hash] = name_tag
+                # Sampling may have extended the ensemble to match the waveform granularity
+                sampled_content_hashes[self._get_ensemble_content_hash(
+                    self.get_ensemble(seq_step.ensemble), step_offset_bin)] = name_tag
 
                 # Add created waveform names to the set
                 written_waveforms.update(waveform_list)
@@ -2001,6 +2469,7 @@ class SequenceGeneratorLogic(GenericLogic):
                 ensemble_info = self.get_ensemble(name_tag).sampling_information.copy()
                 del(ensemble_info['pulse_generator_settings'])
                 generated_ensembles[name_tag] = ensemble_info
+                sampled_content_hashes[content_hash] = name_tag
 
                 # Add created waveform names to the set
                 written_waveforms.update(ensemble_info['waveforms'])
@@ -2012,6 +2481,7 @@ class SequenceGeneratorLogic(GenericLogic):
         # pass the whole information to the sequence creation method:
         steps_written = self.pulsegenerator().write_sequence(sequence.name,
                                                              sequence_param_dict_list)
+        self._device_asset_names = None
         if steps_written != len(sequence_param_dict_list):
             self.log.error('Writing PulseSequence "{0}" to the device memory failed.\n'
                            'Returned number of sequence steps ({1:d}) does not match desired '
@@ -2028,8 +2498,11 @@ class SequenceGeneratorLogic(GenericLogic):
                                                                sequence_param_dict_list]
         self.save_sequence(sequence)
 
-        self.log.info('Time needed for sampling and writing PulseSequence {0} to device: {1} sec.'
-                      ''.format(sequence.name, int(np.rint(time.time() - start_time))))
+        self.log.info('Time needed for sampling and writing PulseSequence {0} to device: {1} sec. '
+                      '{2:d} sequence steps share {3:d} distinct waveform sets.'
+                      ''.format(sequence.name, int(np.rint(time.time() - start_time)),
+                                len(sequence_param_dict_list),
+                                len(set(sampled_content_hashes.values()))))
 
         # unlock module
         self.module_state.unlock()
@@ -2038,6 +2511,324 @@ class SequenceGeneratorLogic(GenericLogic):
         self.sigSampleSequenceComplete.emit(sequence)
         return
 
+    def _sample_auto_sequence(self, ensemble, ensemble_info, offset_bin):
+        """
+        Writes a PulseBlockEnsemble to the pulse generator as PulseSequence. Long constant segments
+        of the ensemble are played by repeating a short constant waveform while the remaining
+        parts of the ensemble are sampled into separate waveforms.
+
+        The generated PulseBlocks, PulseBlockEnsembles ("<name>_auto<i>" and
+        "<name>_autoconst<i>") and the PulseSequence ("<name>_autoseq") are saved. Since the
+        sequence plays exactly the same samples as the ensemble, the laser/gate bins of
+        ensemble_info are also valid for the sequence.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to write
+        @param dict ensemble_info: Information dict as returned by analyze_block_ensemble
+        @param int offset_bin: Starting bin offset for the time arrays (rotating frame)
+
+        @return PulseSequence: The written PulseSequence (None if auto-sequencing is not
+                               applicable or failed)
+        """
+        constraints = self.pulse_generator_constraints
+        if constraints.sequence_option == SequenceOption.NON or constraints.repetitions.max < 1:
+            return None
+
+        segments = self._get_auto_sequence_segments(ensemble, ensemble_info)
+        if not segments:
+            return None
+        plays_per_step = int(constraints.repetitions.max) + 1
+
+        # Create PulseBlocks and PulseBlockEnsembles for all segments. Constant segments with
+        # identical content share one PulseBlockEnsemble.
+        blocks = list()
+        part_ensembles = list()
+        part_offsets = dict()
+        const_ensembles = dict()
+        steps = list()
+        for start_bin, stop_bin, element_list, const_length in segments:
+            # const_length is 0 for segments that are not constant
+            if const_length > 0:
+                const_key = repr(element_list)
+                if const_key not in const_ensembles:
+                    part_name = '{0}_autoconst{1:d}'.format(ensemble.name, len(const_ensembles))
+                    const_ensembles[const_key] = part_name
+                    blocks.append(PulseBlock(name=part_name, element_list=element_list))
+                    part_ensembles.append(PulseBlockEnsemble(name=part_name,
+                                                             block_list=[(part_name, 0)],
+                                                             rotating_frame=False))
+                    part_offsets[part_name] = 0
+                part_name = const_ensembles[const_key]
+                plays = (stop_bin - start_bin) // const_length
+                while plays > 0:
+                    steps.append((part_name, min(plays, plays_per_step)))
+                    plays -= plays_per_step
+            else:
+                part_name = '{0}_auto{1:d}'.format(ensemble.name,
+                                                   len(part_ensembles) - len(const_ensembles))
+                blocks.append(PulseBlock(name=part_name, element_list=element_list))
+                part_ensembles.append(PulseBlockEnsemble(name=part_name,
+                                                         block_list=[(part_name, 0)],
+                                                         rotating_frame=ensemble.rotating_frame))
+                part_offsets[part_name] = offset_bin + start_bin if ensemble.rotating_frame else \
+                    offset_bin
+                steps.append((part_name, 1))
+
+        if len(steps) > constraints.sequence_steps.max:
+            self.log.warning('Auto-sequencing of PulseBlockEnsemble "{0}" would need {1:d} sequence '
+                             'steps but the pulse generator supports only {2:d}.\nSampling it as '
+                             'waveform instead.'.format(ensemble.name, len(steps),
+                                                        constraints.sequence_steps.max))
+            return None
+
+        # Remove objects left over from a previous auto-sequencing of this ensemble
+        part_names = {part.name for part in part_ensembles}
+        name_pattern = re.compile(r'{0}_auto(const)?\d+$'.format(re.escape(ensemble.name)))
+        for name in list(self.saved_pulse_block_ensembles):
+            if name_pattern.match(name) and name not in part_names:
+                self.delete_ensemble(name)
+                if name in self.saved_pulse_blocks:
+                    self.delete_block(name)
+        # Free the device memory occupied by waveforms of the plain ensemble
+        self._delete_waveform_by_nametag(ensemble.name)
+
+        self._save_pulse_objects(blocks=blocks, ensembles=part_ensembles)
+
+        # Sample and write the waveforms of all parts
+        written_waveforms = set()
+        for part in part_ensembles:
+            part_info = self.analyze_block_ensemble(part)
+            waveforms = self._sample_ensemble_waveforms(ensemble=part,
+                                                        ensemble_info=part_info,
+                                                        waveform_name=part.name,
+                                                        offset_bin=part_offsets[part.name])
+            if waveforms is None:
+                self.log.error('Writing waveforms of auto-sequencing part "{0}" failed.'
+                               ''.format(part.name))
+                return None
+            part.sampling_information = dict()
+            part.sampling_information.update(part_info)
+            part.sampling_information['pulse_generator_settings'] = self.pulse_generator_settings
+            part.sampling_information['waveforms'] = waveforms
+            written_waveforms.update(waveforms)
+
+        sequence = PulseSequence(name=ensemble.name + '_autoseq', rotating_frame=False)
+        for part_name, plays in steps:
+            sequence.append((part_name, {'repetitions': plays - 1}))
+        sequence[-1].go_to = 1
+        sequence.refresh_parameters()
+
+        # delete already written sequence on the device memory and write the new one.
+        if sequence.name in self.sampled_sequences:
+            self.pulsegenerator().delete_sequence(sequence.name)
+            self._device_asset_names = None
+        part_waveforms = {part.name: tuple(part.sampling_information['waveforms']) for part in
+                          part_ensembles}
+        sequence_param_dict_list = [(part_waveforms[step.ensemble], step) for step in sequence]
+        steps_written = self.pulsegenerator().write_sequence(sequence.name,
+                                                             sequence_param_dict_list)
+        self._device_asset_names = None
+        if steps_written != len(sequence_param_dict_list):
+            self.log.error('Writing auto-sequencing PulseSequence "{0}" to the device memory '
+                           'failed.\nReturned number of sequence steps ({1:d}) does not match '
+                           'desired number of steps ({2:d}).'.format(sequence.name,
+                                                                      steps_written,
+                                                                      len(sequence_param_dict_list)))
+            return None
+
+        # The sequence plays the samples of the ensemble, so the ensemble information applies.
+        sequence.sampling_information.update(ensemble_info)
+        sequence.sampling_information['ensemble_info'] = {part.name: part.sampling_information for
+                                                          part in part_ensembles}
+        sequence.sampling_information['pulse_generator_settings'] = self.pulse_generator_settings
+        sequence.sampling_information['waveforms'] = natural_sort(written_waveforms)
+        sequence.sampling_information['step_waveform_list'] = [step[0] for step in
+                                                               sequence_param_dict_list]
+        sequence.measurement_information = copy.deepcopy(ensemble.measurement_information)
+        self._save_pulse_objects(ensembles=part_ensembles, sequences=[sequence])
+
+        const_samples = sum(plays for part_name, plays in steps if
+                            part_name in const_ensembles.values()) * const_length
+        self.log.info('PulseBlockEnsemble "{0}" written as PulseSequence "{1}" with {2:d} steps. '
+                      '{3:d} of {4:d} samples are played by repeating constant waveforms.'
+                      ''.format(ensemble.name, sequence.name, len(steps), const_samples,
+                                ensemble_info['number_of_samples']))
+        self.sigAvailableSequencesUpdated.emit(self.sampled_sequences)
+        return sequence
+
+    def _get_auto_sequence_segments(self, ensemble, ensemble_info):
+        """
+        Splits a PulseBlockEnsemble into segments for auto-sequencing. Runs of consecutive constant
+        elements (no time dependent analog sampling function) with identical content that are
+        longer than ConfigOption "auto_sequencing_samples" become constant segments. All segment
+        boundaries and lengths comply with the waveform length constraints of the pulse generator.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to split
+        @param dict ensemble_info: Information dict as returned by analyze_block_ensemble
+
+        @return list: Tuples (start_bin, stop_bin, element_list, const_length) for each segment in
+                      chronological order. For constant segments element_list contains a single
+                      element of const_length bins to be repeated, otherwise the elements of the
+                      segment with their exact length (const_length is 0). Empty list if there is
+                      nothing to compress.
+        """
+        constraints = self.pulse_generator_constraints
+        granularity = max(int(constraints.waveform_length.step), 1)
+        # Shortest waveform length complying with the constraints. Used for the constant waveforms
+        # and as minimum length of the other segments.
+        min_length = -(-max(int(constraints.waveform_length.min), 1) // granularity) * granularity
+        number_of_samples = int(ensemble_info['number_of_samples'])
+        if number_of_samples % granularity != 0:
+            return list()
+
+        # Expand elements across block repetitions in chronological order
+        elements = list()
+        element_keys = list()
+        for block_name, reps in ensemble.block_list:
+            block = self.get_block(block_name)
+            keys = list()
+            for element in block.element_list:
+                if any(func.get_frequencies() != tuple() for func in
+                       element.pulse_function.values()):
+                    keys.append(None)
+                else:
+                    keys.append((repr(sorted(element.pulse_function.items())),
+                                 sorted(element.digital_high.items()),
+                                 element.laser_on))
+            elements.extend(block.element_list * (reps + 1))
+            element_keys.extend(keys * (reps + 1))
+        element_end_bins = np.cumsum(ensemble_info['elements_length_bins'])
+        element_start_bins = element_end_bins - ensemble_info['elements_length_bins']
+
+        # Find constant segments. Each segment needs to leave at least min_length samples (or none)
+        # to the previous and the following segment.
+        const_segments = list()
+        last_stop = 0
+        index = 0
+        while index < len(elements):
+            first_index = index
+            while index < len(elements) and element_keys[index] is not None and \
+                    element_keys[index] == element_keys[first_index]:
+                index += 1
+            if index == first_index:
+                index += 1
+                continue
+            run_start = int(element_start_bins[first_index])
+            run_stop = int(element_end_bins[index - 1])
+            if run_stop - run_start < self._auto_sequencing_samples:
+                continue
+            start = -(-run_start // granularity) * granularity
+            if start > last_stop:
+                start = max(start, last_stop + min_length)
+            plays = (run_stop - start) // min_length
+            stop = start + plays * min_length
+            if stop != number_of_samples and number_of_samples - stop < min_length:
+                plays = (number_of_samples - min_length - start) // min_length
+                stop = start + plays * min_length
+            if plays < 2:
+                continue
+            const_segments.append((start, stop, elements[first_index]))
+            last_stop = stop
+        if not const_segments:
+            return list()
+
+        segments = list()
+        last_stop = 0
+        for start, stop, element in const_segments + [(number_of_samples, None, None)]:
+            if start > last_stop:
+                # Elements overlapping with the segment, cut to the segment boundaries.
+                element_list = list()
+                index = int(np.searchsorted(element_end_bins, last_stop, side='right'))
+                while index < len(elements) and element_start_bins[index] < start:
+                    length = min(int(element_end_bins[index]), start) - max(
+                        int(element_start_bins[index]), last_stop)
+                    if length > 0:
+                        element_list.append(self._get_auto_sequence_element(elements[index],
+                                                                            length))
+                    index += 1
+                segments.append((last_stop, start, element_list, 0))
+            if stop is not None:
+                segments.append(
+                    (start, stop, [self._get_auto_sequence_element(element, min_length)],
+                     min_length))
+                last_stop = stop
+        return segments
+
+    def _get_auto_sequence_element(self, element, length_bins):
+        """ Copy of a PulseBlockElement with a fixed length given in bins.
+        """
+        return PulseBlockElement(init_length_s=length_bins / self.__sample_rate,
+                                 increment_s=0,
+                                 pulse_function=element.pulse_function,
+                                 digital_high=element.digital_high,
+                                 laser_on=element.laser_on)
+
+    @property
+    def waveform_cache_statistics(self):
+        return {'hits': self._waveform_cache_hits,
+                'misses': self._waveform_cache_misses,
+                'cached_waveforms': sum(len(entry['waveforms']) for entry in
+                                        self._waveform_cache.values())}
+
+    def _get_ensemble_content_hash(self, ensemble, offset_bin=0):
+        """
+        Calculates a hash of everything that determines the samples of a PulseBlockEnsemble, i.e.
+        the content of the ensemble and all referenced PulseBlocks, the generation parameters and
+        the pulse generator settings (sample rate, analog/digital levels etc.).
+        Names of the ensemble and blocks are not part of the hash.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to hash
+        @param int offset_bin: Starting bin offset used for sampling. Only the phase of the
+                               periodic sampling functions at that bin is part of the hash.
+
+        @return str: hex digest of the content hash
+        """
+        settings = self.pulse_generator_settings
+        hash_items = [ensemble.rotating_frame, self._get_ensemble_phase_key(ensemble, offset_bin)]
+        hash_items.extend((self.get_block(block_name).element_list, reps) for block_name, reps in
+                          ensemble.block_list)
+        hash_items.append(sorted(self.generation_parameters.items()))
+        hash_items.append(natural_sort(settings['activation_config'][1]))
+        hash_items.append(settings['sample_rate'])
+        hash_items.extend(sorted(levels.items()) for levels in settings['analog_levels'])
+        hash_items.extend(sorted(levels.items()) for levels in settings['digital_levels'])
+        hash_items.append(settings['interleave'])
+        return hashlib.sha1(repr(hash_items).encode()).hexdigest()
+
+    def _get_cached_waveforms(self, waveform_name, content_hash):
+        """
+        Looks up the waveform cache for waveforms named by waveform_name with identical content.
+        A cache entry is only valid as long as all its waveforms are still present on the device.
+
+        @param str waveform_name: The waveform name (tag) to look up
+        @param str content_hash: Content hash as returned by _get_ensemble_content_hash
+
+        @return list: Names of the cached waveforms on the device (None if not found)
+        """
+        entry = self._waveform_cache.get(waveform_name)
+        if entry is not None and entry['hash'] == content_hash and \
+                set(entry['waveforms']).issubset(self.sampled_waveforms):
+            self._waveform_cache_hits += 1
+            return list(entry['waveforms'])
+        self._waveform_cache_misses += 1
+        return None
+
+    def _invalidate_waveform_cache(self, block_name=None, waveforms=None):
+        """
+        Removes entries from the waveform cache that reference the given PulseBlock or contain any of
+        the given waveforms. Clears the entire cache if no argument is given.
+
+        @param str block_name: optional, name of the PulseBlock that has been changed or deleted
+        @param list waveforms: optional, names of the waveforms deleted from the device
+        """
+        if block_name is None and waveforms is None:
+            self._waveform_cache.clear()
+            return
+        waveforms = set() if waveforms is None else set(waveforms)
+        for name, entry in list(self._waveform_cache.items()):
+            if block_name in entry['blocks'] or not waveforms.isdisjoint(entry['waveforms']):
+                del self._waveform_cache[name]
+        return
+
     def _delete_waveform(self, names):
         if isinstance(names, str):
             names = [names]
@@ -2045,6 +2836,8 @@ class SequenceGeneratorLogic(GenericLogic):
         for wfm in names:
             if wfm in current_waveforms:
                 self.pulsegenerator().delete_waveform(wfm)
+        self._invalidate_waveform_cache(waveforms=names)
+        self._device_asset_names = None
         self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
         return
 
@@ -2069,5 +2862,6 @@ class SequenceGeneratorLogic(GenericLogic):
         for seq in names:
             if seq in current_sequences:
                 self.pulsegenerator().delete_sequence(seq)
+        self._device_asset_names = None
         self.sigAvailableSequencesUpdated.emit(self.sampled_sequences)
         return
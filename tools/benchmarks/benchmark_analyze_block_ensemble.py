@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of SequenceGeneratorLogic.analyze_block_ensemble against the former element-by-element
+implementation. Both implementations are run on random PulseBlockEnsembles and their results are
+asserted to be identical before the run times on a large ensemble are compared.
+
+Run from the qudi main directory:
+    python tools/benchmarks/benchmark_analyze_block_ensemble.py
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from logic.pulsed.pulse_objects import PulseBlock, PulseBlockElement, PulseBlockEnsemble
+from logic.pulsed.sequence_generator_logic import SequenceGeneratorLogic
+
+
+class EnsembleAnalysisHost:
+    """ Provides the attributes of SequenceGeneratorLogic used by analyze_block_ensemble. """
+
+    log = logging.getLogger(__name__)
+
+    def __init__(self, blocks, sample_rate, laser_channel='d_ch1', gate_channel=''):
+        self._saved_pulse_blocks = {block.name: block for block in blocks}
+        self._saved_pulse_block_ensembles = dict()
+        self._SequenceGeneratorLogic__sample_rate = sample_rate
+        self.generation_parameters = {'laser_channel': laser_channel,
+                                      'gate_channel': gate_channel}
+
+    def get_block(self, name):
+        return self._saved_pulse_blocks.get(name)
+
+    _get_ensemble_element_tables = SequenceGeneratorLogic._get_ensemble_element_tables
+
+
+def analyze_block_ensemble_reference(host, ensemble):
+    """ The element-by-element implementation of analyze_block_ensemble used before it was
+    vectorized (only the analysis part, the ensemble must be a PulseBlockEnsemble instance).
+    """
+    laser_channel = host.generation_parameters['gate_channel'] if host.generation_parameters[
+        'gate_channel'] else host.generation_parameters['laser_channel']
+    sample_rate = host._SequenceGeneratorLogic__sample_rate
+
+    tmp_digital_high = dict()
+    tmp_laser_on = False
+    digital_channels = set()
+    analog_channels = set()
+    if len(ensemble) > 0:
+        block = host.get_block(ensemble[0][0])
+        digital_channels = block.digital_channels
+        analog_channels = block.analog_channels
+        block = host.get_block(ensemble[-1][0])
+        if len(block) > 0:
+            tmp_digital_high = block[-1].digital_high.copy()
+            tmp_laser_on = block[-1].laser_on
+        else:
+            tmp_digital_high = {chnl: False for chnl in digital_channels}
+            tmp_laser_on = False
+
+    digital_rising_bins = {chnl: list() for chnl in digital_channels}
+    digital_falling_bins = {chnl: list() for chnl in digital_channels}
+    laser_rising_bins = list()
+    laser_falling_bins = list()
+    elements_length_bins = list()
+    current_end_time = 0.0
+    current_start_bin = 0
+
+    for block_name, reps in ensemble:
+        block = host.get_block(block_name)
+        for rep_no in range(reps + 1):
+            for element in block:
+                if tmp_digital_high != element.digital_high:
+                    for chnl, state in element.digital_high.items():
+                        if not tmp_digital_high[chnl] and state:
+                            digital_rising_bins[chnl].append(current_start_bin)
+                        elif tmp_digital_high[chnl] and not state:
+                            digital_falling_bins[chnl].append(current_start_bin)
+                    tmp_digital_high = element.digital_high.copy()
+
+                if not laser_channel.startswith('d') and tmp_laser_on != element.laser_on:
+                    if not tmp_laser_on and element.laser_on:
+                        laser_rising_bins.append(current_start_bin)
+                    else:
+                        laser_falling_bins.append(current_start_bin)
+                    tmp_laser_on = element.laser_on
+
+                current_end_time += element.init_length_s + rep_no * element.increment_s
+                current_end_bin = int(np.rint(current_end_time * sample_rate))
+                elements_length_bins.append(current_end_bin - current_start_bin)
+                current_start_bin = current_end_bin
+
+    elements_length_bins = np.array(elements_length_bins, dtype='int64')
+
+    for chnl in digital_channels:
+        digital_rising_bins[chnl] = np.array(sorted(set(digital_rising_bins[chnl])), dtype='int64')
+        digital_falling_bins[chnl] = np.array(sorted(set(digital_falling_bins[chnl])),
+                                              dtype='int64')
+    if laser_channel.startswith('d'):
+        laser_rising_bins = digital_rising_bins[laser_channel]
+        laser_falling_bins = digital_falling_bins[laser_channel]
+    else:
+        laser_rising_bins = np.array(sorted(set(laser_rising_bins)), dtype='int64')
+        laser_falling_bins = np.array(sorted(set(laser_falling_bins)), dtype='int64')
+
+    return_dict = dict()
+    return_dict['number_of_samples'] = np.sum(elements_length_bins)
+    return_dict['number_of_elements'] = len(elements_length_bins)
+    return_dict['elements_length_bins'] = elements_length_bins
+    return_dict['digital_rising_bins'] = digital_rising_bins
+    return_dict['digital_falling_bins'] = digital_falling_bins
+    return_dict['analog_channels'] = analog_channels
+    return_dict['digital_channels'] = digital_channels
+    return_dict['channel_set'] = analog_channels.union(digital_channels)
+    return_dict['generation_parameters'] = host.generation_parameters.copy()
+    return_dict['ideal_length'] = current_end_time
+    return_dict['laser_rising_bins'] = laser_rising_bins
+    return_dict['laser_falling_bins'] = laser_falling_bins
+    return return_dict
+
+
+def random_ensemble(rng, number_of_blocks, max_elements, max_reps, digital_channels):
+    """ Creates a random PulseBlockEnsemble and the PulseBlocks it is made of.
+
+    @return (PulseBlockEnsemble, list): the ensemble and its blocks
+    """
+    blocks = list()
+    for block_index in range(number_of_blocks):
+        elements = list()
+        for _ in range(rng.randint(1, max_elements + 1)):
+            digital_high = {chnl: bool(rng.randint(2)) for chnl in digital_channels}
+            elements.append(PulseBlockElement(init_length_s=rng.randint(1, 2000) * 1.3e-9,
+                                              increment_s=rng.randint(0, 50) * 0.7e-9,
+                                              digital_high=digital_high,
+                                              laser_on=bool(rng.randint(2))))
+        blocks.append(PulseBlock('block{0:d}'.format(block_index), element_list=elements))
+    block_list = [(block.name, int(rng.randint(0, max_reps + 1))) for block in blocks]
+    return PulseBlockEnsemble('ensemble', block_list=block_list), blocks
+
+
+def assert_equal_analysis(result, reference):
+    assert set(result) == set(reference), 'Different keys in the returned dict'
+    for key, value in reference.items():
+        if isinstance(value, dict):
+            assert set(result[key]) == set(value), key
+            for chnl, bins in value.items():
+                assert np.array_equal(result[key][chnl], bins), '{0} {1}'.format(key, chnl)
+        elif isinstance(value, np.ndarray):
+            assert np.array_equal(result[key], value), key
+        else:
+            assert result[key] == value, key
+    return
+
+
+def main():
+    rng = np.random.RandomState(1234)
+    digital_channels = ['d_ch1', 'd_ch2', 'd_ch3']
+
+    # Equivalence on random ensembles (digital and non-digital laser channel)
+    number_of_checks = 0
+    for laser_channel in ('d_ch1', 'a_ch1'):
+        for _ in range(300):
+            ensemble, blocks = random_ensemble(rng, rng.randint(1, 6), 6, 20, digital_channels)
+            host = EnsembleAnalysisHost(blocks,
+                                        sample_rate=float(rng.choice([1.2e9, 1.25e9, 12e9, 25e9])),
+                                        laser_channel=laser_channel)
+            assert_equal_analysis(SequenceGeneratorLogic.analyze_block_ensemble(host, ensemble),
+                                  analyze_block_ensemble_reference(host, ensemble))
+            number_of_checks += 1
+    print('Identical results for {0:d} random ensembles.'.format(number_of_checks))
+
+    # Timing on a large ensemble
+    ensemble, blocks = random_ensemble(rng, 20, 10, 500, digital_channels)
+    host = EnsembleAnalysisHost(blocks, sample_rate=25e9)
+    result = SequenceGeneratorLogic.analyze_block_ensemble(host, ensemble)
+    assert_equal_analysis(result, analyze_block_ensemble_reference(host, ensemble))
+    repeat = 5
+    time_reference = min(timeit.repeat(
+        lambda: analyze_block_ensemble_reference(host, ensemble), number=1, repeat=repeat))
+    time_vectorized = min(timeit.repeat(
+        lambda: SequenceGeneratorLogic.analyze_block_ensemble(host, ensemble),
+        number=1, repeat=repeat))
+    print('Large ensemble with {0:d} elements:'.format(result['number_of_elements']))
+    print('    element loop: {0:9.3f} ms'.format(time_reference * 1e3))
+    print('    vectorized:   {0:9.3f} ms'.format(time_vectorized * 1e3))
+    print('    speedup:      {0:9.1f}x'.format(time_reference / time_vectorized))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the vectorized basic pulse analysis methods (BasicPulseAnalyzer) against the former
+implementations looping over each laser pulse. For different numbers of laser pulses the results
+of both implementations are checked to agree before the run times are compared.
+
+Run from the qudi main directory:
+    python tools/benchmarks/benchmark_basic_analysis_methods.py
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import sys
+import timeit
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from logic.pulsed.pulsed_analysis_methods.basic_analysis_methods import BasicPulseAnalyzer
+
+# Numbers of laser pulses and the time bins per laser pulse of the benchmark fixtures
+LASER_COUNTS = (1, 10, 100, 1000, 5000)
+BINS_PER_LASER = 3000
+BIN_WIDTH = 1e-9
+
+# Analysis methods with the parameters to test them with
+METHOD_PARAMETERS = {
+    'analyse_mean_norm': dict(signal_start=0.0, signal_end=200e-9, norm_start=300e-9,
+                              norm_end=500e-9),
+    'analyse_sum': dict(signal_start=0.0, signal_end=200e-9),
+    'analyse_mean': dict(signal_start=0.0, signal_end=200e-9),
+    'analyse_mean_reference': dict(signal_start=0.0, signal_end=200e-9, norm_start=300e-9,
+                                   norm_end=500e-9),
+}
+
+
+class PulsedMeasurementLogicStub:
+    """ Provides the settings of the PulsedMeasurementLogic used by the analysis methods. """
+    fast_counter_settings = {'bin_width': BIN_WIDTH, 'is_gated': True}
+    measurement_settings = dict()
+    sampling_information = dict()
+
+
+class ReferencePulseAnalyzer:
+    """ The former implementations of the basic analysis methods (one loop over the lasers). """
+
+    fast_counter_settings = PulsedMeasurementLogicStub.fast_counter_settings
+
+    def analyse_mean_norm(self, laser_data, signal_start=0.0, signal_end=200e-9,
+                          norm_start=300e-9, norm_end=500e-9):
+        num_of_lasers = laser_data.shape[0]
+        bin_width = self.fast_counter_settings.get('bin_width')
+        signal_start_bin = round(signal_start / bin_width)
+        signal_end_bin = round(signal_end / bin_width)
+        norm_start_bin = round(norm_start / bin_width)
+        norm_end_bin = round(norm_end / bin_width)
+        signal_data = np.empty(num_of_lasers, dtype=float)
+        error_data = np.empty(num_of_lasers, dtype=float)
+        for ii, laser_arr in enumerate(laser_data):
+            tmp_data = laser_arr[norm_start_bin:norm_end_bin]
+            reference_sum = np.sum(tmp_data)
+            reference_mean = (reference_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+            tmp_data = laser_arr[signal_start_bin:signal_end_bin]
+            signal_sum = np.sum(tmp_data)
+            signal_mean = (signal_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+            if reference_mean > 0 and signal_mean >= 0:
+                signal_data[ii] = signal_mean / reference_mean
+            else:
+                signal_data[ii] = 0.0
+            if reference_sum > 0 and signal_sum > 0:
+                error_data[ii] = signal_data[ii] * np.sqrt(1 / signal_sum + 1 / reference_sum)
+            else:
+                error_data[ii] = 0.0
+        return signal_data, error_data
+
+    def analyse_sum(self, laser_data, signal_start=0.0, signal_end=200e-9):
+        num_of_lasers = laser_data.shape[0]
+        bin_width = self.fast_counter_settings.get('bin_width')
+        signal_start_bin = round(signal_start / bin_width)
+        signal_end_bin = round(signal_end / bin_width)
+        signal_data = np.empty(num_of_lasers, dtype=float)
+        error_data = np.empty(num_of_lasers, dtype=float)
+        for ii, laser_arr in enumerate(laser_data):
+            signal = laser_arr[signal_start_bin:signal_end_bin].sum()
+            signal_error = np.sqrt(signal)
+            if signal < 0 or signal != signal:
+                signal_data[ii] = 0.0
+                error_data[ii] = 0.0
+            else:
+                signal_data[ii] = signal
+                error_data[ii] = signal_error
+        return signal_data, error_data
+
+    def analyse_mean(self, laser_data, signal_start=0.0, signal_end=200e-9):
+        num_of_lasers = laser_data.shape[0]
+        bin_width = self.fast_counter_settings.get('bin_width')
+        signal_start_bin = round(signal_start / bin_width)
+        signal_end_bin = round(signal_end / bin_width)
+        signal_data = np.empty(num_of_lasers, dtype=float)
+        error_data = np.empty(num_of_lasers, dtype=float)
+        for ii, laser_arr in enumerate(laser_data):
+            signal = laser_arr[signal_start_bin:signal_end_bin].mean()
+            signal_sum = laser_arr[signal_start_bin:signal_end_bin].sum()
+            signal_error = np.sqrt(signal_sum) / (signal_end_bin - signal_start_bin)
+            if signal < 0 or signal != signal:
+                signal_data[ii] = 0.0
+                error_data[ii] = 0.0
+            else:
+                signal_data[ii] = signal
+                error_data[ii] = signal_error
+        return signal_data, error_data
+
+    def analyse_mean_reference(self, laser_data, signal_start=0.0, signal_end=200e-9,
+                               norm_start=300e-9, norm_end=500e-9):
+        num_of_lasers = laser_data.shape[0]
+        bin_width = self.fast_counter_settings.get('bin_width')
+        signal_start_bin = round(signal_start / bin_width)
+        signal_end_bin = round(signal_end / bin_width)
+        norm_start_bin = round(norm_start / bin_width)
+        norm_end_bin = round(norm_end / bin_width)
+        signal_data = np.empty(num_of_lasers, dtype=float)
+        error_data = np.empty(num_of_lasers, dtype=float)
+        for ii, laser_arr in enumerate(laser_data):
+            tmp_data = laser_arr[norm_start_bin:norm_end_bin]
+            reference_sum = np.sum(tmp_data)
+            reference_mean = (reference_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+            tmp_data = laser_arr[signal_start_bin:signal_end_bin]
+            signal_sum = np.sum(tmp_data)
+            signal_mean = (signal_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+            signal_data[ii] = signal_mean - reference_mean
+            error_data[ii] = signal_data[ii] * np.sqrt(1 / abs(signal_sum) + 1 / abs(reference_sum))
+        return signal_data, error_data
+
+
+def laser_data_fixture(number_of_lasers, bins_per_laser=BINS_PER_LASER, seed=0):
+    """ Poisson distributed counts of NV-like laser pulses. Some pulses are left without counts
+    to cover the zero division handling.
+    """
+    rng = np.random.RandomState(seed + number_of_lasers)
+    time_axis = np.arange(bins_per_laser) * BIN_WIDTH
+    contrast = 0.3 * np.sin(np.linspace(0, 4 * np.pi, number_of_lasers)) ** 2
+    rate = 0.05 * (1 - contrast[:, np.newaxis] * np.exp(-time_axis / 300e-9))
+    laser_data = rng.poisson(rate).astype('int64')
+    laser_data[::7] = 0
+    return laser_data
+
+
+def assert_close(result, reference, name):
+    for data, reference_data in zip(result, reference):
+        assert data.shape == reference_data.shape, name
+        assert np.allclose(data, reference_data, rtol=1e-12, atol=0, equal_nan=True), name
+    return
+
+
+def check_edge_cases(analyzer, reference_analyzer):
+    """ No laser pulses, empty signal windows and negative (background subtracted) counts. """
+    laser_data = laser_data_fixture(20)
+    for method_name, parameters in METHOD_PARAMETERS.items():
+        cases = ((np.zeros((0, BINS_PER_LASER), dtype='int64'), parameters),
+                 (laser_data, dict(parameters, signal_end=0.0)),
+                 (laser_data.astype(float) - 0.5, parameters))
+        for data, case_parameters in cases:
+            with warnings.catch_warnings(), np.errstate(all='ignore'):
+                warnings.simplefilter('ignore', RuntimeWarning)
+                assert_close(getattr(analyzer, method_name)(data, **case_parameters),
+                             getattr(reference_analyzer, method_name)(data, **case_parameters),
+                             '{0} edge case'.format(method_name))
+    return
+
+
+def main():
+    analyzer = BasicPulseAnalyzer(PulsedMeasurementLogicStub())
+    reference_analyzer = ReferencePulseAnalyzer()
+    check_edge_cases(analyzer, reference_analyzer)
+    print('{0:<24s}{1:>8s}{2:>14s}{3:>14s}{4:>10s}'.format(
+        'method', 'lasers', 'loop [ms]', 'vector [ms]', 'speedup'))
+    for number_of_lasers in LASER_COUNTS:
+        laser_data = laser_data_fixture(number_of_lasers)
+        for method_name, parameters in METHOD_PARAMETERS.items():
+            method = getattr(analyzer, method_name)
+            reference_method = getattr(reference_analyzer, method_name)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                assert_close(method(laser_data, **parameters),
+                             reference_method(laser_data, **parameters),
+                             '{0} with {1:d} lasers'.format(method_name, number_of_lasers))
+                repeat = 3 if number_of_lasers > 100 else 10
+                time_reference = min(timeit.repeat(lambda: reference_method(laser_data,
+                                                                            **parameters),
+                                                   number=1, repeat=repeat))
+                time_vectorized = min(timeit.repeat(lambda: method(laser_data, **parameters),
+                                                    number=1, repeat=repeat))
+            print('{0:<24s}{1:>8d}{2:>14.3f}{3:>14.3f}{4:>9.1f}x'.format(
+                method_name, number_of_lasers, time_reference * 1e3, time_vectorized * 1e3,
+                time_reference / time_vectorized))
+    print('Results of all methods agree with the per-laser loop.')
+
+
+if __name__ == '__main__':
+    main()
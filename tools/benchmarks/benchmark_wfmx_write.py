@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of SamplesWriteMethods._write_wfmx against the former implementation, which appended
+the marker bytes to a temporary file and copied them to the end of the .WFMX file after the last
+chunk. Both implementations write the same chunked waveform and the created files are asserted to
+be identical before the write times are compared.
+
+Run from the qudi main directory:
+    python tools/benchmarks/benchmark_wfmx_write.py [number_of_samples]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from tools.samples_write_methods import SamplesWriteMethods
+
+
+class WfmxWriter(SamplesWriteMethods):
+    """ Provides the attributes of the pulse generator used by the write methods. """
+
+    def __init__(self, directory):
+        super().__init__()
+        self.sample_rate = 25e9
+        self.temp_dir = os.path.join(directory, 'temp')
+        self.waveform_dir = os.path.join(directory, 'waveforms')
+        os.makedirs(self.temp_dir)
+        os.makedirs(self.waveform_dir)
+
+
+def write_wfmx_reference(writer, name, analog_samples, digital_samples, total_number_of_samples,
+                         is_first_chunk, is_last_chunk):
+    """ The former implementation of _write_wfmx (temporary marker file, in 256 MB pieces). """
+    created_files = []
+    write_overhead_bytes = 1024 * 1024 * 256
+    write_overhead_samples = write_overhead_bytes // 4
+
+    if is_first_chunk:
+        writer._create_xml_file(total_number_of_samples, writer.temp_dir)
+        temp_file = os.path.join(writer.temp_dir, 'header.xml')
+        with open(temp_file, 'r') as header:
+            header_lines = header.readlines()
+        os.remove(temp_file)
+        for channel in analog_samples:
+            filename = name + channel[1:] + '.wfmx'
+            created_files.append(filename)
+            filepath = os.path.join(writer.waveform_dir, filename)
+            with open(filepath, 'wb') as wfmxfile:
+                for line in header_lines:
+                    wfmxfile.write(bytes(line, 'UTF-8'))
+
+    for channel in analog_samples:
+        a_chnl_number = int(channel.strip('a_ch'))
+        markers = ['d_ch' + str((a_chnl_number * 2) - 1), 'd_ch' + str(a_chnl_number * 2)]
+        filepath = os.path.join(writer.waveform_dir, name + channel[1:] + '.wfmx')
+        with open(filepath, 'ab') as wfmxfile:
+            for start_ind in range(0, analog_samples[channel].size, write_overhead_samples):
+                wfmxfile.write(analog_samples[channel][start_ind:start_ind + write_overhead_samples])
+
+        filepath = os.path.join(writer.temp_dir, name + channel[1:] + '_digi' + '.tmp')
+        with open(filepath, 'ab') as tmpfile:
+            for start_ind in range(0, analog_samples[channel].size, write_overhead_bytes):
+                stop_ind = start_ind + write_overhead_bytes
+                if markers[0] in digital_samples and markers[1] in digital_samples:
+                    tmpfile.write(np.add(np.left_shift(
+                        digital_samples[markers[1]][start_ind:stop_ind].astype('uint8'), 1),
+                        digital_samples[markers[0]][start_ind:stop_ind]))
+                elif markers[0] in digital_samples:
+                    tmpfile.write(digital_samples[markers[0]][start_ind:stop_ind])
+                elif markers[1] in digital_samples:
+                    tmpfile.write(np.left_shift(
+                        digital_samples[markers[1]][start_ind:stop_ind].astype('uint8'), 1))
+
+    if is_last_chunk:
+        for channel in analog_samples:
+            tmp_filepath = os.path.join(writer.temp_dir, name + channel[1:] + '_digi' + '.tmp')
+            wfmx_filepath = os.path.join(writer.waveform_dir, name + channel[1:] + '.wfmx')
+            with open(wfmx_filepath, 'ab') as wfmxfile:
+                with open(tmp_filepath, 'rb') as tmpfile:
+                    while True:
+                        tmp_data = tmpfile.read(write_overhead_bytes)
+                        if not tmp_data:
+                            break
+                        wfmxfile.write(tmp_data)
+            os.remove(tmp_filepath)
+    return created_files
+
+
+def sample_chunks(number_of_samples, chunk_size, seed=42):
+    """ Generates chunks of random samples for a_ch1 (both markers) and a_ch2 (marker 2 only). """
+    rng = np.random.RandomState(seed)
+    for start in range(0, number_of_samples, chunk_size):
+        size = min(chunk_size, number_of_samples - start)
+        analog_samples = {'a_ch1': rng.uniform(-1, 1, size).astype('float32'),
+                          'a_ch2': rng.uniform(-1, 1, size).astype('float32')}
+        digital_samples = {chnl: rng.randint(2, size=size).astype(bool)
+                           for chnl in ('d_ch1', 'd_ch2', 'd_ch4')}
+        yield analog_samples, digital_samples, start == 0, start + size >= number_of_samples
+
+
+def write_waveform(write_method, writer, number_of_samples, chunk_size):
+    """ Writes a chunked waveform and returns the time spent in the write method. """
+    elapsed = 0.0
+    for analog, digital, is_first, is_last in sample_chunks(number_of_samples, chunk_size):
+        start = time.perf_counter()
+        write_method(writer, 'bench', analog, digital, number_of_samples, is_first, is_last)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def main(number_of_samples=50000000, chunk_size=5000000):
+    directory = tempfile.mkdtemp()
+    try:
+        writer = WfmxWriter(os.path.join(directory, 'vectorized'))
+        reference_writer = WfmxWriter(os.path.join(directory, 'reference'))
+
+        time_new = write_waveform(SamplesWriteMethods._write_wfmx, writer,
+                                  number_of_samples, chunk_size)
+        time_reference = write_waveform(write_wfmx_reference, reference_writer,
+                                        number_of_samples, chunk_size)
+        for channel in ('a_ch1', 'a_ch2'):
+            filename = 'bench' + channel[1:] + '.wfmx'
+            assert filecmp.cmp(os.path.join(writer.waveform_dir, filename),
+                               os.path.join(reference_writer.waveform_dir, filename),
+                               shallow=False), 'Files for {0} differ'.format(channel)
+        assert not writer._wfmx_write_positions, 'Write positions left after the last chunk'
+
+        # An aborted write must not leave a write position behind
+        analog, digital, _, _ = next(sample_chunks(1000, 1000))
+        writer._write_wfmx('aborted', analog, digital, 2000, True, False)
+        try:
+            writer._write_wfmx('aborted', {'a_ch1': analog['a_ch1'][:10], 'a_ch2': None},
+                               digital, 2000, False, False)
+        except AttributeError:
+            pass
+        assert not writer._wfmx_write_positions, 'Write positions left after an aborted write'
+
+        print('Identical .WFMX files for {0:d} samples in chunks of {1:d}.'.format(
+            number_of_samples, chunk_size))
+        print('    temporary marker file: {0:8.3f} s'.format(time_reference))
+        print('    preallocated offsets:  {0:8.3f} s'.format(time_new))
+        print('    speedup:               {0:8.2f}x'.format(time_reference / time_new))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(number_of_samples=int(float(sys.argv[1])))
+    else:
+        main()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+Equivalence test of PulseBlasterESRPRO._convert_sample_to_pb_sequence against the former
+sample-by-sample implementation on random digital patterns.
+
+Run from the qudi main directory with pytest or directly:
+    python tools/benchmarks/test_pulse_blaster_sample_conversion.py
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from hardware.spincore.pulse_blaster_esrpro import PulseBlasterESRPRO
+
+
+class PulseBlasterConversionHost:
+    """ Provides the attributes of PulseBlasterESRPRO used by the sample conversion. """
+
+    # random patterns contain too short pulses, don't print the warnings about them
+    log = logging.getLogger(__name__)
+    log.addHandler(logging.NullHandler())
+
+    def __init__(self, clock_freq=500e6, min_instr_len=5):
+        self.GRAN_MIN = 1 / clock_freq
+        self.LEN_MIN = self.GRAN_MIN * min_instr_len
+
+    _convert_sample_to_pb_sequence = PulseBlasterESRPRO._convert_sample_to_pb_sequence
+    _convert_runs_to_pb_sequence = PulseBlasterESRPRO._convert_runs_to_pb_sequence
+
+
+def convert_sample_to_pb_sequence_reference(host, digital_samples):
+    """ The sample-by-sample implementation of _convert_sample_to_pb_sequence used before it was
+    vectorized (without the warning about too short pulses).
+    """
+    ch_list = list(digital_samples)
+    ch_list.sort()
+    num_entries = len(digital_samples[ch_list[0]])
+
+    last_sequence_dict = None
+    pb_sequence_list = list()
+    for index in range(num_entries):
+        temp_sequence_dict = {'active_channels': [], 'length': host.GRAN_MIN}
+        for ch_name in ch_list:
+            if digital_samples[ch_name][index]:
+                temp_sequence_dict['active_channels'].append(int(ch_name.replace('d_ch', '')) - 1)
+
+        if last_sequence_dict is None:
+            last_sequence_dict = temp_sequence_dict
+        elif temp_sequence_dict['active_channels'] == last_sequence_dict['active_channels']:
+            last_sequence_dict['length'] += temp_sequence_dict['length']
+        else:
+            pb_sequence_list.append(last_sequence_dict)
+            last_sequence_dict = temp_sequence_dict
+
+    pb_sequence_list.append(last_sequence_dict)
+    return pb_sequence_list
+
+
+def random_digital_samples(rng, number_of_channels, number_of_samples, mean_run_length):
+    """ Random digital samples with runs of constant state (including single sample runs). """
+    channels = rng.choice(np.arange(1, 9), number_of_channels, replace=False)
+    digital_samples = dict()
+    for chnl in channels:
+        number_of_runs = max(1, number_of_samples // mean_run_length)
+        run_starts = np.sort(rng.randint(0, number_of_samples, number_of_runs))
+        toggles = np.zeros(number_of_samples, dtype='int64')
+        np.add.at(toggles, run_starts, 1)
+        states = (np.cumsum(toggles) + rng.randint(2)) % 2
+        digital_samples['d_ch{0:d}'.format(chnl)] = states.astype(bool)
+    return digital_samples
+
+
+def assert_equal_pb_sequences(result, reference):
+    assert len(result) == len(reference)
+    for entry, reference_entry in zip(result, reference):
+        assert entry['active_channels'] == reference_entry['active_channels']
+        # The reference accumulates the length sample by sample, so allow for rounding errors
+        assert np.isclose(entry['length'], reference_entry['length'], rtol=1e-9, atol=0)
+    return
+
+
+def test_random_patterns():
+    rng = np.random.RandomState(4321)
+    host = PulseBlasterConversionHost()
+    for _ in range(500):
+        digital_samples = random_digital_samples(rng,
+                                                 number_of_channels=rng.randint(1, 9),
+                                                 number_of_samples=rng.randint(1, 3000),
+                                                 mean_run_length=rng.randint(1, 200))
+        assert_equal_pb_sequences(host._convert_sample_to_pb_sequence(digital_samples),
+                                  convert_sample_to_pb_sequence_reference(host, digital_samples))
+
+
+def test_constant_pattern():
+    host = PulseBlasterConversionHost()
+    for state in (False, True):
+        digital_samples = {'d_ch1': np.full(100, state), 'd_ch3': np.full(100, state)}
+        assert_equal_pb_sequences(host._convert_sample_to_pb_sequence(digital_samples),
+                                  convert_sample_to_pb_sequence_reference(host, digital_samples))
+
+
+def test_no_samples():
+    # The former implementation returned [None] for empty sample arrays and failed for an empty
+    # dict, now both result in an empty sequence list.
+    host = PulseBlasterConversionHost()
+    empty = np.zeros(0, dtype=bool)
+    assert host._convert_sample_to_pb_sequence({'d_ch1': empty, 'd_ch2': empty}) == list()
+    assert host._convert_sample_to_pb_sequence(dict()) == list()
+
+
+if __name__ == '__main__':
+    test_random_patterns()
+    test_constant_pattern()
+    test_no_samples()
+    print('All conversions identical to the reference implementation.')
@@ -42,13 +42,19 @@ class SamplesWriteMethods:
         self._write_to_file['seqx'] = self._write_seqx
         self._write_to_file['fpga'] = self._write_fpga
         self._write_to_file['pstream'] = self._write_pstream
+        # Positions to write the next chunk of samples to in the .WFMX files being written.
+        # Keys are the file paths.
+        self._wfmx_write_positions = dict()
         return
 
     def _write_wfmx(self, name, analog_samples, digital_samples, total_number_of_samples,
                     is_first_chunk, is_last_chunk):
         """
-        Appends a sampled chunk of a whole waveform to a wfmx-file. Create the file
+        Writes a sampled chunk of a whole waveform to a wfmx-file. Create the file
         if it is the first chunk.
+        The file is preallocated for all samples of the waveform, so the analog samples and the
+        markers (located behind all analog samples) of each chunk are written to their final
+        position right away.
         If both flags (is_first_chunk, is_last_chunk) are set to TRUE it means
         that the whole ensemble is written as a whole in one big chunk.
 
@@ -79,114 +85,88 @@ class SamplesWriteMethods:
         # The overhead of the write process in number of samples
         write_overhead_samples = write_overhead_bytes//4
 
-        # if it is the first chunk, create the .WFMX file with header.
-        if is_first_chunk:
-            # create header
-            self._create_xml_file(total_number_of_samples, self.temp_dir)
-            # read back the header xml-file and delete it afterwards
-            temp_file = os.path.join(self.temp_dir, 'header.xml')
-            with open(temp_file, 'r') as header:
-                header_lines = header.readlines()
-            os.remove(temp_file)
-
-            # create wfmx-file for each analog channel
+        chunk_written = False
+        try:
+            # if it is the first chunk, create the .WFMX file with header and preallocate the space
+            # for all analog samples followed by the marker bytes (if any marker is used).
+            if is_first_chunk:
+                # create header
+                self._create_xml_file(total_number_of_samples, self.temp_dir)
+                # read back the header xml-file and delete it afterwards
+                temp_file = os.path.join(self.temp_dir, 'header.xml')
+                with open(temp_file, 'rb') as header:
+                    header_bytes = header.read()
+                os.remove(temp_file)
+
+                # create wfmx-file for each analog channel
+                for channel in analog_samples:
+                    filename = name + channel[1:] + '.wfmx'
+                    created_files.append(filename)
+
+                    filepath = os.path.join(self.waveform_dir, filename)
+                    has_markers = any(marker in digital_samples for marker in
+                                      self._get_wfmx_markers(channel))
+
+                    with open(filepath, 'wb') as wfmxfile:
+                        # write header
+                        wfmxfile.write(header_bytes)
+                        wfmxfile.truncate(len(header_bytes) + total_number_of_samples * (
+                            5 if has_markers else 4))
+                    self._wfmx_write_positions[filepath] = {'header_bytes': len(header_bytes),
+                                                            'samples_written': 0,
+                                                            'has_markers': has_markers}
+
+            # write analog samples and the byte values corresponding to the marker states
+            # (\x01 for marker 1, \x02 for marker 2, \x03 for both) of each channel at their
+            # positions in the .WFMX file.
             for channel in analog_samples:
-                filename = name + channel[1:] + '.wfmx'
-                created_files.append(filename)
-
-                filepath = os.path.join(self.waveform_dir, filename)
+                markers = self._get_wfmx_markers(channel)
+                filepath = os.path.join(self.waveform_dir, name + channel[1:] + '.wfmx')
+                position = self._wfmx_write_positions[filepath]
+                chunk_samples = analog_samples[channel].size
+                with open(filepath, 'r+b') as wfmxfile:
+                    # write analog samples in binary format. One sample is 4 bytes (np.float32).
+                    # Write in chunks if array is very big to avoid large temporary copys in memory
+                    wfmxfile.seek(position['header_bytes'] + 4 * position['samples_written'])
+                    for start_ind in range(0, chunk_samples, write_overhead_samples):
+                        stop_ind = start_ind + write_overhead_samples
+                        wfmxfile.write(analog_samples[channel][start_ind:stop_ind])
+
+                    if position['has_markers']:
+                        # Marker bytes are located behind all analog samples. One sample is 1 byte.
+                        wfmxfile.seek(position['header_bytes'] + 4 * total_number_of_samples +
+                                      position['samples_written'])
+                        for start_ind in range(0, chunk_samples, write_overhead_bytes):
+                            stop_ind = min(start_ind + write_overhead_bytes, chunk_samples)
+                            marker_bytes = np.zeros(stop_ind - start_ind, dtype='uint8')
+                            for bit, marker in enumerate(markers):
+                                if marker in digital_samples:
+                                    marker_bytes |= np.left_shift(
+                                        digital_samples[marker][start_ind:stop_ind], bit,
+                                        dtype='uint8')
+                            wfmxfile.write(marker_bytes)
+                position['samples_written'] += chunk_samples
+
+            chunk_written = True
+        finally:
+            # forget the write positions if it was the last chunk to write or if the write
+            # process has been aborted, so no stale offset is left for this file.
+            if is_last_chunk or not chunk_written:
+                for channel in analog_samples:
+                    filepath = os.path.join(self.waveform_dir, name + channel[1:] + '.wfmx')
+                    self._wfmx_write_positions.pop(filepath, None)
+        return created_files
 
-                with open(filepath, 'wb') as wfmxfile:
-                    # write header
-                    for line in header_lines:
-                        wfmxfile.write(bytes(line, 'UTF-8'))
+    @staticmethod
+    def _get_wfmx_markers(channel):
+        """ Returns the marker string descriptors (digital channels) for an analog channel.
 
-        # append analog samples to the .WFMX files of each channel. Write
-        # digital samples in temporary files.
-        for channel in analog_samples:
-            # get analog channel number as integer from string
-            a_chnl_number = int(channel.strip('a_ch'))
-            # get marker string descriptors for this analog channel
-            markers = ['d_ch'+str((a_chnl_number*2)-1), 'd_ch'+str(a_chnl_number*2)]
-            # append analog samples chunk to .WFMX file
-            filepath = os.path.join(self.waveform_dir, name + channel[1:] + '.wfmx')
-            with open(filepath, 'ab') as wfmxfile:
-                # append analog samples in binary format. One sample is 4
-                # bytes (np.float32). Write in chunks if array is very big to
-                # avoid large temporary copys in memory
-                number_of_full_chunks = int(analog_samples[channel].size//write_overhead_samples)
-                for start_ind in np.arange(0, number_of_full_chunks * write_overhead_samples,
-                                           write_overhead_samples):
-                    stop_ind = start_ind+write_overhead_samples
-                    wfmxfile.write(analog_samples[channel][start_ind:stop_ind])
-                # write rest
-                rest_start_ind = number_of_full_chunks*write_overhead_samples
-                wfmxfile.write(analog_samples[channel][rest_start_ind:])
-
-            # create the byte values corresponding to the marker states
-            # (\x01 for marker 1, \x02 for marker 2, \x03 for both)
-            # and write them into a temporary file
-            filepath = os.path.join(self.temp_dir, name + channel[1:] + '_digi' + '.tmp')
-            with open(filepath, 'ab') as tmpfile:
-                if markers[0] not in digital_samples and markers[1] not in digital_samples:
-                    # no digital channels to write for this analog channel
-                    pass
-                elif markers[0] in digital_samples and markers[1] not in digital_samples:
-                    # Only marker one is active for this channel
-                    for start_ind in np.arange(0, number_of_full_chunks * write_overhead_bytes,
-                                               write_overhead_bytes):
-                        stop_ind = start_ind + write_overhead_bytes
-                        # append digital samples in binary format. One sample is 1 byte (np.uint8).
-                        tmpfile.write(digital_samples[markers[0]][start_ind:stop_ind])
-                    # write rest of digital samples
-                    rest_start_ind = number_of_full_chunks * write_overhead_bytes
-                    tmpfile.write(digital_samples[markers[0]][rest_start_ind:])
-                elif markers[0] not in digital_samples and markers[1] in digital_samples:
-                    # Only marker two is active for this channel
-                    for start_ind in np.arange(0, number_of_full_chunks * write_overhead_bytes,
-                                               write_overhead_bytes):
-                        stop_ind = start_ind + write_overhead_bytes
-                        # append digital samples in binary format. One sample is 1 byte (np.uint8).
-                        tmpfile.write(np.left_shift(
-                            digital_samples[markers[1]][start_ind:stop_ind].astype('uint8'),
-                            1))
-                    # write rest of digital samples
-                    rest_start_ind = number_of_full_chunks * write_overhead_bytes
-                    tmpfile.write(np.left_shift(
-                        digital_samples[markers[1]][rest_start_ind:].astype('uint8'), 1))
-                else:
-                    # Both markers are active for this channel
-                    for start_ind in np.arange(0, number_of_full_chunks * write_overhead_bytes,
-                                               write_overhead_bytes):
-                        stop_ind = start_ind + write_overhead_bytes
-                        # append digital samples in binary format. One sample is 1 byte (np.uint8).
-                        tmpfile.write(np.add(np.left_shift(
-                            digital_samples[markers[1]][start_ind:stop_ind].astype('uint8'), 1),
-                            digital_samples[markers[0]][start_ind:stop_ind]))
-                    # write rest of digital samples
-                    rest_start_ind = number_of_full_chunks * write_overhead_bytes
-                    tmpfile.write(np.add(np.left_shift(
-                        digital_samples[markers[1]][rest_start_ind:].astype('uint8'), 1),
-                        digital_samples[markers[0]][rest_start_ind:]))
-
-        # append the digital sample tmp file to the .WFMX file and delete the
-        # .tmp files if it was the last chunk to write.
-        if is_last_chunk:
-            for channel in analog_samples:
-                tmp_filepath = os.path.join(self.temp_dir, name + channel[1:] + '_digi' + '.tmp')
-                wfmx_filepath = os.path.join(self.waveform_dir, name + channel[1:] + '.wfmx')
-                with open(wfmx_filepath, 'ab') as wfmxfile:
-                    with open(tmp_filepath, 'rb') as tmpfile:
-                        # read and write files in max. write_overhead_bytes chunks to reduce
-                        # memory usage
-                        while True:
-                            tmp_data = tmpfile.read(write_overhead_bytes)
-                            if not tmp_data:
-                                break
-                            wfmxfile.write(tmp_data)
-                # delete tmp file
-                os.remove(tmp_filepath)
-        return created_files
+        @param str channel: analog channel descriptor, e.g. 'a_ch1'
+        @return list: the two marker channel descriptors, e.g. ['d_ch1', 'd_ch2']
+        """
+        # get analog channel number as integer from string
+        a_chnl_number = int(channel.strip('a_ch'))
+        return ['d_ch'+str((a_chnl_number*2)-1), 'd_ch'+str(a_chnl_number*2)]
 
     def _write_wfm(self, name, analog_samples, digital_samples, total_number_of_samples,
                     is_first_chunk, is_last_chunk):
@@ -589,7 +569,7 @@ class SamplesWriteMethods:
         # The header length is written into the file
         # The first line is not included since it is redundant
         # Also the last endline (\n) is excluded
-        text = open(filepath, "U").read()
+        text = open(filepath, "r").read()
         text = text.replace("xxxxxxxxx", length_of_header)
         text = bytes(text, 'UTF-8')
         f = open(filepath, "wb")